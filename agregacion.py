@@ -0,0 +1,276 @@
+"""
+Agregacion - Totales de mediciones de Revit por categoria y agrupacion
+Autor: Francisco de la Poza
+
+Para cada categoria del revit_data.json (muros, suelos, puertas...) calcula el
+numero de elementos y la suma, el minimo y el maximo de los campos de medicion
+(Volumen, Area, Longitud...) agrupando por Tipo, Material, Nivel... ademas del
+total de la categoria. fr_revit_extractor escribe el resultado en la hoja
+"Resumen" del Excel.
+
+Cada categoria se pasa a columnas una sola vez (los campos de agrupacion se
+convierten en codigos enteros 0..n-1) y esas columnas se reutilizan para el total
+y para cada agrupacion. Cada motor tiene su propia conversion y agregacion:
+  - pandas: DataFrame.from_records y pd.factorize para las columnas,
+    DataFrame.groupby sobre los codigos para agregar
+  - numpy: columnas float64/intp con np.fromiter, np.bincount (conteos y sumas)
+    y ufunc.at (minimos y maximos)
+  - python: bucles sobre listas (sin dependencias, para modelos pequenos)
+numpy y pandas son opcionales; sin ellos se usa el motor python. Se importan la
+primera vez que se agrega (no al importar este modulo), porque fr_revit_extractor
+lo importa al cargarse y pandas tarda varias decimas de segundo en importarse.
+"""
+
+import importlib
+import importlib.util
+import math
+
+# Campos numericos que se suman (el resto, como Ancho o Alto, no tiene sentido sumarlo)
+CAMPOS_MEDICION = ("Volumen", "Area", "Superficie", "Longitud", "Perimetro")
+
+# Campos por los que se agrupa si existen en la categoria
+CLAVES_AGRUPACION = ("Tipo", "Material", "Nivel", "Familia")
+
+TOTAL = "(total)"
+SIN_VALOR = "(sin valor)"
+
+MOTORES = ("pandas", "numpy", "python")
+
+# Modulos opcionales ya importados: {nombre: modulo o None si no esta instalado}
+_modulos = {}
+
+def _importar(nombre: str):
+    """Importa numpy o pandas la primera vez que se necesitan (None si no estan instalados)"""
+    if nombre not in _modulos:
+        try:
+            _modulos[nombre] = importlib.import_module(nombre)
+        except ImportError:
+            _modulos[nombre] = None
+    return _modulos[nombre]
+
+def motores_instalados() -> list[str]:
+    """Motores utilizables, del mas rapido al mas lento (sin importar numpy ni pandas)"""
+    return [m for m in MOTORES if m == "python" or importlib.util.find_spec(m) is not None]
+
+def motor_disponible() -> str:
+    """Motor de agregacion mas rapido instalado"""
+    return motores_instalados()[0]
+
+def _numero(valor) -> float:
+    """Valor numerico o NaN si falta o no es un numero"""
+    if isinstance(valor, bool) or not isinstance(valor, (int, float)):
+        return math.nan
+    return float(valor)
+
+def _texto_clave(valor) -> str:
+    """Nombre del grupo de un valor de un campo de agrupacion"""
+    return SIN_VALOR if valor in (None, "") else str(valor)
+
+def _factorizar(valores) -> tuple[list[str], list[int]]:
+    """Nombres distintos (en orden de aparicion) y el codigo de cada valor"""
+    codigos_por_nombre = {}
+    codigos = [codigos_por_nombre.setdefault(v, len(codigos_por_nombre)) for v in valores]
+    return list(codigos_por_nombre), codigos
+
+def _filas(elementos: list) -> tuple[list, set]:
+    """Elementos que son diccionarios y campos que aparecen en alguno"""
+    filas = [e for e in elementos if isinstance(e, dict)]
+    return filas, set().union(*filas)
+
+def _codigos_intp(np, valores) -> tuple[list[str], object]:
+    """
+    Nombres y codigos (array intp) de una columna de agrupacion (array de objetos).
+    Si solo hay textos (y None) se factorizan los valores distintos y los codigos
+    se asignan sin llamar a _texto_clave por cada elemento.
+    """
+    if set(map(type, valores)) <= {str, type(None)}:
+        nombres = {}
+        remapeo = {v: nombres.setdefault(_texto_clave(v), len(nombres)) for v in dict.fromkeys(valores)}
+        return list(nombres), np.fromiter(map(remapeo.__getitem__, valores), dtype=np.intp, count=len(valores))
+    nombres, codigos = _factorizar(map(_texto_clave, valores))
+    return nombres, np.asarray(codigos, dtype=np.intp)
+
+def _medidas_float64(np, valores):
+    """
+    Array float64 de una columna de medicion (array de objetos), NaN si falta el
+    valor o no es un numero. Si solo hay numeros (y None) se convierte de una vez.
+    """
+    tipos = set(map(type, valores))
+    if tipos <= {float, int, type(None)}:
+        if type(None) in tipos:
+            valores = np.where(np.equal(valores, None), np.nan, valores)
+        return valores.astype(np.float64)
+    return np.fromiter(map(_numero, valores), dtype=np.float64, count=len(valores))
+
+# Cada motor pasa los elementos a columnas con a_columnas_<motor>(elementos), que
+# retorna (filas, claves, medidas): claves es {campo: (nombres, codigos)} con el
+# total y cada campo de agrupacion factorizados, y medidas es {campo: valores}
+# (NaN si falta el valor). Despues, por cada agrupacion, _agrupar_<motor> recibe los
+# codigos de grupo (0..grupos-1) y las medidas y retorna, por grupo, el numero de
+# elementos y (validos, suma, minimo, maximo) por campo
+
+def a_columnas(elementos: list) -> tuple[int, dict, dict]:
+    """Columnas como listas de Python (motor python)"""
+    filas, presentes = _filas(elementos)
+    claves = {TOTAL: ([TOTAL], [0] * len(filas))}
+    for campo in CLAVES_AGRUPACION:
+        if campo in presentes:
+            claves[campo] = _factorizar(_texto_clave(fila.get(campo)) for fila in filas)
+    medidas = {
+        campo: [_numero(fila.get(campo)) for fila in filas]
+        for campo in CAMPOS_MEDICION if campo in presentes
+    }
+    return len(filas), claves, medidas
+
+def _a_columnas_numpy(elementos: list) -> tuple[int, dict, dict]:
+    """Columnas como arrays intp (codigos) y float64 (medidas)"""
+    np = _importar("numpy")
+    filas, presentes = _filas(elementos)
+    n = len(filas)
+    claves = {TOTAL: ([TOTAL], np.zeros(n, dtype=np.intp))}
+    for campo in CLAVES_AGRUPACION:
+        if campo in presentes:
+            claves[campo] = _codigos_intp(np, np.fromiter((fila.get(campo) for fila in filas), dtype=object, count=n))
+    medidas = {
+        campo: _medidas_float64(np, np.fromiter((fila.get(campo) for fila in filas), dtype=object, count=n))
+        for campo in CAMPOS_MEDICION if campo in presentes
+    }
+    return n, claves, medidas
+
+def _a_columnas_pandas(elementos: list) -> tuple[int, dict, dict]:
+    """Columnas con DataFrame.from_records; las claves se factorizan con pd.factorize"""
+    np = _importar("numpy")
+    pd = _importar("pandas")
+    filas, presentes = _filas(elementos)
+    n = len(filas)
+    columnas = [c for c in CLAVES_AGRUPACION + CAMPOS_MEDICION if c in presentes]
+    tabla = pd.DataFrame.from_records(filas, columns=columnas, nrows=n)
+
+    claves = {TOTAL: ([TOTAL], np.zeros(n, dtype=np.intp))}
+    for campo in CLAVES_AGRUPACION:
+        if campo not in presentes:
+            continue
+        codigos, valores = pd.factorize(tabla[campo], use_na_sentinel=True)
+        # Valores distintos que dan el mismo nombre (None, "", 1 y "1"...) se unen;
+        # el ultimo elemento del remapeo es el de los nulos (codigo -1)
+        nombres = {}
+        remapeo = [nombres.setdefault(_texto_clave(v), len(nombres)) for v in valores]
+        remapeo.append(nombres.setdefault(SIN_VALOR, len(nombres)) if (codigos < 0).any() else 0)
+        claves[campo] = (list(nombres), np.asarray(remapeo, dtype=np.intp)[codigos])
+
+    medidas = {}
+    for campo in CAMPOS_MEDICION:
+        if campo not in presentes or pd.api.types.is_bool_dtype(tabla[campo]):
+            continue
+        columna = tabla[campo]
+        if pd.api.types.is_numeric_dtype(columna):
+            medidas[campo] = columna.to_numpy(dtype=np.float64, na_value=np.nan)
+        else:
+            # Columna mixta: solo cuentan los numeros (no los textos ni los booleanos)
+            medidas[campo] = _medidas_float64(np, columna.to_numpy(dtype=object))
+    return n, claves, medidas
+
+def _agrupar_python(codigos: list[int], grupos: int, medidas: dict) -> tuple[list, dict]:
+    """Agregacion con bucles y listas"""
+    elementos = [0] * grupos
+    for codigo in codigos:
+        elementos[codigo] += 1
+    estadisticas = {}
+    for campo, valores in medidas.items():
+        validos = [0] * grupos
+        suma = [0.0] * grupos
+        minimo = [math.inf] * grupos
+        maximo = [-math.inf] * grupos
+        for codigo, valor in zip(codigos, valores):
+            if valor == valor:  # no es NaN
+                validos[codigo] += 1
+                suma[codigo] += valor
+                if valor < minimo[codigo]:
+                    minimo[codigo] = valor
+                if valor > maximo[codigo]:
+                    maximo[codigo] = valor
+        estadisticas[campo] = (validos, suma, minimo, maximo)
+    return elementos, estadisticas
+
+def _agrupar_numpy(codigos, grupos: int, medidas: dict) -> tuple[list, dict]:
+    """Agregacion con np.bincount (conteos y sumas) y ufunc.at (minimos y maximos)"""
+    np = _importar("numpy")
+    elementos = np.bincount(codigos, minlength=grupos).tolist()
+    estadisticas = {}
+    for campo, valores in medidas.items():
+        validos = ~np.isnan(valores)
+        minimo = np.full(grupos, np.inf)
+        maximo = np.full(grupos, -np.inf)
+        np.minimum.at(minimo, codigos[validos], valores[validos])
+        np.maximum.at(maximo, codigos[validos], valores[validos])
+        estadisticas[campo] = (
+            np.bincount(codigos, weights=validos, minlength=grupos).tolist(),
+            np.bincount(codigos, weights=np.where(validos, valores, 0.0), minlength=grupos).tolist(),
+            minimo.tolist(),
+            maximo.tolist()
+        )
+    return elementos, estadisticas
+
+def _agrupar_pandas(codigos, grupos: int, medidas: dict) -> tuple[list, dict]:
+    """Agregacion con DataFrame.groupby"""
+    pd = _importar("pandas")
+    tabla = pd.DataFrame(medidas, index=pd.RangeIndex(len(codigos)))
+    agrupado = tabla.groupby(codigos, sort=True)
+    elementos = agrupado.size().reindex(range(grupos), fill_value=0).tolist()
+    estadisticas = {}
+    if medidas:
+        calculado = agrupado.agg(["count", "sum", "min", "max"]).reindex(range(grupos))
+        for campo in medidas:
+            estadisticas[campo] = tuple(
+                calculado[(campo, estadistica)].fillna(0).tolist()
+                for estadistica in ("count", "sum", "min", "max")
+            )
+    return elementos, estadisticas
+
+# Motor: (conversion a columnas, agregacion de una agrupacion)
+AGRUPADORES = {
+    "python": (a_columnas, _agrupar_python),
+    "numpy": (_a_columnas_numpy, _agrupar_numpy),
+    "pandas": (_a_columnas_pandas, _agrupar_pandas)
+}
+
+def resumir_categoria(categoria: str, elementos: list, motor: str = None) -> list[dict]:
+    """
+    Filas del resumen de una categoria: total y una agrupacion por cada clave presente.
+    Cada fila: categoria, agrupado_por, grupo, elementos, campo, suma, minimo, maximo
+    (campo None si la categoria no tiene campos de medicion, por ejemplo puertas).
+    """
+    motor = motor or motor_disponible()
+    if motor not in MOTORES:
+        raise ValueError(f"motor de agregacion desconocido: {motor}")
+    a_columnas_motor, agrupar = AGRUPADORES[motor]
+
+    numero_filas, claves, medidas = a_columnas_motor(elementos)
+    if not numero_filas:
+        return []
+
+    filas = []
+    for agrupado_por, (nombres, codigos) in claves.items():
+        elementos_grupo, estadisticas = agrupar(codigos, len(nombres), medidas)
+        for codigo, grupo in sorted(enumerate(nombres), key=lambda g: g[1]):
+            base = {"categoria": categoria, "agrupado_por": agrupado_por, "grupo": grupo, "elementos": int(elementos_grupo[codigo])}
+            con_medidas = False
+            for campo, (validos, suma, minimo, maximo) in estadisticas.items():
+                if not validos[codigo]:
+                    continue
+                con_medidas = True
+                filas.append({
+                    **base, "campo": campo, "suma": round(suma[codigo], 4),
+                    "minimo": round(minimo[codigo], 4), "maximo": round(maximo[codigo], 4)
+                })
+            if not con_medidas:
+                filas.append({**base, "campo": None, "suma": None, "minimo": None, "maximo": None})
+    return filas
+
+def resumir_mediciones(datos: dict, motor: str = None) -> list[dict]:
+    """Filas del resumen de todas las categorias del revit_data.json"""
+    filas = []
+    for categoria, elementos in datos.items():
+        if isinstance(elementos, list) and elementos:
+            filas.extend(resumir_categoria(categoria, elementos, motor))
+    return filas
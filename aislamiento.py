@@ -0,0 +1,254 @@
+"""
+Aislamiento - Prueba de importacion y de humo de herramientas candidatas
+Autor: Francisco de la Poza
+
+Antes de sustituir un archivo en 'herramientas/', FR_generar_herramienta importa el
+candidato en un subproceso con limite de tiempo y de memoria, comprueba HERRAMIENTA,
+ejecutar() y el inputSchema, y ejecuta opcionalmente los argumentos de EJEMPLOS.
+
+Uso interno (proceso hijo):
+    python aislamiento.py <ruta_candidato> [--limite-memoria-mb N] [--ejemplos]
+
+El hijo escribe un unico informe JSON en stdout. La salida de la herramienta
+durante la importacion se redirige a stderr para no mezclarla con el informe.
+"""
+
+import asyncio
+import importlib.util
+import inspect
+import json
+import subprocess
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+from comun import RUTA_BASE, registrar_log
+
+# Limites del subproceso
+LIMITE_TIEMPO_S = 30
+LIMITE_MEMORIA_MB = 1024
+
+# Umbrales a partir de los cuales se avisa de una herramienta lenta o pesada
+UMBRAL_IMPORTACION_LENTA_S = 1.0
+UMBRAL_MEMORIA_ALTA_MB = 50.0
+UMBRAL_EJEMPLO_LENTO_S = 5.0
+
+TIPOS_JSON_VALIDOS = {"string", "number", "integer", "boolean", "array", "object", "null"}
+
+def validar_esquema(esquema) -> list[str]:
+    """
+    Comprueba la estructura minima de un inputSchema.
+    Retorna la lista de errores encontrados (vacia si es valido)
+    """
+    errores = []
+
+    if not isinstance(esquema, dict):
+        return ["inputSchema debe ser un diccionario"]
+
+    if esquema.get("type") != "object":
+        errores.append("inputSchema debe tener \"type\": \"object\"")
+
+    propiedades = esquema.get("properties", {})
+    if not isinstance(propiedades, dict):
+        errores.append("inputSchema.properties debe ser un diccionario")
+        propiedades = {}
+
+    for nombre, definicion in propiedades.items():
+        if not isinstance(definicion, dict):
+            errores.append(f"La propiedad '{nombre}' debe ser un diccionario")
+            continue
+        tipo = definicion.get("type")
+        tipos = tipo if isinstance(tipo, list) else [tipo]
+        if tipo is not None and not all(t in TIPOS_JSON_VALIDOS for t in tipos):
+            errores.append(f"La propiedad '{nombre}' tiene un tipo no valido: {tipo}")
+
+    requeridos = esquema.get("required", [])
+    if not isinstance(requeridos, list):
+        errores.append("inputSchema.required debe ser una lista")
+    else:
+        for nombre in requeridos:
+            if nombre not in propiedades:
+                errores.append(f"El parametro requerido '{nombre}' no esta definido en properties")
+
+    return errores
+
+def _aplicar_limite_memoria(limite_mb: int):
+    """Limita la memoria del proceso actual (solo en sistemas con el modulo resource)"""
+    try:
+        import resource
+    except ImportError:
+        # En Windows no hay limite duro: la memoria se mide y se avisa
+        return
+
+    limite = limite_mb * 1024 * 1024
+    try:
+        resource.setrlimit(resource.RLIMIT_AS, (limite, limite))
+    except (ValueError, OSError):
+        pass
+
+def _comprobar_en_hijo(ruta_candidato: Path, ejecutar_ejemplos: bool) -> dict:
+    """Importa y comprueba el candidato. Se ejecuta dentro del subproceso"""
+    informe = {
+        "ok": False,
+        "nombre": None,
+        "tiempo_importacion_s": None,
+        "memoria_pico_mb": None,
+        "ejemplos": [],
+        "errores": []
+    }
+
+    # mcp.types ya esta cargado en el servidor: su coste no es imputable a la herramienta
+    try:
+        import mcp.types  # noqa: F401
+    except ImportError:
+        pass
+
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    try:
+        spec = importlib.util.spec_from_file_location("_candidato", ruta_candidato)
+        modulo = importlib.util.module_from_spec(spec)
+        sys.modules["_candidato"] = modulo
+        spec.loader.exec_module(modulo)
+    except MemoryError:
+        informe["errores"].append("Limite de memoria excedido durante la importacion")
+        return informe
+    except BaseException as e:
+        informe["errores"].append(f"Error importando el modulo: {type(e).__name__}: {e}")
+        return informe
+    finally:
+        informe["tiempo_importacion_s"] = round(time.perf_counter() - inicio, 4)
+        informe["memoria_pico_mb"] = round(tracemalloc.get_traced_memory()[1] / (1024 * 1024), 2)
+
+    # Componentes obligatorios
+    herramienta_def = getattr(modulo, "HERRAMIENTA", None)
+    if herramienta_def is None:
+        informe["errores"].append("El modulo no define HERRAMIENTA")
+    else:
+        informe["nombre"] = getattr(herramienta_def, "name", None)
+        if not informe["nombre"]:
+            informe["errores"].append("HERRAMIENTA no tiene nombre")
+        informe["errores"].extend(validar_esquema(getattr(herramienta_def, "inputSchema", None)))
+
+    funcion = getattr(modulo, "ejecutar", None)
+    if funcion is None:
+        informe["errores"].append("El modulo no define la funcion ejecutar()")
+    elif not inspect.iscoroutinefunction(funcion):
+        informe["errores"].append("ejecutar() debe ser una funcion async")
+
+    if informe["errores"]:
+        return informe
+
+    # Ejemplos declarados por la herramienta
+    if ejecutar_ejemplos:
+        for i, argumentos in enumerate(getattr(modulo, "EJEMPLOS", []) or [], 1):
+            prueba = {"ejemplo": i, "ok": False, "tiempo_s": None}
+            inicio = time.perf_counter()
+            try:
+                resultado = asyncio.run(funcion(argumentos))
+                if isinstance(resultado, list):
+                    prueba["ok"] = True
+                else:
+                    prueba["error"] = f"ejecutar() debe retornar una lista, retorno {type(resultado).__name__}"
+            except BaseException as e:
+                prueba["error"] = f"{type(e).__name__}: {e}"
+            prueba["tiempo_s"] = round(time.perf_counter() - inicio, 4)
+            informe["ejemplos"].append(prueba)
+            if not prueba["ok"]:
+                informe["errores"].append(f"El ejemplo {i} fallo: {prueba['error']}")
+
+        informe["memoria_pico_mb"] = round(tracemalloc.get_traced_memory()[1] / (1024 * 1024), 2)
+
+    informe["ok"] = not informe["errores"]
+    return informe
+
+def probar_en_aislamiento(ruta_candidato: Path, ejecutar_ejemplos: bool = True,
+                          limite_tiempo_s: float = LIMITE_TIEMPO_S,
+                          limite_memoria_mb: int = LIMITE_MEMORIA_MB) -> dict:
+    """
+    Prueba un archivo de herramienta candidato en un subproceso aislado.
+
+    Retorna un informe con 'ok', 'nombre', 'tiempo_importacion_s', 'memoria_pico_mb',
+    'ejemplos', 'errores' y 'avisos' (herramienta lenta o pesada).
+    """
+    comando = [
+        sys.executable, str(Path(__file__).resolve()), str(ruta_candidato),
+        "--limite-memoria-mb", str(limite_memoria_mb)
+    ]
+    if ejecutar_ejemplos:
+        comando.append("--ejemplos")
+
+    try:
+        proceso = subprocess.run(
+            comando,
+            cwd=RUTA_BASE,
+            stdin=subprocess.DEVNULL,
+            capture_output=True,
+            text=True,
+            encoding="utf-8",
+            errors="replace",
+            timeout=limite_tiempo_s
+        )
+    except subprocess.TimeoutExpired:
+        registrar_log(f"AISLAMIENTO: {ruta_candidato.name} excedio {limite_tiempo_s}s")
+        return {
+            "ok": False,
+            "errores": [f"Tiempo limite excedido ({limite_tiempo_s}s) al importar o ejecutar ejemplos"],
+            "avisos": []
+        }
+
+    lineas = proceso.stdout.strip().splitlines()
+    try:
+        informe = json.loads(lineas[-1])
+    except (IndexError, json.JSONDecodeError):
+        detalle = proceso.stderr.strip().splitlines()[-1:] or [f"codigo de salida {proceso.returncode}"]
+        return {
+            "ok": False,
+            "errores": [f"El proceso de prueba termino sin informe: {detalle[0]}"],
+            "avisos": []
+        }
+
+    avisos = []
+    if (informe.get("tiempo_importacion_s") or 0) > UMBRAL_IMPORTACION_LENTA_S:
+        avisos.append(f"Importacion lenta: {informe['tiempo_importacion_s']}s")
+    if (informe.get("memoria_pico_mb") or 0) > UMBRAL_MEMORIA_ALTA_MB:
+        avisos.append(f"Consumo de memoria alto: {informe['memoria_pico_mb']} MB")
+    for prueba in informe.get("ejemplos", []):
+        if (prueba.get("tiempo_s") or 0) > UMBRAL_EJEMPLO_LENTO_S:
+            avisos.append(f"Ejemplo {prueba['ejemplo']} lento: {prueba['tiempo_s']}s")
+    informe["avisos"] = avisos
+
+    registrar_log(
+        f"AISLAMIENTO: {ruta_candidato.name} ok={informe['ok']} "
+        f"importacion={informe.get('tiempo_importacion_s')}s memoria={informe.get('memoria_pico_mb')}MB"
+    )
+
+    return informe
+
+def main():
+    """Punto de entrada del proceso hijo"""
+    argumentos = sys.argv[1:]
+    if not argumentos:
+        print("Uso: python aislamiento.py <ruta_candidato> [--limite-memoria-mb N] [--ejemplos]", file=sys.stderr)
+        sys.exit(2)
+
+    ruta_candidato = Path(argumentos[0])
+    limite_memoria_mb = LIMITE_MEMORIA_MB
+    if "--limite-memoria-mb" in argumentos:
+        limite_memoria_mb = int(argumentos[argumentos.index("--limite-memoria-mb") + 1])
+
+    _aplicar_limite_memoria(limite_memoria_mb)
+
+    # La salida de la herramienta no debe contaminar el informe JSON
+    salida_real = sys.stdout
+    sys.stdout = sys.stderr
+    try:
+        informe = _comprobar_en_hijo(ruta_candidato, "--ejemplos" in argumentos)
+    finally:
+        sys.stdout = salida_real
+
+    print(json.dumps(informe))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,459 @@
+"""
+Benchmark del servidor MCP - carga, listado y llamadas a herramientas
+Autor: Francisco de la Poza
+
+Genera directorios 'herramientas/' sinteticos de 10, 100 y 1000 herramientas (con
+una parte de importaciones pesadas) y arranca servidor.py en un proceso nuevo por
+escenario, conectado a sesiones cliente en memoria (sin stdio real). Mide:
+  - arranque en frio (importar servidor.py, cargar herramientas, primer list_tools)
+  - latencia de list_tools con el registro ya cargado
+  - latencia de ida y vuelta de call_tool
+  - llamadas por segundo con varios clientes concurrentes
+
+Ademas mide, con datos generados, el motor de renombrado de fr_renombrar_ficheros,
+la exportacion a Excel de fr_revit_extractor, la agregacion de mediciones con cada
+motor disponible (pandas, numpy, python) y la union de documentos de
+fr_unir_documentos_word (esta solo si hay Word, pywin32 y python-docx).
+
+Los resultados se guardan en un JSON que puede compararse con una ejecucion
+anterior para detectar regresiones:
+
+    python benchmarks/benchmark_servidor.py
+    python benchmarks/benchmark_servidor.py --tamanos 10 100 --salida output/bench.json
+    python benchmarks/benchmark_servidor.py --comparar output/benchmark_anterior.json
+
+Con --comparar el proceso termina con codigo 1 si alguna metrica empeora mas
+que la tolerancia (20% por defecto).
+"""
+
+import argparse
+import asyncio
+import contextlib
+import importlib.util
+import io
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+RUTA_BASE = Path(__file__).resolve().parent.parent
+RUTA_HERRAMIENTAS_REALES = RUTA_BASE / "herramientas"
+RUTA_OUTPUT = RUTA_BASE / "output"
+
+if str(RUTA_BASE) not in sys.path:
+    sys.path.insert(0, str(RUTA_BASE))
+
+TAMANOS_DEFECTO = [10, 100, 1000]
+PROPORCION_PESADAS = 0.1
+REPETICIONES_LISTADO = 30
+REPETICIONES_LLAMADA = 200
+CLIENTES_CONCURRENTES = 4
+LLAMADAS_POR_CLIENTE = 50
+TOLERANCIA_DEFECTO = 0.20
+
+# Metricas en las que un valor mayor es mejor (el resto son tiempos)
+METRICAS_MAYOR_ES_MEJOR = ("llamadas_por_s", "elementos_por_s")
+
+PLANTILLA_HERRAMIENTA = '''"""
+Herramienta: {nombre}
+Descripcion: Herramienta sintetica numero {numero} para el benchmark del servidor
+Autor: Benchmark
+"""
+{importaciones}
+from mcp.types import Tool, TextContent
+{carga}
+HERRAMIENTA = Tool(
+    name="{nombre}",
+    description="Herramienta sintetica numero {numero} para el benchmark del servidor",
+    inputSchema={{
+        "type": "object",
+        "properties": {{
+            "texto": {{"type": "string", "description": "Texto de entrada"}}
+        }},
+        "required": ["texto"]
+    }}
+)
+
+async def ejecutar(argumentos: dict) -> list[TextContent]:
+    return [TextContent(type="text", text=argumentos["texto"][::-1])]
+'''
+
+IMPORTACIONES_PESADAS = "import decimal\nimport email.parser\nimport http.client\nimport sqlite3\nimport xml.dom.minidom\n"
+CARGA_PESADA = "\nTABLA = {{i: str(i) * 4 for i in range({semilla}, {semilla} + 50000)}}\n"
+
+# ---------------------------------------------------------------------------
+# Utilidades
+# ---------------------------------------------------------------------------
+
+def estadisticas(muestras_s: list[float]) -> dict:
+    """Resumen de una lista de tiempos en segundos, expresado en milisegundos"""
+    muestras_ms = sorted(m * 1000 for m in muestras_s)
+    p95 = statistics.quantiles(muestras_ms, n=20)[18] if len(muestras_ms) >= 2 else muestras_ms[0]
+    return {
+        "n": len(muestras_ms),
+        "media_ms": round(statistics.fmean(muestras_ms), 4),
+        "p50_ms": round(statistics.median(muestras_ms), 4),
+        "p95_ms": round(p95, 4),
+        "min_ms": round(muestras_ms[0], 4)
+    }
+
+def importar_herramienta(nombre_archivo: str):
+    """Importa un modulo de 'herramientas/' sin registrarlo en el servidor"""
+    ruta = RUTA_HERRAMIENTAS_REALES / nombre_archivo
+    spec = importlib.util.spec_from_file_location(f"_bench_{ruta.stem}", ruta)
+    modulo = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(modulo)
+    return modulo
+
+def generar_herramientas(directorio: Path, numero: int, proporcion_pesadas: float = PROPORCION_PESADAS):
+    """Escribe 'numero' herramientas sinteticas en 'directorio'"""
+    directorio.mkdir(parents=True, exist_ok=True)
+    cada = max(1, round(1 / proporcion_pesadas)) if proporcion_pesadas else 0
+    for i in range(numero):
+        pesada = bool(cada) and i % cada == 0
+        contenido = PLANTILLA_HERRAMIENTA.format(
+            nombre=f"FR_sintetica_{i:04d}",
+            numero=i,
+            importaciones=IMPORTACIONES_PESADAS if pesada else "",
+            carga=CARGA_PESADA.format(semilla=i) if pesada else ""
+        )
+        (directorio / f"FR_sintetica_{i:04d}.py").write_text(contenido, encoding="utf-8")
+
+# ---------------------------------------------------------------------------
+# Servidor: se ejecuta en un proceso hijo por escenario (arranque en frio real)
+# ---------------------------------------------------------------------------
+
+async def _medir_servidor(numero: int) -> dict:
+    """Mide el servidor dentro del proceso hijo. Las rutas llegan por entorno"""
+    inicio = time.perf_counter()
+    spec = importlib.util.spec_from_file_location("servidor", RUTA_BASE / "servidor.py")
+    servidor = importlib.util.module_from_spec(spec)
+    sys.modules["servidor"] = servidor
+    spec.loader.exec_module(servidor)
+    tiempo_importacion = time.perf_counter() - inicio
+
+    from mcp.shared.memory import create_connected_server_and_client_session
+
+    inicio = time.perf_counter()
+    servidor.cargar_todas_las_herramientas()
+    tiempo_carga = time.perf_counter() - inicio
+
+    resultado = {"herramientas": numero}
+
+    async with create_connected_server_and_client_session(servidor.servidor) as cliente:
+        inicio = time.perf_counter()
+        listado = await cliente.list_tools()
+        tiempo_primer_listado = time.perf_counter() - inicio
+
+        resultado["arranque_frio"] = {
+            "importar_servidor_s": round(tiempo_importacion, 4),
+            "cargar_herramientas_s": round(tiempo_carga, 4),
+            "primer_list_tools_s": round(tiempo_primer_listado, 4),
+            "total_s": round(tiempo_importacion + tiempo_carga + tiempo_primer_listado, 4)
+        }
+        resultado["herramientas_registradas"] = len(listado.tools)
+
+        muestras = []
+        for _ in range(REPETICIONES_LISTADO):
+            inicio = time.perf_counter()
+            await cliente.list_tools()
+            muestras.append(time.perf_counter() - inicio)
+        resultado["list_tools"] = estadisticas(muestras)
+
+        nombres = [f"FR_sintetica_{i:04d}" for i in range(numero)]
+        muestras = []
+        for i in range(REPETICIONES_LLAMADA):
+            inicio = time.perf_counter()
+            await cliente.call_tool(nombres[i % numero], {"texto": "benchmark"})
+            muestras.append(time.perf_counter() - inicio)
+        resultado["call_tool"] = estadisticas(muestras)
+
+    # Varios clientes concurrentes contra el mismo servidor
+    async def cliente_concurrente(semilla: int):
+        azar = random.Random(semilla)
+        async with create_connected_server_and_client_session(servidor.servidor) as cliente:
+            await cliente.list_tools()
+            for _ in range(LLAMADAS_POR_CLIENTE):
+                await cliente.call_tool(azar.choice(nombres), {"texto": "benchmark"})
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(cliente_concurrente(c) for c in range(CLIENTES_CONCURRENTES)))
+    transcurrido = time.perf_counter() - inicio
+    resultado["concurrencia"] = {
+        "clientes": CLIENTES_CONCURRENTES,
+        "llamadas": CLIENTES_CONCURRENTES * LLAMADAS_POR_CLIENTE,
+        "total_s": round(transcurrido, 4),
+        "llamadas_por_s": round(CLIENTES_CONCURRENTES * LLAMADAS_POR_CLIENTE / transcurrido, 2)
+    }
+
+    return resultado
+
+def medir_servidor(numero: int) -> dict:
+    """Genera un directorio sintetico y mide el servidor en un proceso nuevo"""
+    with tempfile.TemporaryDirectory(prefix="mcp_bench_") as temporal:
+        directorio = Path(temporal) / "herramientas"
+        generar_herramientas(directorio, numero)
+        entorno = dict(os.environ)
+        entorno["MCP_RUTA_HERRAMIENTAS"] = str(directorio)
+        entorno["MCP_RUTA_LOGS"] = str(Path(temporal) / "logs")
+        entorno["MCP_RUTA_OUTPUT"] = str(Path(temporal) / "output")
+
+        proceso = subprocess.run(
+            [sys.executable, str(Path(__file__).resolve()), "--hijo-servidor", str(numero)],
+            cwd=RUTA_BASE,
+            env=entorno,
+            capture_output=True,
+            text=True
+        )
+        if proceso.returncode != 0:
+            return {"herramientas": numero, "error": proceso.stderr.strip().splitlines()[-1:]}
+        return json.loads(proceso.stdout.strip().splitlines()[-1])
+
+# ---------------------------------------------------------------------------
+# Herramientas concretas sobre datos generados
+# ---------------------------------------------------------------------------
+
+def generar_arbol(directorio: Path, carpetas: int, archivos_por_carpeta: int):
+    """Crea un arbol de carpetas y archivos con nombres en mayusculas/minusculas mezcladas"""
+    extensiones = [".PDF", ".Dwg", ".docx", ".XLSX", ".rvt"]
+    for c in range(carpetas):
+        carpeta = directorio / f"Proyecto_{c:03d}" / f"SubCarpeta_{c % 7}"
+        carpeta.mkdir(parents=True, exist_ok=True)
+        for a in range(archivos_por_carpeta):
+            (carpeta / f"plano_DETALLE_{a:04d}{extensiones[a % len(extensiones)]}").touch()
+
+def medir_renombrado(tamanos: list[tuple[int, int]]) -> list[dict]:
+    """Mide renombrar_arbol() de fr_renombrar_ficheros sobre arboles sinteticos"""
+    try:
+        modulo = importar_herramienta("fr_renombrar_ficheros.py")
+    except Exception as e:
+        return [{"omitido": f"No se pudo importar fr_renombrar_ficheros: {e}"}]
+
+    resultados = []
+    for carpetas, archivos in tamanos:
+        with tempfile.TemporaryDirectory(prefix="mcp_bench_arbol_") as temporal:
+            generar_arbol(Path(temporal), carpetas, archivos)
+            inicio = time.perf_counter()
+            informe = modulo.renombrar_arbol(temporal)
+            transcurrido = time.perf_counter() - inicio
+        elementos = carpetas * archivos
+        resultados.append({
+            "archivos": elementos,
+            "renombrados": informe["renombrados"],
+            "total_s": round(transcurrido, 4),
+            "elementos_por_s": round(elementos / transcurrido, 1)
+        })
+    return resultados
+
+def generar_json_revit(ruta: Path, elementos_por_categoria: int):
+    """Escribe un revit_data.json sintetico con varias categorias"""
+    azar = random.Random(42)
+    tipos = ["Hormigón", "Ladrillo", "Aislante", "Madera", "Acero"]
+    niveles = ["Planta Baja", "Planta 1", "Planta 2", "Cubierta"]
+    datos = {
+        "muros": [
+            {"Nombre": f"Muro {i}", "Tipo": azar.choice(tipos), "Nivel": azar.choice(niveles),
+             "Longitud": round(azar.uniform(1, 12), 2), "Altura": 3.0, "Volumen": round(azar.uniform(1, 40), 2)}
+            for i in range(elementos_por_categoria)
+        ],
+        "puertas": [
+            {"Nombre": f"Puerta {i}", "Tipo": azar.choice(tipos), "Nivel": azar.choice(niveles),
+             "Ancho": 0.8, "Alto": 2.1, "Material": azar.choice(tipos)}
+            for i in range(elementos_por_categoria)
+        ],
+        "suelos": [
+            {"Nombre": f"Suelo {i}", "Tipo": azar.choice(tipos), "Nivel": azar.choice(niveles),
+             "Area": round(azar.uniform(5, 120), 2), "Material": azar.choice(tipos)}
+            for i in range(elementos_por_categoria)
+        ]
+    }
+    ruta.write_text(json.dumps(datos, ensure_ascii=False), encoding="utf-8")
+
+def medir_exportacion_excel(tamanos: list[int]) -> list[dict]:
+    """Mide extract_revit_data() de fr_revit_extractor sobre JSON generado"""
+    try:
+        modulo = importar_herramienta("fr_revit_extractor.py")
+    except Exception as e:
+        return [{"omitido": f"No se pudo importar fr_revit_extractor: {e}"}]
+
+    resultados = []
+    for elementos in tamanos:
+        with tempfile.TemporaryDirectory(prefix="mcp_bench_revit_") as temporal:
+            ruta_json = Path(temporal) / "revit_data.json"
+            generar_json_revit(ruta_json, elementos)
+            inicio = time.perf_counter()
+            # extract_revit_data informa de su progreso por stderr
+            with contextlib.redirect_stderr(io.StringIO()):
+                estado = modulo.extract_revit_data(None, temporal, ruta_json=str(ruta_json))
+            transcurrido = time.perf_counter() - inicio
+        resultados.append({
+            "elementos": elementos * 3,
+            "resultado": estado.split(":", 1)[0],
+            "total_s": round(transcurrido, 4),
+            "elementos_por_s": round(elementos * 3 / transcurrido, 1)
+        })
+    return resultados
+
+def medir_agregacion(tamanos: list[int]) -> list[dict]:
+    """Mide agregacion.resumir_categoria() con cada motor instalado sobre muros sinteticos"""
+    import agregacion
+
+    azar = random.Random(42)
+    tipos = ["Hormigón", "Ladrillo", "Aislante", "Madera", "Acero"]
+    niveles = ["Planta Baja", "Planta 1", "Planta 2", "Cubierta"]
+    motores = agregacion.motores_instalados()
+
+    resultados = []
+    for elementos in tamanos:
+        muros = [
+            {"Tipo": azar.choice(tipos), "Nivel": azar.choice(niveles),
+             "Longitud": azar.uniform(1, 12), "Volumen": azar.uniform(1, 40)}
+            for _ in range(elementos)
+        ]
+        for motor in motores:
+            # La primera llamada importa numpy o pandas: no se cuenta en la medicion
+            agregacion.resumir_categoria("muros", muros[:10], motor)
+            inicio = time.perf_counter()
+            agregacion.resumir_categoria("muros", muros, motor)
+            transcurrido = time.perf_counter() - inicio
+            resultados.append({
+                "elementos": elementos,
+                "motor": motor,
+                "total_s": round(transcurrido, 4),
+                "elementos_por_s": round(elementos / transcurrido, 1)
+            })
+    return resultados
+
+def medir_union_word(tamanos: list[int]) -> list[dict]:
+    """Mide unir_documentos_word() de fr_unir_documentos_word sobre .docx generados"""
+    # Sin pywin32 y python-docx no hay nada que medir
+    faltan = [m for m in ("win32com", "docx") if importlib.util.find_spec(m) is None]
+    if faltan:
+        return [{"omitido": f"Faltan dependencias: {', '.join(faltan)}"}]
+
+    from docx import Document
+    modulo = importar_herramienta("fr_unir_documentos_word.py")
+
+    resultados = []
+    for documentos in tamanos:
+        with tempfile.TemporaryDirectory(prefix="mcp_bench_word_") as temporal:
+            for i in range(documentos):
+                documento = Document()
+                for p in range(20):
+                    documento.add_paragraph(f"Documento {i}, parrafo {p}. " * 5)
+                documento.save(Path(temporal) / f"doc_{i:03d}.docx")
+            inicio = time.perf_counter()
+            informe = modulo.unir_documentos_word(temporal, "BENCHMARK_UNIFICADO")
+            transcurrido = time.perf_counter() - inicio
+        resultados.append({
+            "documentos": documentos,
+            "procesados": informe.get("archivos_procesados", 0),
+            "total_s": round(transcurrido, 4)
+        })
+    return resultados
+
+# ---------------------------------------------------------------------------
+# Comparacion entre ejecuciones
+# ---------------------------------------------------------------------------
+
+def _metricas_planas(datos, prefijo: str = "") -> dict:
+    """Aplana el JSON de resultados a {ruta.de.la.metrica: valor}"""
+    planas = {}
+    if isinstance(datos, dict):
+        for clave, valor in datos.items():
+            planas.update(_metricas_planas(valor, f"{prefijo}{clave}."))
+    elif isinstance(datos, list):
+        for i, valor in enumerate(datos):
+            planas.update(_metricas_planas(valor, f"{prefijo}{i}."))
+    elif isinstance(datos, (int, float)) and not isinstance(datos, bool):
+        planas[prefijo.rstrip(".")] = datos
+    return planas
+
+def comparar(actual: dict, anterior: dict, tolerancia: float = TOLERANCIA_DEFECTO) -> list[str]:
+    """Retorna la lista de regresiones de 'actual' respecto a 'anterior'"""
+    metricas_actuales = _metricas_planas(actual.get("resultados", {}))
+    metricas_anteriores = _metricas_planas(anterior.get("resultados", {}))
+
+    regresiones = []
+    for ruta, valor_anterior in metricas_anteriores.items():
+        ultima = ruta.rsplit(".", 1)[-1]
+        es_tiempo = ultima.endswith("_ms") or ultima.endswith("_s")
+        mayor_es_mejor = ultima in METRICAS_MAYOR_ES_MEJOR
+        if ruta not in metricas_actuales or not valor_anterior or not (es_tiempo or mayor_es_mejor):
+            continue
+        cambio = (metricas_actuales[ruta] - valor_anterior) / valor_anterior
+        if mayor_es_mejor:
+            cambio = -cambio
+        if cambio > tolerancia:
+            regresiones.append(f"{ruta}: {valor_anterior} -> {metricas_actuales[ruta]} ({cambio:+.0%})")
+    return regresiones
+
+# ---------------------------------------------------------------------------
+# Punto de entrada
+# ---------------------------------------------------------------------------
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del servidor MCP")
+    parser.add_argument("--tamanos", type=int, nargs="+", default=TAMANOS_DEFECTO,
+                        help="Numero de herramientas sinteticas por escenario")
+    parser.add_argument("--salida", type=Path, help="Archivo JSON de resultados")
+    parser.add_argument("--comparar", type=Path, help="Resultados anteriores con los que comparar")
+    parser.add_argument("--tolerancia", type=float, default=TOLERANCIA_DEFECTO,
+                        help="Empeoramiento maximo admitido (0.2 = 20%%)")
+    parser.add_argument("--solo-servidor", action="store_true", help="No medir las herramientas concretas")
+    parser.add_argument("--hijo-servidor", type=int, help=argparse.SUPPRESS)
+    argumentos = parser.parse_args()
+
+    if argumentos.hijo_servidor:
+        # Proceso hijo: el stdout solo lleva el JSON de resultados
+        with contextlib.redirect_stdout(sys.stderr):
+            resultado = asyncio.run(_medir_servidor(argumentos.hijo_servidor))
+        print(json.dumps(resultado))
+        return
+
+    resultados = {"servidor": []}
+    for numero in argumentos.tamanos:
+        print(f"Servidor con {numero} herramientas...", flush=True)
+        resultados["servidor"].append(medir_servidor(numero))
+
+    if not argumentos.solo_servidor:
+        print("Motor de renombrado...", flush=True)
+        resultados["renombrado"] = medir_renombrado([(20, 50), (100, 100)])
+        print("Exportacion Revit a Excel...", flush=True)
+        resultados["exportacion_excel"] = medir_exportacion_excel([1000, 10000])
+        print("Agregacion de mediciones...", flush=True)
+        resultados["agregacion"] = medir_agregacion([100000, 1000000])
+        print("Union de documentos Word...", flush=True)
+        resultados["union_word"] = medir_union_word([5, 20])
+
+    informe = {
+        "fecha": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "resultados": resultados
+    }
+
+    salida = argumentos.salida or RUTA_OUTPUT / f"benchmark_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    salida.parent.mkdir(parents=True, exist_ok=True)
+    salida.write_text(json.dumps(informe, indent=2, ensure_ascii=False), encoding="utf-8")
+    print(f"Resultados guardados en: {salida}")
+
+    if argumentos.comparar:
+        anterior = json.loads(argumentos.comparar.read_text(encoding="utf-8"))
+        regresiones = comparar(informe, anterior, argumentos.tolerancia)
+        if regresiones:
+            print(f"REGRESIONES (tolerancia {argumentos.tolerancia:.0%}):")
+            for linea in regresiones:
+                print(f"  - {linea}")
+            sys.exit(1)
+        print("Sin regresiones respecto a la ejecucion anterior")
+
+if __name__ == "__main__":
+    main()
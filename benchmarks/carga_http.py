@@ -0,0 +1,386 @@
+"""
+Prueba de carga del transporte HTTP - varios clientes contra un servidor compartido
+Autor: Francisco de la Poza
+
+Arranca servidor.py en modo HTTP (ver transporte_http.py) sobre un directorio de
+herramientas sinteticas (las del benchmark del servidor mas FR_sintetica_lenta,
+que espera unos milisegundos con asyncio.sleep, y FR_sintetica_bloqueante, que
+los espera con time.sleep como las herramientas que recorren carpetas o escriben
+Excel) y lanza clientes MCP simulados desde este proceso.
+Mide:
+  - conexion de un cliente nuevo: proceso stdio propio frente a una sesion HTTP
+    contra el servidor ya caliente
+  - latencia y llamadas por segundo con varios clientes concurrentes, por
+    streamable HTTP y por SSE
+  - limite por cliente: un cliente lanza de golpe mas llamadas lentas de las que
+    admite el servidor; se comprueba que solo se rechaza el exceso, que el resto
+    se atiende en tandas de 'llamadas_por_cliente' y que otro cliente conectado
+    a la vez no espera detras de el
+  - herramientas bloqueantes: mientras un cliente ocupa sus turnos con llamadas
+    sincronas, otro cliente hace llamadas rapidas; su latencia no debe crecer
+    (las herramientas sincronas se ejecutan fuera del bucle de eventos)
+
+Los limites son los de la seccion "transporte" de config.json.
+
+    python benchmarks/carga_http.py
+    python benchmarks/carga_http.py --clientes 16 --llamadas 100 --herramientas 100
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import math
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+RUTA_BASE = Path(__file__).resolve().parent.parent
+RUTA_OUTPUT = RUTA_BASE / "output"
+
+for ruta in (RUTA_BASE, Path(__file__).resolve().parent):
+    if str(ruta) not in sys.path:
+        sys.path.insert(0, str(ruta))
+
+from mcp import ClientSession, StdioServerParameters
+from mcp.client.sse import sse_client
+from mcp.client.stdio import stdio_client
+from mcp.client.streamable_http import streamable_http_client
+
+from benchmark_servidor import estadisticas, generar_herramientas
+from comun import cargar_configuracion
+import transporte_http
+
+HERRAMIENTAS_DEFECTO = 50
+CLIENTES_DEFECTO = 8
+LLAMADAS_DEFECTO = 50
+ESPERA_LENTA_MS = 200
+REPETICIONES_CONEXION_STDIO = 3
+REPETICIONES_CONEXION_HTTP = 10
+REPETICIONES_VECINO = 10
+EXCESO_RAFAGA = 8
+TIEMPO_ARRANQUE_S = 60
+
+PLANTILLA_LENTA = '''"""
+Herramienta: FR_sintetica_lenta
+Descripcion: Herramienta sintetica que tarda espera_ms milisegundos (prueba de carga HTTP)
+Autor: Benchmark
+"""
+import asyncio
+
+from mcp.types import Tool, TextContent
+
+HERRAMIENTA = Tool(
+    name="FR_sintetica_lenta",
+    description="Herramienta sintetica que tarda espera_ms milisegundos (prueba de carga HTTP)",
+    inputSchema={
+        "type": "object",
+        "properties": {
+            "texto": {"type": "string", "description": "Texto de entrada"},
+            "espera_ms": {"type": "integer", "minimum": 0, "description": "Milisegundos de espera"}
+        },
+        "required": ["texto"]
+    }
+)
+
+# Cada llamada ocupa su propio turno aunque coincidan los argumentos
+COALESCER = False
+
+async def ejecutar(argumentos: dict) -> list[TextContent]:
+    await asyncio.sleep(argumentos.get("espera_ms", 50) / 1000)
+    return [TextContent(type="text", text=argumentos["texto"])]
+'''
+
+PLANTILLA_BLOQUEANTE = '''"""
+Herramienta: FR_sintetica_bloqueante
+Descripcion: Herramienta sintetica que bloquea su hilo espera_ms milisegundos (prueba de carga HTTP)
+Autor: Benchmark
+"""
+import time
+
+from mcp.types import Tool, TextContent
+
+HERRAMIENTA = Tool(
+    name="FR_sintetica_bloqueante",
+    description="Herramienta sintetica que bloquea su hilo espera_ms milisegundos (prueba de carga HTTP)",
+    inputSchema={
+        "type": "object",
+        "properties": {
+            "texto": {"type": "string", "description": "Texto de entrada"},
+            "espera_ms": {"type": "integer", "minimum": 0, "description": "Milisegundos de espera"}
+        },
+        "required": ["texto"]
+    }
+)
+
+COALESCER = False
+
+async def ejecutar(argumentos: dict) -> list[TextContent]:
+    time.sleep(argumentos.get("espera_ms", 50) / 1000)
+    return [TextContent(type="text", text=argumentos["texto"])]
+'''
+
+# ---------------------------------------------------------------------------
+# Servidor HTTP en un proceso hijo
+# ---------------------------------------------------------------------------
+
+def puerto_libre() -> int:
+    """Puerto TCP libre en localhost"""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def esperar_puerto(proceso: subprocess.Popen, puerto: int, limite_s: float = TIEMPO_ARRANQUE_S) -> float:
+    """Espera a que el servidor acepte conexiones. Retorna los segundos de arranque"""
+    inicio = time.perf_counter()
+    while time.perf_counter() - inicio < limite_s:
+        if proceso.poll() is not None:
+            raise RuntimeError(f"el servidor termino al arrancar (codigo {proceso.returncode})")
+        with contextlib.suppress(OSError), socket.create_connection(("127.0.0.1", puerto), timeout=0.2):
+            return time.perf_counter() - inicio
+        time.sleep(0.05)
+    raise TimeoutError(f"el servidor no escucha en el puerto {puerto} tras {limite_s}s")
+
+@contextlib.contextmanager
+def servidor_http(entorno: dict, puerto: int, registro: Path):
+    """Arranca servidor.py --transporte http y lo detiene al salir"""
+    with open(registro, "w", encoding="utf-8") as salida_errores:
+        proceso = subprocess.Popen(
+            [sys.executable, str(RUTA_BASE / "servidor.py"), "--transporte", "http", "--puerto", str(puerto)],
+            cwd=RUTA_BASE,
+            env=entorno,
+            stdout=subprocess.DEVNULL,
+            stderr=salida_errores
+        )
+        try:
+            yield proceso, esperar_puerto(proceso, puerto)
+        finally:
+            proceso.terminate()
+            try:
+                proceso.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                proceso.kill()
+
+# ---------------------------------------------------------------------------
+# Clientes simulados
+# ---------------------------------------------------------------------------
+
+@contextlib.asynccontextmanager
+async def abrir_sesion(base: str, transporte: str = "http"):
+    """Sesion MCP inicializada contra el servidor HTTP (streamable HTTP o SSE)"""
+    conexion = sse_client(f"{base}{transporte_http.RUTA_SSE}") if transporte == "sse" else streamable_http_client(f"{base}{transporte_http.RUTA_MCP}")
+    async with conexion as flujos:
+        async with ClientSession(flujos[0], flujos[1]) as sesion:
+            await sesion.initialize()
+            yield sesion
+
+def es_error(respuesta) -> bool:
+    """La llamada fallo (error de protocolo o texto de error del servidor)"""
+    texto = respuesta.content[0].text if respuesta.content else ""
+    return bool(respuesta.isError) or texto.startswith("ERROR")
+
+async def medir_conexion(base: str, entorno: dict) -> dict:
+    """Tiempo hasta el primer list_tools de un cliente nuevo: proceso stdio propio o sesion HTTP"""
+    parametros = StdioServerParameters(
+        command=sys.executable,
+        args=[str(RUTA_BASE / "servidor.py"), "--transporte", "stdio"],
+        env=entorno,
+        cwd=RUTA_BASE
+    )
+    muestras_stdio = []
+    for _ in range(REPETICIONES_CONEXION_STDIO):
+        inicio = time.perf_counter()
+        async with stdio_client(parametros) as (lectura, escritura):
+            async with ClientSession(lectura, escritura) as sesion:
+                await sesion.initialize()
+                await sesion.list_tools()
+                muestras_stdio.append(time.perf_counter() - inicio)
+
+    muestras_http = []
+    for _ in range(REPETICIONES_CONEXION_HTTP):
+        inicio = time.perf_counter()
+        async with abrir_sesion(base) as sesion:
+            await sesion.list_tools()
+            muestras_http.append(time.perf_counter() - inicio)
+
+    return {"stdio_proceso_nuevo": estadisticas(muestras_stdio), "http_servidor_caliente": estadisticas(muestras_http)}
+
+async def medir_carga(base: str, transporte: str, clientes: int, llamadas: int, nombres: list[str]) -> dict:
+    """Varios clientes, cada uno con su sesion, haciendo llamadas seguidas"""
+    latencias = []
+    errores = 0
+
+    async def cliente(semilla: int):
+        nonlocal errores
+        azar = random.Random(semilla)
+        async with abrir_sesion(base, transporte) as sesion:
+            await sesion.list_tools()
+            for i in range(llamadas):
+                inicio = time.perf_counter()
+                respuesta = await sesion.call_tool(azar.choice(nombres), {"texto": f"carga {semilla} {i}"})
+                latencias.append(time.perf_counter() - inicio)
+                errores += es_error(respuesta)
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(cliente(c) for c in range(clientes)))
+    transcurrido = time.perf_counter() - inicio
+    return {
+        "transporte": transporte,
+        "clientes": clientes,
+        "llamadas": clientes * llamadas,
+        "errores": errores,
+        "total_s": round(transcurrido, 4),
+        "llamadas_por_s": round(clientes * llamadas / transcurrido, 2),
+        "call_tool": estadisticas(latencias)
+    }
+
+async def medir_limite(base: str, llamadas_por_cliente: int, en_espera_por_cliente: int, espera_ms: int = ESPERA_LENTA_MS) -> dict:
+    """Un cliente lanza una rafaga de llamadas lentas mientras otro hace una sola"""
+    rafaga = llamadas_por_cliente + en_espera_por_cliente + EXCESO_RAFAGA
+
+    async with abrir_sesion(base) as inundador, abrir_sesion(base) as vecino:
+        inicio = time.perf_counter()
+        tarea = asyncio.gather(*(
+            inundador.call_tool("FR_sintetica_lenta", {"texto": f"rafaga {i}", "espera_ms": espera_ms})
+            for i in range(rafaga)
+        ))
+        await asyncio.sleep(espera_ms / 1000)
+        inicio_vecino = time.perf_counter()
+        respuesta_vecino = await vecino.call_tool("FR_sintetica_lenta", {"texto": "vecino", "espera_ms": espera_ms})
+        latencia_vecino = time.perf_counter() - inicio_vecino
+        respuestas = await tarea
+        transcurrido = time.perf_counter() - inicio
+
+    rechazadas = sum(es_error(r) for r in respuestas)
+    atendidas = rafaga - rechazadas
+    return {
+        "rafaga": rafaga,
+        "llamadas_por_cliente": llamadas_por_cliente,
+        "en_espera_por_cliente": en_espera_por_cliente,
+        "rechazadas": rechazadas,
+        "rechazadas_esperadas": max(0, rafaga - llamadas_por_cliente - en_espera_por_cliente),
+        "total_s": round(transcurrido, 4),
+        "total_minimo_s": round(math.ceil(atendidas / llamadas_por_cliente) * espera_ms / 1000, 4),
+        "vecino_ms": round(latencia_vecino * 1000, 2),
+        "vecino_error": es_error(respuesta_vecino)
+    }
+
+async def medir_bloqueantes(base: str, llamadas_por_cliente: int, nombres: list[str], espera_ms: int = ESPERA_LENTA_MS) -> dict:
+    """Un cliente ocupa sus turnos con llamadas bloqueantes mientras otro hace llamadas rapidas"""
+    async with abrir_sesion(base) as ocupado, abrir_sesion(base) as vecino:
+        await vecino.call_tool(nombres[0], {"texto": "calentar"})
+        latencias_solo = []
+        for i in range(REPETICIONES_VECINO):
+            inicio = time.perf_counter()
+            await vecino.call_tool(nombres[i % len(nombres)], {"texto": f"solo {i}"})
+            latencias_solo.append(time.perf_counter() - inicio)
+
+        tarea = asyncio.gather(*(
+            ocupado.call_tool("FR_sintetica_bloqueante", {"texto": f"bloqueante {i}", "espera_ms": espera_ms})
+            for i in range(llamadas_por_cliente)
+        ))
+        await asyncio.sleep(espera_ms / 4000)
+        latencias = []
+        for i in range(REPETICIONES_VECINO):
+            inicio = time.perf_counter()
+            await vecino.call_tool(nombres[i % len(nombres)], {"texto": f"vecino {i}"})
+            latencias.append(time.perf_counter() - inicio)
+        respuestas = await tarea
+
+    return {
+        "bloqueantes": llamadas_por_cliente,
+        "espera_ms": espera_ms,
+        "errores": sum(es_error(r) for r in respuestas),
+        "vecino_solo": estadisticas(latencias_solo),
+        "vecino_con_bloqueantes": estadisticas(latencias)
+    }
+
+# ---------------------------------------------------------------------------
+# Principal
+# ---------------------------------------------------------------------------
+
+async def medir(base: str, entorno: dict, argumentos, nombres: list[str]) -> dict:
+    configuracion = cargar_configuracion().get("transporte", {})
+    resultados = {}
+    print("Conexion de un cliente nuevo (stdio frente a HTTP)...", flush=True)
+    resultados["conexion"] = await medir_conexion(base, entorno)
+    resultados["carga"] = []
+    for transporte in ("http", "sse"):
+        print(f"{argumentos.clientes} clientes x {argumentos.llamadas} llamadas por {transporte}...", flush=True)
+        resultados["carga"].append(await medir_carga(base, transporte, argumentos.clientes, argumentos.llamadas, nombres))
+    print("Limite de llamadas por cliente...", flush=True)
+    resultados["limite_por_cliente"] = await medir_limite(
+        base,
+        configuracion.get("llamadas_por_cliente", transporte_http.LLAMADAS_POR_CLIENTE),
+        configuracion.get("en_espera_por_cliente", transporte_http.EN_ESPERA_POR_CLIENTE)
+    )
+    print("Herramientas bloqueantes de otro cliente...", flush=True)
+    resultados["bloqueantes"] = await medir_bloqueantes(
+        base,
+        configuracion.get("llamadas_por_cliente", transporte_http.LLAMADAS_POR_CLIENTE),
+        nombres
+    )
+    return resultados
+
+def main():
+    parser = argparse.ArgumentParser(description="Prueba de carga del transporte HTTP del servidor MCP")
+    parser.add_argument("--herramientas", type=int, default=HERRAMIENTAS_DEFECTO, help="Herramientas sinteticas")
+    parser.add_argument("--clientes", type=int, default=CLIENTES_DEFECTO, help="Clientes concurrentes")
+    parser.add_argument("--llamadas", type=int, default=LLAMADAS_DEFECTO, help="Llamadas por cliente")
+    parser.add_argument("--salida", type=Path, help="Archivo JSON de resultados")
+    argumentos = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="mcp_carga_") as temporal:
+        directorio = Path(temporal) / "herramientas"
+        generar_herramientas(directorio, argumentos.herramientas)
+        (directorio / "FR_sintetica_lenta.py").write_text(PLANTILLA_LENTA, encoding="utf-8")
+        (directorio / "FR_sintetica_bloqueante.py").write_text(PLANTILLA_BLOQUEANTE, encoding="utf-8")
+        entorno = dict(os.environ)
+        entorno["MCP_RUTA_HERRAMIENTAS"] = str(directorio)
+        entorno["MCP_RUTA_LOGS"] = str(Path(temporal) / "logs")
+        entorno["MCP_RUTA_OUTPUT"] = str(Path(temporal) / "output")
+        nombres = [f"FR_sintetica_{i:04d}" for i in range(argumentos.herramientas)]
+
+        puerto = puerto_libre()
+        with servidor_http(entorno, puerto, Path(temporal) / "servidor_stderr.log") as (_, arranque_s):
+            print(f"Servidor HTTP en el puerto {puerto} (arranque {arranque_s:.2f}s)", flush=True)
+            resultados = asyncio.run(medir(f"http://127.0.0.1:{puerto}", entorno, argumentos, nombres))
+        resultados["arranque_servidor_http_s"] = round(arranque_s, 4)
+
+    informe = {
+        "fecha": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "herramientas": argumentos.herramientas,
+        "resultados": resultados
+    }
+
+    conexion = resultados["conexion"]
+    print(f"Cliente nuevo: stdio {conexion['stdio_proceso_nuevo']['p50_ms']} ms, HTTP {conexion['http_servidor_caliente']['p50_ms']} ms (p50)")
+    for carga in resultados["carga"]:
+        print(f"{carga['transporte']}: {carga['llamadas_por_s']} llamadas/s, p95 {carga['call_tool']['p95_ms']} ms, {carga['errores']} errores")
+    limite = resultados["limite_por_cliente"]
+    print(
+        f"Limite por cliente: {limite['rechazadas']}/{limite['rafaga']} rechazadas (esperadas {limite['rechazadas_esperadas']}), "
+        f"{limite['total_s']}s (minimo {limite['total_minimo_s']}s), otro cliente {limite['vecino_ms']} ms"
+    )
+    bloqueantes = resultados["bloqueantes"]
+    print(
+        f"Herramientas bloqueantes: otro cliente {bloqueantes['vecino_con_bloqueantes']['p50_ms']} ms "
+        f"(sin ellas {bloqueantes['vecino_solo']['p50_ms']} ms, p50), {bloqueantes['errores']} errores"
+    )
+
+    salida = argumentos.salida or RUTA_OUTPUT / f"carga_http_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    salida.parent.mkdir(parents=True, exist_ok=True)
+    salida.write_text(json.dumps(informe, indent=2, ensure_ascii=False), encoding="utf-8")
+    print(f"Resultados guardados en: {salida}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+"""
+Busqueda - Indice invertido en memoria sobre las herramientas registradas
+Autor: Francisco de la Poza
+
+Indexa el nombre, la descripcion y las descripciones de los parametros del
+inputSchema de cada herramienta. Los textos se normalizan sin acentos ni
+mayusculas y con un recorte sencillo de plurales en castellano. Las palabras de
+la consulta que no aparecen tal cual se buscan por similitud de trigramas, de
+modo que "renombar" o "exel" tambien encuentran resultados.
+
+servidor.py actualiza el indice cada vez que registra o quita una herramienta, y
+la herramienta interna FR_buscar_herramientas responde consultando solo el indice.
+"""
+
+import math
+import re
+import time
+import unicodedata
+from collections import defaultdict
+
+from mcp.types import Tool, TextContent
+
+# Peso de cada campo en la puntuacion
+PESO_NOMBRE = 3.0
+PESO_DESCRIPCION = 2.0
+PESO_PARAMETROS = 1.0
+
+# Similitud minima de trigramas para considerar una palabra parecida
+SIMILITUD_MINIMA = 0.35
+
+RESULTADOS_DEFECTO = 5
+
+PALABRAS_VACIAS = {
+    "a", "al", "con", "de", "del", "el", "en", "es", "la", "las", "lo", "los",
+    "o", "para", "por", "que", "se", "si", "sin", "su", "sus", "un", "una", "y",
+    "fr", "herramienta"
+}
+
+def normalizar(texto: str) -> str:
+    """Pasa a minusculas y elimina acentos y dieresis"""
+    descompuesto = unicodedata.normalize("NFD", texto.lower())
+    return "".join(c for c in descompuesto if not unicodedata.combining(c))
+
+def _raiz(palabra: str) -> str:
+    """Recorte minimo de plurales: 'ficheros' -> 'fichero', 'directorios' -> 'directorio'"""
+    if len(palabra) > 4 and palabra.endswith("es") and palabra[-3] not in "aeiou":
+        return palabra[:-2]
+    if len(palabra) > 3 and palabra.endswith("s"):
+        return palabra[:-1]
+    return palabra
+
+def tokenizar(texto: str) -> list[str]:
+    """Divide un texto en palabras normalizadas, sin palabras vacias"""
+    palabras = re.findall(r"[a-z0-9]+", normalizar(texto))
+    return [_raiz(p) for p in palabras if p not in PALABRAS_VACIAS]
+
+def trigramas(palabra: str) -> set[str]:
+    """Trigramas de una palabra con relleno en los extremos"""
+    relleno = f"  {palabra} "
+    return {relleno[i:i + 3] for i in range(len(relleno) - 2)}
+
+class IndiceBusqueda:
+    """Indice invertido con busqueda aproximada por trigramas"""
+
+    def __init__(self):
+        # palabra -> {nombre_herramienta: peso}
+        self.postings = defaultdict(dict)
+        # trigrama -> palabras del vocabulario que lo contienen
+        self.trigramas = defaultdict(set)
+        # nombre_herramienta -> palabras indexadas (para poder quitarla)
+        self.palabras_por_herramienta = {}
+        self.definiciones = {}
+
+    def __len__(self):
+        return len(self.definiciones)
+
+    def agregar(self, definicion: Tool):
+        """Indexa (o reindexa) una herramienta"""
+        nombre = definicion.name
+        self.quitar(nombre)
+
+        pesos = defaultdict(float)
+        for palabra in tokenizar(nombre.replace("_", " ")):
+            pesos[palabra] += PESO_NOMBRE
+        for palabra in tokenizar(definicion.description or ""):
+            pesos[palabra] += PESO_DESCRIPCION
+
+        propiedades = (definicion.inputSchema or {}).get("properties", {})
+        for nombre_parametro, propiedad in propiedades.items():
+            texto = f"{nombre_parametro.replace('_', ' ')} {propiedad.get('description', '')}"
+            for palabra in tokenizar(texto):
+                pesos[palabra] += PESO_PARAMETROS
+
+        for palabra, peso in pesos.items():
+            if not self.postings[palabra]:
+                for trigrama in trigramas(palabra):
+                    self.trigramas[trigrama].add(palabra)
+            self.postings[palabra][nombre] = peso
+
+        self.palabras_por_herramienta[nombre] = set(pesos)
+        self.definiciones[nombre] = definicion
+
+    def quitar(self, nombre: str):
+        """Quita una herramienta del indice"""
+        for palabra in self.palabras_por_herramienta.pop(nombre, ()):
+            herramientas = self.postings[palabra]
+            herramientas.pop(nombre, None)
+            if not herramientas:
+                del self.postings[palabra]
+                for trigrama in trigramas(palabra):
+                    self.trigramas[trigrama].discard(palabra)
+                    if not self.trigramas[trigrama]:
+                        del self.trigramas[trigrama]
+        self.definiciones.pop(nombre, None)
+
+    def _palabras_parecidas(self, palabra: str) -> list[tuple[str, float]]:
+        """Palabras del vocabulario parecidas a 'palabra' con su similitud (0-1)"""
+        if palabra in self.postings:
+            parecidas = [(palabra, 1.0)]
+        else:
+            parecidas = []
+
+        propios = trigramas(palabra)
+        coincidencias = defaultdict(int)
+        for trigrama in propios:
+            for candidata in self.trigramas.get(trigrama, ()):
+                coincidencias[candidata] += 1
+
+        for candidata, comunes in coincidencias.items():
+            if candidata == palabra:
+                continue
+            similitud = comunes / (len(propios) + len(trigramas(candidata)) - comunes)
+            # Un prefijo de la palabra del indice cuenta como coincidencia casi exacta
+            if len(palabra) >= 3 and candidata.startswith(palabra):
+                similitud = max(similitud, 0.9)
+            if similitud >= SIMILITUD_MINIMA:
+                parecidas.append((candidata, similitud))
+        return parecidas
+
+    def buscar(self, consulta: str, k: int = RESULTADOS_DEFECTO) -> list[tuple[str, float]]:
+        """Retorna las k herramientas mas relevantes como [(nombre, puntuacion)]"""
+        total = len(self.definiciones)
+        if not total:
+            return []
+
+        puntuaciones = defaultdict(float)
+        for palabra in set(tokenizar(consulta)):
+            mejor_por_herramienta = {}
+            for candidata, similitud in self._palabras_parecidas(palabra):
+                herramientas = self.postings[candidata]
+                idf = math.log(1 + total / len(herramientas))
+                for nombre, peso in herramientas.items():
+                    valor = similitud * peso * idf
+                    if valor > mejor_por_herramienta.get(nombre, 0.0):
+                        mejor_por_herramienta[nombre] = valor
+            for nombre, valor in mejor_por_herramienta.items():
+                puntuaciones[nombre] += valor
+
+        ordenadas = sorted(puntuaciones.items(), key=lambda x: (-x[1], x[0]))
+        return ordenadas[:k]
+
+# Definicion de la herramienta interna
+HERRAMIENTA = Tool(
+    name="FR_buscar_herramientas",
+    description="Busca entre las herramientas registradas por nombre, descripcion y parametros (sin distinguir acentos y tolerando errores de escritura) y devuelve las mas relevantes",
+    inputSchema={
+        "type": "object",
+        "properties": {
+            "consulta": {
+                "type": "string",
+                "description": "Texto a buscar. Ej: renombrar carpetas, exportar excel revit"
+            },
+            "max_resultados": {
+                "type": "integer",
+                "description": f"Numero maximo de resultados. Por defecto: {RESULTADOS_DEFECTO}"
+            }
+        },
+        "required": ["consulta"]
+    }
+)
+
+def crear_ejecutor(indice: IndiceBusqueda):
+    """Crea la funcion ejecutar() de FR_buscar_herramientas sobre un indice concreto"""
+
+    async def ejecutar(argumentos: dict) -> list[TextContent]:
+        """Ejecuta la herramienta FR_buscar_herramientas"""
+        consulta = argumentos.get("consulta", "")
+        k = max(1, int(argumentos.get("max_resultados") or RESULTADOS_DEFECTO))
+
+        inicio = time.perf_counter()
+        resultados = indice.buscar(consulta, k)
+        milisegundos = (time.perf_counter() - inicio) * 1000
+
+        if not resultados:
+            return [TextContent(type="text", text=f"No se encontraron herramientas para: {consulta}")]
+
+        lineas = [f"Resultados para '{consulta}' ({milisegundos:.2f} ms):", ""]
+        for posicion, (nombre, puntuacion) in enumerate(resultados, 1):
+            definicion = indice.definiciones[nombre]
+            esquema = definicion.inputSchema or {}
+            requeridos = esquema.get("required", [])
+            opcionales = [p for p in esquema.get("properties", {}) if p not in requeridos]
+            lineas.append(f"{posicion}. {nombre}  (relevancia {puntuacion:.2f})")
+            lineas.append(f"   {definicion.description}")
+            if requeridos:
+                lineas.append(f"   Parametros requeridos: {', '.join(requeridos)}")
+            if opcionales:
+                lineas.append(f"   Parametros opcionales: {', '.join(opcionales)}")
+            lineas.append("")
+
+        return [TextContent(type="text", text="\n".join(lineas))]
+
+    return ejecutar
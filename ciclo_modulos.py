@@ -0,0 +1,112 @@
+"""
+Ciclo de vida de los modulos de herramientas
+Autor: Francisco de la Poza
+
+Los modulos de 'herramientas/' se registran bajo un paquete privado
+('_herramientas_mcp.<nombre>_<hash de la ruta>') en lugar de usar el nombre del
+archivo directamente en sys.modules. Asi:
+  - dos archivos cuyo nombre solo difiere en mayusculas no chocan,
+  - al recargar o borrar una herramienta su modulo anterior se quita de
+    sys.modules y del paquete, y deja de estar referenciado,
+  - se puede comprobar cuantos modulos siguen vivos y cuantos descargados no
+    se han liberado todavia (por ejemplo, una llamada en curso que aun los usa).
+"""
+
+import gc
+import hashlib
+import importlib.util
+import sys
+import types
+import weakref
+from pathlib import Path
+
+from comun import memoria_proceso_mb
+
+PAQUETE = "_herramientas_mcp"
+
+class GestorModulos:
+    """Carga, descarga y contabiliza los modulos de herramientas"""
+
+    def __init__(self, paquete: str = PAQUETE):
+        self.paquete = paquete
+        self.modulos = {}
+        self.descargados = 0
+        # Referencias debiles a modulos descargados para detectar los que no se liberan
+        self._pendientes = weakref.WeakSet()
+
+    def _paquete(self) -> types.ModuleType:
+        """Retorna (creandolo si hace falta) el paquete privado en sys.modules"""
+        paquete = sys.modules.get(self.paquete)
+        if paquete is None:
+            paquete = types.ModuleType(self.paquete, "Modulos de herramientas cargados por el servidor")
+            paquete.__path__ = []
+            sys.modules[self.paquete] = paquete
+        return paquete
+
+    def nombre_modulo(self, ruta: Path) -> str:
+        """Nombre unico y estable del modulo de una herramienta"""
+        ruta_completa = str(Path(ruta).resolve())
+        sufijo = hashlib.sha1(ruta_completa.encode("utf-8")).hexdigest()[:8]
+        identificador = "".join(c if c.isalnum() else "_" for c in Path(ruta).stem.lower())
+        return f"{identificador}_{sufijo}"
+
+    def cargar(self, ruta: Path) -> types.ModuleType:
+        """
+        Importa (o reimporta) el archivo de una herramienta.
+        Si la importacion falla, no queda ningun modulo a medias registrado.
+        """
+        self.descargar(ruta)
+
+        nombre = self.nombre_modulo(ruta)
+        nombre_completo = f"{self.paquete}.{nombre}"
+        paquete = self._paquete()
+
+        spec = importlib.util.spec_from_file_location(nombre_completo, ruta)
+        modulo = importlib.util.module_from_spec(spec)
+        sys.modules[nombre_completo] = modulo
+        try:
+            spec.loader.exec_module(modulo)
+        except BaseException:
+            sys.modules.pop(nombre_completo, None)
+            raise
+
+        setattr(paquete, nombre, modulo)
+        self.modulos[Path(ruta)] = nombre
+        return modulo
+
+    def descargar(self, ruta: Path) -> bool:
+        """Quita el modulo de una herramienta de sys.modules y del paquete"""
+        nombre = self.modulos.pop(Path(ruta), None)
+        if nombre is None:
+            return False
+
+        nombre_completo = f"{self.paquete}.{nombre}"
+        modulo = sys.modules.pop(nombre_completo, None)
+        # Submodulos que la herramienta hubiera registrado bajo su propio nombre
+        for clave in [c for c in sys.modules if c.startswith(f"{nombre_completo}.")]:
+            del sys.modules[clave]
+
+        paquete = sys.modules.get(self.paquete)
+        if paquete is not None and hasattr(paquete, nombre):
+            delattr(paquete, nombre)
+
+        if modulo is not None:
+            self._pendientes.add(modulo)
+        self.descargados += 1
+        return True
+
+    def liberar(self) -> int:
+        """Fuerza la recoleccion de basura y retorna los modulos descargados aun vivos"""
+        gc.collect()
+        return len(self._pendientes)
+
+    def estado(self) -> dict:
+        """Modulos vivos, descargados pendientes de liberar y memoria del proceso"""
+        prefijo = f"{self.paquete}."
+        return {
+            "modulos_vivos": sum(1 for clave in list(sys.modules) if clave.startswith(prefijo)),
+            "modulos_registrados": len(self.modulos),
+            "descargados": self.descargados,
+            "pendientes_de_liberar": len(self._pendientes),
+            "memoria_mb": round(memoria_proceso_mb(), 1)
+        }
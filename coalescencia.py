@@ -0,0 +1,143 @@
+"""
+Coalescencia - Una sola ejecucion para llamadas identicas en curso
+Autor: Francisco de la Poza
+
+Si el cliente reintenta tras una respuesta lenta o lanza dos veces la misma
+llamada, la segunda no vuelve a ejecutar la herramienta: espera a la ejecucion
+que ya esta en curso y recibe su mismo resultado (o su misma excepcion). Dos
+llamadas son identicas si coinciden la herramienta y los argumentos, comparados
+en forma canonica (JSON con las claves ordenadas).
+
+Las herramientas pueden declarar a nivel de modulo:
+    COALESCER = False
+        cada llamada se ejecuta siempre, aunque haya otra identica en curso
+    RECURSO_EXCLUSIVO = "clave"  o  RECURSO_EXCLUSIVO = funcion(argumentos) -> clave
+        las llamadas con la misma clave de recurso (por ejemplo, la ruta de un
+        directorio) se ejecutan de una en una, aunque sean de herramientas distintas
+
+recurso_herramienta y recurso_directorio son las claves de recurso comunes a
+varias herramientas. Los recursos de directorio no se comparan por igualdad: una
+llamada sobre /a espera tambien a las que estan trabajando en /a/b o en / (los
+arboles se solapan).
+"""
+
+import asyncio
+import json
+import os
+from pathlib import PurePath
+
+# Prefijo de las claves de recurso de directorio (ver recurso_directorio)
+PREFIJO_DIRECTORIO = "directorio:"
+
+# Recurso de las llamadas que eligen el directorio con un dialogo: la ruta no se
+# conoce hasta que el usuario la selecciona, asi que se ejecutan de una en una
+RECURSO_SELECCION_INTERACTIVA = "seleccion_interactiva_directorio"
+
+def clave_llamada(nombre: str, argumentos: dict) -> str:
+    """Clave canonica de una llamada: herramienta y argumentos con las claves ordenadas"""
+    return nombre + "\0" + json.dumps(argumentos, sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str)
+
+def recurso_herramienta(argumentos: dict) -> str:
+    """Archivo de la herramienta indicada en 'nombre' (generar y restaurar no deben solaparse)"""
+    return f"herramienta:fr_{str(argumentos.get('nombre', '')).strip().lower()}"
+
+def recurso_directorio(argumento: str = "directorio"):
+    """
+    Clave de recurso por directorio: la ruta del argumento indicado, normalizada
+    (absoluta, sin enlaces y, en Windows, sin distinguir mayusculas). Sin ese
+    argumento se usa RECURSO_SELECCION_INTERACTIVA.
+    """
+    def clave(argumentos: dict) -> str:
+        ruta = argumentos.get(argumento)
+        if not ruta:
+            return RECURSO_SELECCION_INTERACTIVA
+        return PREFIJO_DIRECTORIO + os.path.normcase(os.path.realpath(str(ruta)))
+    return clave
+
+def directorios_solapados(a: tuple, b: tuple) -> bool:
+    """Dos rutas (como PurePath.parts) se solapan si una contiene a la otra"""
+    return a[:len(b)] == b or b[:len(a)] == a
+
+def _recuperar_excepcion(tarea: asyncio.Task):
+    """Evita el aviso 'exception was never retrieved' si nadie espera ya la tarea"""
+    if not tarea.cancelled():
+        tarea.exception()
+
+class CoordinadorLlamadas:
+    """Comparte las ejecuciones en curso y serializa las que usan el mismo recurso"""
+
+    def __init__(self):
+        self.en_curso = {}
+        self.cerrojos = {}
+        self.compartidas = 0
+        # Directorios en uso (como PurePath.parts) y aviso de que alguno se libero
+        self.directorios_activos = []
+        self._cambio_directorios = asyncio.Condition()
+
+    def recurso(self, recurso_exclusivo, argumentos: dict):
+        """Clave de recurso de una llamada segun lo declarado por la herramienta"""
+        if recurso_exclusivo is None:
+            return None
+        if callable(recurso_exclusivo):
+            return recurso_exclusivo(argumentos)
+        return str(recurso_exclusivo)
+
+    async def _con_directorio(self, ruta: str, fabrica):
+        """Ejecuta la llamada cuando ningun directorio en uso se solapa con 'ruta'"""
+        partes = PurePath(ruta).parts
+        async with self._cambio_directorios:
+            await self._cambio_directorios.wait_for(
+                lambda: not any(directorios_solapados(partes, activo) for activo in self.directorios_activos)
+            )
+            self.directorios_activos.append(partes)
+        try:
+            return await fabrica()
+        finally:
+            async with self._cambio_directorios:
+                self.directorios_activos.remove(partes)
+                self._cambio_directorios.notify_all()
+
+    async def _con_recurso(self, recurso, fabrica):
+        """Ejecuta la llamada con el cerrojo de su recurso, si lo tiene"""
+        if recurso is None:
+            return await fabrica()
+        if recurso.startswith(PREFIJO_DIRECTORIO):
+            return await self._con_directorio(recurso[len(PREFIJO_DIRECTORIO):], fabrica)
+        entrada = self.cerrojos.setdefault(recurso, [asyncio.Lock(), 0])
+        entrada[1] += 1
+        try:
+            async with entrada[0]:
+                return await fabrica()
+        finally:
+            # Cuando nadie mas usa ni espera el recurso ya no hace falta conservar el cerrojo
+            entrada[1] -= 1
+            if entrada[1] == 0:
+                self.cerrojos.pop(recurso, None)
+
+    async def ejecutar(self, clave: str, fabrica, coalescer: bool = True, recurso=None):
+        """
+        Ejecuta fabrica() (una funcion que crea la corrutina de la llamada) o, si ya
+        hay una llamada identica en curso, espera su resultado.
+        """
+        if not coalescer:
+            return await self._con_recurso(recurso, fabrica)
+
+        tarea = self.en_curso.get(clave)
+        if tarea is not None:
+            self.compartidas += 1
+            return await asyncio.shield(tarea)
+
+        tarea = asyncio.ensure_future(self._con_recurso(recurso, fabrica))
+        self.en_curso[clave] = tarea
+        tarea.add_done_callback(lambda t: self.en_curso.pop(clave, None) if self.en_curso.get(clave) is t else None)
+        tarea.add_done_callback(_recuperar_excepcion)
+        # shield: si el primer cliente cancela, la ejecucion sigue para los demas
+        return await asyncio.shield(tarea)
+
+    def estado(self) -> dict:
+        """Llamadas en curso, recursos ocupados y llamadas que compartieron resultado"""
+        return {
+            "en_curso": len(self.en_curso),
+            "recursos_ocupados": len(self.cerrojos) + len(self.directorios_activos),
+            "compartidas": self.compartidas
+        }
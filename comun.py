@@ -0,0 +1,145 @@
+"""
+Utilidades comunes del servidor MCP
+Autor: Francisco de la Poza
+
+Rutas base, configuracion, registro de logs y medicion de memoria compartidos
+por servidor.py y sus modulos auxiliares.
+"""
+
+import contextlib
+import json
+import os
+import sys
+import tempfile
+from datetime import datetime
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+try:
+    import msvcrt
+except ImportError:
+    msvcrt = None
+
+# Configuracion de rutas
+RUTA_BASE = Path(__file__).parent
+# Los directorios de herramientas, logs y salida pueden redirigirse (benchmarks, pruebas)
+RUTA_HERRAMIENTAS = Path(os.environ.get("MCP_RUTA_HERRAMIENTAS", RUTA_BASE / "herramientas"))
+RUTA_LOGS = Path(os.environ.get("MCP_RUTA_LOGS", RUTA_BASE / "logs"))
+RUTA_OUTPUT = Path(os.environ.get("MCP_RUTA_OUTPUT", RUTA_BASE / "output"))
+RUTA_CONFIG = RUTA_BASE / "config.json"
+
+def registrar_log(mensaje: str):
+    """Registra mensajes en el archivo de logs"""
+    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    RUTA_LOGS.mkdir(parents=True, exist_ok=True)
+    archivo_log = RUTA_LOGS / f"servidor_{datetime.now().strftime('%Y%m%d')}.log"
+
+    with open(archivo_log, "a", encoding="utf-8") as f:
+        f.write(f"[{timestamp}] {mensaje}\n")
+
+def escribir_atomico(ruta: Path, contenido: str):
+    """Escribe un archivo mediante un temporal en el mismo directorio y os.replace()"""
+    ruta.parent.mkdir(parents=True, exist_ok=True)
+    descriptor, nombre_temporal = tempfile.mkstemp(prefix=".tmp_", suffix=ruta.suffix, dir=ruta.parent)
+    try:
+        with os.fdopen(descriptor, "w", encoding="utf-8") as f:
+            f.write(contenido)
+        # mkstemp crea el archivo solo legible por el usuario
+        os.chmod(nombre_temporal, 0o644)
+        os.replace(nombre_temporal, ruta)
+    except BaseException:
+        Path(nombre_temporal).unlink(missing_ok=True)
+        raise
+
+@contextlib.contextmanager
+def bloqueo_archivo(ruta: Path):
+    """
+    Bloqueo exclusivo entre procesos sobre '<ruta>.lock' (fcntl o msvcrt).
+    No sustituye al threading.Lock de cada modulo: dentro de un proceso hay que usar los dos.
+    """
+    ruta_bloqueo = ruta.with_name(ruta.name + ".lock")
+    ruta_bloqueo.parent.mkdir(parents=True, exist_ok=True)
+    with open(ruta_bloqueo, "a+b") as f:
+        if fcntl:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        elif msvcrt:
+            f.seek(0)
+            while True:
+                try:
+                    # LK_LOCK reintenta durante unos 10 s antes de fallar
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    continue
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            elif msvcrt:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+def cargar_configuracion() -> dict:
+    """Lee config.json (diccionario vacio si no existe o no es valido)"""
+    try:
+        with open(RUTA_CONFIG, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+    except json.JSONDecodeError as e:
+        registrar_log(f"ADVERTENCIA: config.json no es valido: {e}")
+        return {}
+
+def memoria_proceso_mb() -> float:
+    """Memoria residente del proceso actual en MB (0 si no se puede medir)"""
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / (1024 * 1024)
+    except ImportError:
+        pass
+
+    if sys.platform == "win32":
+        import ctypes
+        from ctypes import wintypes
+
+        class ContadoresMemoria(ctypes.Structure):
+            _fields_ = [
+                ("cb", wintypes.DWORD),
+                ("PageFaultCount", wintypes.DWORD),
+                ("PeakWorkingSetSize", ctypes.c_size_t),
+                ("WorkingSetSize", ctypes.c_size_t),
+                ("QuotaPeakPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                ("PagefileUsage", ctypes.c_size_t),
+                ("PeakPagefileUsage", ctypes.c_size_t)
+            ]
+
+        contadores = ContadoresMemoria()
+        contadores.cb = ctypes.sizeof(contadores)
+        ctypes.windll.kernel32.GetCurrentProcess.restype = wintypes.HANDLE
+        proceso = ctypes.windll.kernel32.GetCurrentProcess()
+        if ctypes.windll.psapi.GetProcessMemoryInfo(proceso, ctypes.byref(contadores), contadores.cb):
+            return contadores.WorkingSetSize / (1024 * 1024)
+        return 0.0
+
+    try:
+        with open("/proc/self/statm", "r") as f:
+            paginas_residentes = int(f.read().split()[1])
+        return paginas_residentes * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        pass
+
+    try:
+        import resource
+    except ImportError:
+        return 0.0
+    # ru_maxrss es el pico: KB en Linux, bytes en macOS
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return pico / (1024 * 1024) if sys.platform == "darwin" else pico / 1024
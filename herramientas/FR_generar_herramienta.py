@@ -3,21 +3,36 @@ Herramienta: FR_generar_herramienta
 Descripcion: Genera automaticamente una nueva herramienta MCP o modifica una existente, 
              con validacion automatica de sintaxis Python. Reemplaza automaticamente 
              la herramienta modificada en el servidor.
+             Antes de reemplazarla la importa en un subproceso aislado (aislamiento.py)
+             y solo entonces la renombra de forma atomica en 'herramientas/'.
+             Cada version queda guardada en 'herramientas/.versions/' (versiones.py)
+             y puede restaurarse con FR_restaurar_version.
 Autor: Francisco Pozuelo
 Mejorada: 2026-02-27
 """
 
 import json
 import ast
+import asyncio
+import os
+import pprint
 import sys
+import tempfile
 from datetime import datetime
 from pathlib import Path
 from mcp.types import Tool, TextContent
 
 # Configuracion
 RUTA_BASE = Path(__file__).parent.parent
-RUTA_HERRAMIENTAS = RUTA_BASE / "herramientas"
-RUTA_LOGS = RUTA_BASE / "logs"
+
+if str(RUTA_BASE) not in sys.path:
+    sys.path.insert(0, str(RUTA_BASE))
+
+from comun import RUTA_HERRAMIENTAS, RUTA_LOGS
+from coalescencia import recurso_herramienta
+from aislamiento import probar_en_aislamiento
+from versiones import publicar_version
+import indice_herramientas
 
 def registrar_log(mensaje: str):
     """Registra mensajes en el archivo de logs"""
@@ -84,12 +99,19 @@ HERRAMIENTA = Tool(
             "codigo_funcion": {
                 "type": "string",
                 "description": "Codigo Python de la funcion que ejecuta la herramienta"
+            },
+            "ejemplos": {
+                "type": "array",
+                "description": "Argumentos de ejemplo opcionales. Cada uno se ejecuta en la prueba aislada antes de instalar la herramienta",
+                "items": {"type": "object"}
             }
         },
         "required": ["nombre", "descripcion", "parametros", "codigo_funcion"]
     }
 )
 
+RECURSO_EXCLUSIVO = recurso_herramienta
+
 # Funcion de ejecucion
 async def ejecutar(argumentos: dict) -> list[TextContent]:
     """Ejecuta la herramienta FR_generar_herramienta"""
@@ -98,6 +120,7 @@ async def ejecutar(argumentos: dict) -> list[TextContent]:
     descripcion = argumentos["descripcion"].strip()
     parametros = argumentos["parametros"]
     codigo_funcion = argumentos["codigo_funcion"].strip()
+    ejemplos = argumentos.get("ejemplos") or []
     
     # Nombre completo con prefijo
     nombre_completo = f"FR_{nombre}"
@@ -144,7 +167,11 @@ async def ejecutar(argumentos: dict) -> list[TextContent]:
     fecha_generacion = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     
     # Plantilla del archivo de herramienta
-    cabecera = f'"""\nHerramienta: {nombre_completo}\nDescripcion: {descripcion}\nGenerada automaticamente el {fecha_generacion}\nAutor: Sistema de Generacion Automatica\n"""\n\nfrom mcp.types import Tool, TextContent\n\n# Definicion de la herramienta\nHERRAMIENTA = Tool(\n    name="{nombre_completo}",\n    description="{descripcion}",\n    inputSchema={esquema_json}\n)\n\n# Funcion de ejecucion\nasync def ejecutar(argumentos: dict) -> list[TextContent]:\n    """Ejecuta la herramienta {nombre_completo}"""\n    \n'
+    bloque_ejemplos = ""
+    if ejemplos:
+        bloque_ejemplos = f'\n# Argumentos de ejemplo para la prueba en aislamiento\nEJEMPLOS = {pprint.pformat(ejemplos, indent=4)}\n'
+    
+    cabecera = f'"""\nHerramienta: {nombre_completo}\nDescripcion: {descripcion}\nGenerada automaticamente el {fecha_generacion}\nAutor: Sistema de Generacion Automatica\n"""\n\nfrom mcp.types import Tool, TextContent\n\n# Definicion de la herramienta\nHERRAMIENTA = Tool(\n    name="{nombre_completo}",\n    description="{descripcion}",\n    inputSchema={esquema_json}\n)\n{bloque_ejemplos}\n# Funcion de ejecucion\nasync def ejecutar(argumentos: dict) -> list[TextContent]:\n    """Ejecuta la herramienta {nombre_completo}"""\n    \n'
     
     pie = '\n    \n    return [TextContent(type="text", text=resultado)]\n'
     
@@ -155,14 +182,38 @@ async def ejecutar(argumentos: dict) -> list[TextContent]:
     if not es_valido_completo:
         return [TextContent(type="text", text=f"❌ NO SE PUEDE {accion} LA HERRAMIENTA\n\nError en el archivo generado:\n{mensaje_completo}\n\nVerifica que la funcion retorne correctamente con 'return [TextContent(...)]'")]
     
+    ruta_temporal = None
     try:
         # Crear directorio si no existe
         RUTA_HERRAMIENTAS.mkdir(parents=True, exist_ok=True)
         
-        # Guardar el archivo
-        with open(ruta_archivo, "w", encoding="utf-8") as f:
+        # Guardar el candidato en un archivo temporal que el servidor no carga
+        descriptor, nombre_temporal = tempfile.mkstemp(prefix=".candidato_", suffix=".py", dir=RUTA_HERRAMIENTAS)
+        ruta_temporal = Path(nombre_temporal)
+        with os.fdopen(descriptor, "w", encoding="utf-8") as f:
             f.write(contenido)
         
+        # VALIDACION 5: Importar y probar el candidato en un subproceso aislado
+        informe = await asyncio.to_thread(probar_en_aislamiento, ruta_temporal)
+        if not informe["ok"]:
+            ruta_temporal.unlink(missing_ok=True)
+            detalle = "\n".join(f"  - {error}" for error in informe["errores"])
+            registrar_log(f"Prueba aislada fallida para {nombre_completo}: {informe['errores']}")
+            return [TextContent(type="text", text=f"❌ NO SE PUEDE {accion} LA HERRAMIENTA\n\nLa prueba aislada ha fallado:\n{detalle}\n\nLa version anterior se mantiene sin cambios.")]
+        
+        # Guardar la version y sustituir de forma atomica: nunca se carga un archivo a medio escribir
+        hash_version = publicar_version(ruta_temporal, ruta_archivo)
+        ruta_temporal = None
+        
+        # El servidor marcara la herramienta como cargada al recargarla (si ya lo hizo, se conserva)
+        indice_herramientas.registrar_cambios(
+            {ruta_archivo: (indice_herramientas.ESTADO_PENDIENTE, None)},
+            conservar_mismo_contenido=True
+        )
+        
+        avisos = "".join(f"\n  ⚠️ {aviso}" for aviso in informe["avisos"])
+        ejemplos_ok = sum(1 for prueba in informe["ejemplos"] if prueba["ok"])
+        
         # Registrar en logs
         registrar_log(f"Herramienta {accion}A: {nombre_completo} -> {ruta_archivo}")
         
@@ -170,6 +221,7 @@ async def ejecutar(argumentos: dict) -> list[TextContent]:
 
 Nombre: {nombre_completo}
 Archivo: {ruta_archivo.name}
+Version: {hash_version[:12]}
 Ubicacion: {ruta_archivo}
 Descripcion: {descripcion}
 Parametros: {len(parametros)}
@@ -177,16 +229,21 @@ Parametros: {len(parametros)}
 ✓ Validaciones completadas:
   ✓ Sintaxis Python válida
   ✓ Esquema de parámetros válido
-  ✓ Archivo generado correctamente
+  ✓ Importacion aislada correcta ({informe['tiempo_importacion_s']}s, {informe['memoria_pico_mb']} MB)
+  ✓ Ejemplos ejecutados: {ejemplos_ok}/{len(informe['ejemplos'])}
+  ✓ Archivo generado correctamente{avisos}
 
 La herramienta ha sido guardada en el directorio de herramientas.
 El servidor la cargara automaticamente en la proxima solicitud.
 
 Tip: Puedes usar FR_listar_herramientas_creadas para verificar que se creo/modifico correctamente.
+Tip: Puedes volver a la version anterior con FR_restaurar_version.
 """
         
         return [TextContent(type="text", text=resultado)]
         
     except Exception as e:
+        if ruta_temporal is not None:
+            ruta_temporal.unlink(missing_ok=True)
         registrar_log(f"Error al {accion.lower()} herramienta {nombre_completo}: {str(e)}")
         return [TextContent(type="text", text=f"❌ Error al guardar la herramienta: {str(e)}")]
@@ -2,127 +2,104 @@
 Herramienta: FR_listar_herramientas_creadas
 Descripcion: Lista todas las herramientas que han sido creadas en el directorio
 Autor: Francisco Pozuelo
+
+Responde desde el indice de metadatos (indice_herramientas.py) que mantienen el
+servidor y FR_generar_herramienta, sin releer los archivos de las herramientas.
 """
 
-from datetime import datetime
+import sys
 from pathlib import Path
 from mcp.types import Tool, TextContent
 
-# Configuracion
 RUTA_BASE = Path(__file__).parent.parent
-RUTA_HERRAMIENTAS = RUTA_BASE / "herramientas"
-RUTA_LOGS = RUTA_BASE / "logs"
 
-def registrar_log(mensaje: str):
-    """Registra mensajes en el archivo de logs"""
-    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    archivo_log = RUTA_LOGS / f"servidor_{datetime.now().strftime('%Y%m%d')}.log"
-    
-    with open(archivo_log, "a", encoding="utf-8") as f:
-        f.write(f"[{timestamp}] {mensaje}\n")
+if str(RUTA_BASE) not in sys.path:
+    sys.path.insert(0, str(RUTA_BASE))
+
+from comun import RUTA_HERRAMIENTAS, registrar_log
+import indice_herramientas
+
+POR_PAGINA_DEFECTO = 50
 
 # Definicion de la herramienta
 HERRAMIENTA = Tool(
     name="FR_listar_herramientas_creadas",
-    description="Lista todas las herramientas que han sido creadas en el directorio",
+    description="Lista todas las herramientas que han sido creadas en el directorio, con busqueda, filtro por estado de carga y paginacion",
     inputSchema={
         "type": "object",
-        "properties": {}
+        "properties": {
+            "buscar": {
+                "type": "string",
+                "description": "Texto a buscar en el nombre, archivo, descripcion o autor"
+            },
+            "estado": {
+                "type": "string",
+                "enum": ["cargada", "pendiente", "error"],
+                "description": "Mostrar solo las herramientas con este estado de carga"
+            },
+            "pagina": {
+                "type": "integer",
+                "description": "Numero de pagina (empieza en 1)"
+            },
+            "por_pagina": {
+                "type": "integer",
+                "description": f"Herramientas por pagina. Por defecto: {POR_PAGINA_DEFECTO}"
+            }
+        }
     }
 )
 
-def leer_metadatos_docstring(archivo: Path) -> dict:
-    """
-    Lee los metadatos SOLO del docstring inicial del archivo (entre las primeras triples comillas).
-    Evita falsos positivos leyendo el resto del codigo.
-    """
-    metadatos = {
-        "nombre": "",
-        "descripcion": "",
-        "fecha": "",
-        "autor": ""
-    }
-    
-    try:
-        with open(archivo, "r", encoding="utf-8") as f:
-            contenido = f.read()
-        
-        # Extraer solo el primer docstring (entre las primeras triples comillas)
-        if contenido.startswith('"""'):
-            fin_docstring = contenido.find('"""', 3)
-            if fin_docstring == -1:
-                return metadatos
-            docstring = contenido[3:fin_docstring]
-        elif contenido.startswith("'''"):
-            fin_docstring = contenido.find("'''", 3)
-            if fin_docstring == -1:
-                return metadatos
-            docstring = contenido[3:fin_docstring]
-        else:
-            return metadatos
-        
-        # Parsear linea a linea SOLO dentro del docstring
-        for linea in docstring.splitlines():
-            linea = linea.strip()
-            
-            if linea.startswith("Herramienta:"):
-                metadatos["nombre"] = linea.split("Herramienta:", 1)[1].strip()
-            
-            elif linea.startswith("Descripcion:"):
-                metadatos["descripcion"] = linea.split("Descripcion:", 1)[1].strip()
-            
-            elif linea.startswith("Generada automaticamente el"):
-                # Formato: "Generada automaticamente el YYYY-MM-DD HH:MM:SS"
-                partes = linea.split("automaticamente el", 1)
-                if len(partes) == 2:
-                    metadatos["fecha"] = partes[1].strip()
-            
-            elif linea.startswith("Autor:"):
-                metadatos["autor"] = linea.split("Autor:", 1)[1].strip()
-    
-    except Exception as e:
-        metadatos["descripcion"] = f"ADVERTENCIA: Error leyendo archivo: {e}"
-    
-    return metadatos
-
-
 # Funcion de ejecucion
 async def ejecutar(argumentos: dict) -> list[TextContent]:
     """Ejecuta la herramienta FR_listar_herramientas_creadas"""
     
-    archivos = list(RUTA_HERRAMIENTAS.glob("FR_*.py"))
+    entradas = indice_herramientas.leer_indice()
+    if not entradas:
+        # Primer uso sin indice: se construye una vez
+        entradas = indice_herramientas.reconstruir_indice(list(RUTA_HERRAMIENTAS.glob("FR_*.py")))
     
-    if not archivos:
+    if not entradas:
         return [TextContent(
             type="text",
             text="No se han creado herramientas todavia.\n\nTip: Usa FR_generar_herramienta para crear tu primera herramienta."
         )]
     
-    resultado = "Herramientas creadas:\n"
-    resultado += "=" * 60 + "\n\n"
+    encontradas = indice_herramientas.buscar(entradas, argumentos.get("buscar", ""), argumentos.get("estado", ""))
     
-    for i, archivo in enumerate(sorted(archivos), 1):
-        metadatos = leer_metadatos_docstring(archivo)
-        
-        resultado += f"{i}. {archivo.name}\n"
+    por_pagina = max(1, int(argumentos.get("por_pagina") or POR_PAGINA_DEFECTO))
+    total_paginas = max(1, -(-len(encontradas) // por_pagina))
+    pagina = min(max(1, int(argumentos.get("pagina") or 1)), total_paginas)
+    inicio = (pagina - 1) * por_pagina
+    
+    lineas = ["Herramientas creadas:", "=" * 60, ""]
+    
+    for i, entrada in enumerate(encontradas[inicio:inicio + por_pagina], inicio + 1):
+        lineas.append(f"{i}. {entrada['archivo']}")
         
-        if metadatos["nombre"]:
-            resultado += f"   Nombre: {metadatos['nombre']}\n"
+        if entrada.get("nombre"):
+            lineas.append(f"   Nombre: {entrada['nombre']}")
         
-        if metadatos["descripcion"]:
-            resultado += f"   Descripcion: {metadatos['descripcion']}\n"
+        if entrada.get("descripcion"):
+            lineas.append(f"   Descripcion: {entrada['descripcion']}")
         
-        if metadatos["autor"]:
-            resultado += f"   Autor: {metadatos['autor']}\n"
+        if entrada.get("autor"):
+            lineas.append(f"   Autor: {entrada['autor']}")
         
-        if metadatos["fecha"]:
-            resultado += f"   Generada: {metadatos['fecha']}\n"
+        if entrada.get("fecha"):
+            lineas.append(f"   Generada: {entrada['fecha']}")
         
-        resultado += f"   Ubicacion: {archivo}\n"
-        resultado += "\n"
+        estado = entrada.get("estado", "")
+        if entrada.get("error"):
+            estado += f" ({entrada['error']})"
+        lineas.append(f"   Estado: {estado}")
+        lineas.append(f"   Tamano: {entrada['tamano']} bytes  Hash: {entrada['hash'][:12]}")
+        lineas.append(f"   Ubicacion: {entrada['ruta']}")
+        lineas.append("")
     
-    resultado += f"\nTotal: {len(archivos)} herramienta(s) encontrada(s)"
+    lineas.append(f"Total: {len(encontradas)} herramienta(s) encontrada(s) de {len(entradas)}")
+    if total_paginas > 1:
+        lineas.append(f"Pagina {pagina} de {total_paginas}")
     
-    registrar_log(f"Listadas {len(archivos)} herramientas")
+    registrar_log(f"Listadas {len(encontradas)} herramientas")
     
-    return [TextContent(type="text", text=resultado)]
+    return [TextContent(type="text", text="\n".join(lineas))]
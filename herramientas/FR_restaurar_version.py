@@ -0,0 +1,74 @@
+"""
+Herramienta: FR_restaurar_version
+Descripcion: Lista las versiones guardadas de una herramienta y restaura la anterior
+             o una version concreta por su hash. El cambio es un unico renombrado
+             atomico y el servidor recarga solo esa herramienta.
+Autor: Francisco de la Poza
+"""
+
+import sys
+from pathlib import Path
+from mcp.types import Tool, TextContent
+
+# Configuracion
+RUTA_BASE = Path(__file__).parent.parent
+
+if str(RUTA_BASE) not in sys.path:
+    sys.path.insert(0, str(RUTA_BASE))
+
+from comun import RUTA_HERRAMIENTAS
+from coalescencia import recurso_herramienta
+from versiones import listar_versiones, restaurar_version
+
+# Definicion de la herramienta
+HERRAMIENTA = Tool(
+    name="FR_restaurar_version",
+    description="Lista las versiones guardadas de una herramienta generada y restaura la anterior o una version concreta",
+    inputSchema={
+        "type": "object",
+        "properties": {
+            "nombre": {
+                "type": "string",
+                "description": "Nombre de la herramienta (sin el prefijo FR_)"
+            },
+            "version": {
+                "type": "string",
+                "description": "Hash (o prefijo) de la version a restaurar. Si se omite, se restaura la version anterior"
+            },
+            "solo_listar": {
+                "type": "boolean",
+                "description": "Si es true, solo lista las versiones sin restaurar nada"
+            }
+        },
+        "required": ["nombre"]
+    }
+)
+
+RECURSO_EXCLUSIVO = recurso_herramienta
+
+# Funcion de ejecucion
+async def ejecutar(argumentos: dict) -> list[TextContent]:
+    """Ejecuta la herramienta FR_restaurar_version"""
+
+    nombre_completo = f"FR_{argumentos['nombre'].strip()}"
+    ruta_archivo = RUTA_HERRAMIENTAS / f"{nombre_completo.lower()}.py"
+
+    if not argumentos.get("solo_listar", False):
+        try:
+            hash_restaurado = restaurar_version(ruta_archivo, argumentos.get("version"))
+        except ValueError as e:
+            return [TextContent(type="text", text=f"❌ {e}")]
+        cabecera = f"✅ {nombre_completo} restaurada a la version {hash_restaurado[:12]}\n\n"
+    else:
+        cabecera = ""
+
+    versiones = listar_versiones(ruta_archivo.name)
+    if not versiones["historial"]:
+        return [TextContent(type="text", text=f"No hay versiones guardadas de {nombre_completo}")]
+
+    lineas = [f"{cabecera}Versiones de {nombre_completo}:"]
+    for version in reversed(versiones["historial"]):
+        marca = "→" if version["hash"] == versiones["actual"] else " "
+        lineas.append(f" {marca} {version['hash'][:12]}  {version['fecha']}  ({version['origen']})")
+
+    return [TextContent(type="text", text="\n".join(lineas))]
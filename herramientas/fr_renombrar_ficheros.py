@@ -9,21 +9,51 @@ Autor: Sistema de Generacion Automatica
 """
 
 import os
+import sys
 import tkinter as tk
 from tkinter import filedialog
 from mcp.types import Tool, TextContent
 from pathlib import Path
 
+RUTA_BASE = Path(__file__).parent.parent
+
+if str(RUTA_BASE) not in sys.path:
+    sys.path.insert(0, str(RUTA_BASE))
+
+from coalescencia import recurso_directorio
+from resultados import EscritorResultado
+
 # Definicion de la herramienta
 HERRAMIENTA = Tool(
     name="FR_renombrar_ficheros",
     description="Abre el Explorador de Windows para seleccionar un directorio. Renombra: Directorios en MAYUSCULAS, Ficheros con Primera Letra Mayuscula y extension en minusculas (recursivo, incluyendo subdirectorios), y cierra el explorador al finalizar.",
     inputSchema={
         "type": "object",
-        "properties": {}
+        "properties": {
+            "directorio": {
+                "type": "string",
+                "description": "Directorio a renombrar. Si no se indica se elige con el Explorador"
+            }
+        }
     }
 )
 
+RECURSO_EXCLUSIVO = recurso_directorio("directorio")
+
+def seleccionar_directorio() -> str:
+    """Abre el Explorador para elegir el directorio ('' si se cancela)"""
+    # Ocultar ventana principal de tkinter
+    root = tk.Tk()
+    root.withdraw()
+    root.attributes('-topmost', True)
+
+    # Abrir explorador para seleccionar carpeta
+    directorio = filedialog.askdirectory(
+        title="Selecciona el directorio para renombrar (Dirs: MAYUSCULAS, Ficheros: Primera Mayuscula + Extension minuscula)"
+    )
+    root.destroy()
+    return directorio
+
 def renombrar_fichero(nombre_original: str) -> str:
     """
     Renombra un fichero: Primera Letra Mayuscula, resto minusculas, extension en minusculas
@@ -48,29 +78,32 @@ def renombrar_directorio(nombre_original: str) -> str:
     """
     return nombre_original.upper()
 
-# Funcion de ejecucion
-async def ejecutar(argumentos: dict) -> list[TextContent]:
-    """Ejecuta la herramienta FR_renombrar_ficheros"""
-
-    # Ocultar ventana principal de tkinter
-    root = tk.Tk()
-    root.withdraw()
-    root.attributes('-topmost', True)
-
-    # Abrir explorador para seleccionar carpeta
-    directorio = filedialog.askdirectory(
-        title="Selecciona el directorio para renombrar (Dirs: MAYUSCULAS, Ficheros: Primera Mayuscula + Extension minuscula)"
-    )
-    root.destroy()
-
-    if not directorio:
-        return [TextContent(type="text", text="❌ Operación cancelada: no se seleccionó ningún directorio.")]
+def renombrar_arbol(directorio: str, escritor: EscritorResultado = None) -> dict:
+    """
+    Renombra recursivamente el arbol de 'directorio'.
+    Retorna un diccionario con renombrados, errores, errores_detalle y cambios_realizados.
 
+    Si se indica un escritor, cada cambio y cada error se vuelcan a el en cuanto se
+    producen y las listas errores_detalle y cambios_realizados no se acumulan.
+    """
     renombrados = 0
     errores = 0
     errores_detalle = []
     cambios_realizados = []
 
+    def anotar_cambio(clase: str, raiz: str, antes: str, despues: str):
+        if escritor:
+            escritor.escribir({"tipo": "cambio", "clase": clase, "carpeta": raiz, "antes": antes, "despues": despues})
+        else:
+            icono = "📄" if clase == "archivo" else "📁"
+            cambios_realizados.append(f"  {icono} {antes} → {despues}")
+
+    def anotar_error(ruta: str, detalle: str):
+        if escritor:
+            escritor.escribir({"tipo": "error", "ruta": ruta, "detalle": detalle})
+        else:
+            errores_detalle.append(f"{ruta}: {detalle}")
+
     # Recorrer el árbol de directorios de abajo hacia arriba (bottom-up)
     # para evitar problemas al renombrar carpetas padre antes que hijos
     for raiz, carpetas, archivos in os.walk(directorio, topdown=False):
@@ -84,14 +117,14 @@ async def ejecutar(argumentos: dict) -> list[TextContent]:
                     # Verificar que no exista ya el archivo con el nuevo nombre
                     if os.path.exists(ruta_nueva):
                         errores += 1
-                        errores_detalle.append(f"{ruta_original}: Ya existe un archivo con el nombre '{nombre_nuevo}'")
+                        anotar_error(ruta_original, f"Ya existe un archivo con el nombre '{nombre_nuevo}'")
                     else:
                         os.rename(ruta_original, ruta_nueva)
                         renombrados += 1
-                        cambios_realizados.append(f"  📄 {nombre} → {nombre_nuevo}")
+                        anotar_cambio("archivo", raiz, nombre, nombre_nuevo)
                 except Exception as e:
                     errores += 1
-                    errores_detalle.append(f"{ruta_original}: {str(e)}")
+                    anotar_error(ruta_original, str(e))
 
         # Renombrar subdirectorios (de abajo hacia arriba)
         for carpeta in carpetas:
@@ -103,31 +136,63 @@ async def ejecutar(argumentos: dict) -> list[TextContent]:
                     # Verificar que no exista ya el directorio con el nuevo nombre
                     if os.path.exists(ruta_nueva):
                         errores += 1
-                        errores_detalle.append(f"{ruta_original}: Ya existe un directorio con el nombre '{carpeta_nueva}'")
+                        anotar_error(ruta_original, f"Ya existe un directorio con el nombre '{carpeta_nueva}'")
                     else:
                         os.rename(ruta_original, ruta_nueva)
                         renombrados += 1
-                        cambios_realizados.append(f"  📁 {carpeta} → {carpeta_nueva}")
+                        anotar_cambio("directorio", raiz, carpeta, carpeta_nueva)
                 except Exception as e:
                     errores += 1
-                    errores_detalle.append(f"{ruta_original}: {str(e)}")
+                    anotar_error(ruta_original, str(e))
+
+    return {
+        "renombrados": renombrados,
+        "errores": errores,
+        "errores_detalle": errores_detalle,
+        "cambios_realizados": cambios_realizados
+    }
+
+# Funcion de ejecucion
+async def ejecutar(argumentos: dict) -> list[TextContent]:
+    """Ejecuta la herramienta FR_renombrar_ficheros"""
+
+    directorio = argumentos.get("directorio")
+    if directorio:
+        if not os.path.isdir(directorio):
+            return [TextContent(type="text", text=f"❌ No existe el directorio: {directorio}")]
+    else:
+        directorio = seleccionar_directorio()
+        if not directorio:
+            return [TextContent(type="text", text="❌ Operación cancelada: no se seleccionó ningún directorio.")]
+
+    # La lista completa de cambios y errores se vuelca a disco y se pagina con FR_leer_resultado
+    with EscritorResultado("FR_renombrar_ficheros", f"Renombrado de {directorio}") as escritor:
+        informe = renombrar_arbol(directorio, escritor)
+    renombrados = informe["renombrados"]
+    errores = informe["errores"]
+    cambios_realizados = escritor.muestras.get("cambio", [])
+    errores_detalle = escritor.muestras.get("error", [])
 
     # Construir mensaje de resultado
     resultado = f"✅ Proceso completado en: {directorio}\n"
     resultado += f"   📊 Elementos renombrados: {renombrados}\n"
     
     if cambios_realizados:
-        resultado += f"\n📝 Cambios realizados (primeros 10):\n"
-        for cambio in cambios_realizados[:10]:
-            resultado += f"{cambio}\n"
-        if len(cambios_realizados) > 10:
-            resultado += f"   ... y {len(cambios_realizados) - 10} más\n"
+        resultado += f"\n📝 Cambios realizados (primeros {len(cambios_realizados)}):\n"
+        for cambio in cambios_realizados:
+            icono = "📄" if cambio["clase"] == "archivo" else "📁"
+            resultado += f"  {icono} {cambio['antes']} → {cambio['despues']}\n"
+        if renombrados > len(cambios_realizados):
+            resultado += f"   ... y {renombrados - len(cambios_realizados)} más\n"
     
     if errores > 0:
         resultado += f"\n   ⚠️ Errores encontrados: {errores}\n"
-        for detalle in errores_detalle[:5]:  # Mostrar máximo 5 errores
-            resultado += f"      - {detalle}\n"
+        for detalle in errores_detalle:
+            resultado += f"      - {detalle['ruta']}: {detalle['detalle']}\n"
     else:
         resultado += f"\n   ✔️ Sin errores."
+    
+    if escritor.total:
+        resultado += f"\n\n{escritor.pie()}"
 
     return [TextContent(type="text", text=resultado)]
@@ -6,9 +6,18 @@ Autor: Sistema de Generacion Automatica
 """
 
 import os
+import sys
 import tkinter as tk
 from tkinter import filedialog
 from mcp.types import Tool, TextContent
+from pathlib import Path
+
+RUTA_BASE = Path(__file__).parent.parent
+
+if str(RUTA_BASE) not in sys.path:
+    sys.path.insert(0, str(RUTA_BASE))
+
+from coalescencia import recurso_directorio
 
 # Definicion de la herramienta
 HERRAMIENTA = Tool(
@@ -16,14 +25,19 @@ HERRAMIENTA = Tool(
     description="Abre el Explorador de Windows para seleccionar un directorio, renombra a MAYÚSCULAS todos los archivos y carpetas (recursivo, incluyendo subdirectorios), y cierra el explorador al finalizar.",
     inputSchema={
         "type": "object",
-        "properties": {}
+        "properties": {
+            "directorio": {
+                "type": "string",
+                "description": "Directorio a renombrar. Si no se indica se elige con el Explorador"
+            }
+        }
     }
 )
 
-# Funcion de ejecucion
-async def ejecutar(argumentos: dict) -> list[TextContent]:
-    """Ejecuta la herramienta FR_renombrar_mayusculas"""
+RECURSO_EXCLUSIVO = recurso_directorio("directorio")
 
+def seleccionar_directorio() -> str:
+    """Abre el Explorador para elegir el directorio ('' si se cancela)"""
     # Ocultar ventana principal de tkinter
     root = tk.Tk()
     root.withdraw()
@@ -34,9 +48,20 @@ async def ejecutar(argumentos: dict) -> list[TextContent]:
         title="Selecciona el directorio para renombrar a MAYÚSCULAS"
     )
     root.destroy()
+    return directorio
 
-    if not directorio:
-        return [TextContent(type="text", text="❌ Operación cancelada: no se seleccionó ningún directorio.")]
+# Funcion de ejecucion
+async def ejecutar(argumentos: dict) -> list[TextContent]:
+    """Ejecuta la herramienta FR_renombrar_mayusculas"""
+
+    directorio = argumentos.get("directorio")
+    if directorio:
+        if not os.path.isdir(directorio):
+            return [TextContent(type="text", text=f"❌ No existe el directorio: {directorio}")]
+    else:
+        directorio = seleccionar_directorio()
+        if not directorio:
+            return [TextContent(type="text", text="❌ Operación cancelada: no se seleccionó ningún directorio.")]
 
     renombrados = 0
     errores = 0
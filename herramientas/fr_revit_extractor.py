@@ -1,18 +1,124 @@
+"""
+Herramienta: FR_revit_extractor
+Descripcion: Exporta a Excel los datos de un modelo de Revit (revit_data.json generado
+             por la extension de Revit), una hoja por categoria.
+             La exportacion se ejecuta en la cola de trabajos en segundo plano: la
+             llamada devuelve un id de trabajo al momento y FR_estado_trabajo muestra
+             su progreso y, al terminar, la ruta del Excel.
+Autor: Francisco de la Poza
+"""
+
 import os
+import sys
 import json
+import tempfile
 from datetime import datetime
+from pathlib import Path
 import openpyxl
 from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
+from mcp.types import Tool, TextContent
+
+RUTA_BASE = Path(__file__).parent.parent
+
+if str(RUTA_BASE) not in sys.path:
+    sys.path.insert(0, str(RUTA_BASE))
+
+from comun import RUTA_OUTPUT
+from agregacion import motor_disponible, resumir_mediciones
+from resultados import EscritorResultado
+from trabajos import obtener_cola
+
+# Definicion de la herramienta
+HERRAMIENTA = Tool(
+    name="FR_revit_extractor",
+    description="Exporta a Excel los datos de un modelo de Revit (revit_data.json), una hoja por categoria. Se ejecuta en segundo plano: devuelve un id de trabajo y FR_estado_trabajo muestra el progreso y el archivo generado",
+    inputSchema={
+        "type": "object",
+        "properties": {
+            "archivo_revit": {
+                "type": "string",
+                "description": "Ruta del modelo .rvt (se busca revit_data.json junto a el). Usa 'test' para exportar datos de ejemplo"
+            },
+            "ruta_json": {
+                "type": "string",
+                "description": "Ruta de un revit_data.json concreto. Por defecto se busca en %TEMP%\\revit_ext y en las ubicaciones habituales"
+            },
+            "ruta_salida": {
+                "type": "string",
+                "description": "Directorio donde guardar el Excel. Por defecto: output"
+            }
+        }
+    }
+)
+
+# La cola de trabajos vive en el proceso del servidor
+AISLAR = False
 
-def extract_revit_data(archivo_revit=None, ruta_salida=None):
+def informar(mensaje):
+    """Mensajes de progreso por stderr (stdout es el canal stdio del servidor MCP)"""
+    print(mensaje, file=sys.stderr)
+
+def reservar_nombre(ruta: str) -> str:
+    """
+    Crea vacio el primer archivo libre entre ruta, ruta_2, ruta_3... y lo retorna.
+    La creacion exclusiva ('x') evita que dos exportaciones del mismo segundo
+    (cola de trabajos) elijan el mismo nombre.
+    """
+    base, extension = os.path.splitext(ruta)
+    candidato = ruta
+    contador = 2
+    while True:
+        try:
+            with open(candidato, 'x'):
+                return candidato
+        except FileExistsError:
+            candidato = f'{base}_{contador}{extension}'
+            contador += 1
+
+def escribir_resumen(wb, filas, border):
+    """Escribe la hoja 'Resumen' (la primera del libro) con las filas de agregacion.resumir_mediciones()"""
+    ws = wb.create_sheet('Resumen', 0)
+    headers = ['Categoría', 'Agrupado por', 'Grupo', 'Elementos', 'Campo', 'Suma', 'Mínimo', 'Máximo']
+    claves = ['categoria', 'agrupado_por', 'grupo', 'elementos', 'campo', 'suma', 'minimo', 'maximo']
+    
+    for col, h in enumerate(headers, 1):
+        cell = ws.cell(1, col, h)
+        cell.font = Font(bold=True, color='FFFFFF', size=11)
+        cell.fill = PatternFill(start_color='404040', end_color='404040', fill_type='solid')
+        cell.border = border
+        cell.alignment = Alignment(horizontal='center')
+    
+    for row, fila in enumerate(filas, 2):
+        for col, clave in enumerate(claves, 1):
+            valor = fila[clave]
+            cell = ws.cell(row, col, '' if valor is None else valor)
+            cell.border = border
+            if clave in ('suma', 'minimo', 'maximo') and valor is not None:
+                cell.number_format = '#,##0.00'
+            if fila['agrupado_por'] == '(total)':
+                cell.font = Font(bold=True)
+    
+    for col in range(1, len(headers)+1):
+        ws.column_dimensions[openpyxl.utils.get_column_letter(col)].width = 16
+    ws.freeze_panes = 'A2'
+
+def extract_revit_data(archivo_revit=None, ruta_salida=None, ruta_json=None, escritor=None, progreso=None, nombre_salida=None):
     """
     Extrae datos de Revit desde un archivo JSON y genera un Excel.
     Si archivo_revit es 'test' o 'ejemplo', crea datos de prueba.
+    Si se indica ruta_json, se lee ese archivo en lugar de buscar revit_data.json.
+    Si se indica un escritor (resultados.EscritorResultado), se vuelca un registro
+    por cada categoria exportada y otro con el resumen final.
+    Si se indica progreso(fraccion, mensaje), se llama al avanzar cada hoja.
+    Si se indica nombre_salida, el Excel se llama <nombre_salida>.xlsx y sustituye
+    al anterior de forma atomica (nunca queda un archivo a medio escribir).
     """
+    if progreso is None:
+        progreso = lambda fraccion, mensaje=None: None
     try:
         # MODO PRUEBA: Crear datos de ejemplo
         if archivo_revit in ['test', 'ejemplo', 'prueba']:
-            print("🔧 MODO PRUEBA: Creando datos de ejemplo...")
+            informar("🔧 MODO PRUEBA: Creando datos de ejemplo...")
             
             # Crear datos de ejemplo
             datos_ejemplo = {
@@ -38,7 +144,7 @@ def extract_revit_data(archivo_revit=None, ruta_salida=None):
             }
             
             data = datos_ejemplo
-            print("✅ Datos de ejemplo creados")
+            informar("✅ Datos de ejemplo creados")
         
         # MODO NORMAL: Buscar archivo JSON real
         else:
@@ -49,6 +155,7 @@ def extract_revit_data(archivo_revit=None, ruta_salida=None):
             
             # Lista de posibles ubicaciones
             posibles_json = [
+                ruta_json,
                 json_temp,
                 os.path.join(os.getcwd(), 'revit_data.json'),
                 os.path.join(os.path.dirname(archivo_revit) if archivo_revit else '', 'revit_data.json'),
@@ -63,10 +170,13 @@ def extract_revit_data(archivo_revit=None, ruta_salida=None):
             if not json_path:
                 return f'Error: No se encontró revit_data.json. Usa "test" como archivo_revit para crear datos de ejemplo'
             
-            print(f"📂 Leyendo datos de: {json_path}")
-            with open(json_path, 'r', encoding='utf-8') as f:
+            informar(f"📂 Leyendo datos de: {json_path}")
+            # utf-8-sig: el JSON puede venir con BOM (lo admite tambien vigilancia.py)
+            with open(json_path, 'r', encoding='utf-8-sig') as f:
                 data = json.load(f)
         
+        progreso(0.1, "Datos leidos")
+        
         # Crear Excel
         wb = openpyxl.Workbook()
         wb.remove(wb.active)
@@ -93,10 +203,11 @@ def extract_revit_data(archivo_revit=None, ruta_salida=None):
         hojas = 0
         categorias_procesadas = []
         
-        for cat, elems in data.items():
+        for posicion, (cat, elems) in enumerate(data.items()):
             if not elems or not isinstance(elems, list):
                 continue
             
+            progreso(0.1 + 0.8 * posicion / max(1, len(data)), f"Hoja {cat} ({len(elems)} elementos)")
             categorias_procesadas.append(cat)
             ws = wb.create_sheet(cat[:31])
             
@@ -142,10 +253,20 @@ def extract_revit_data(archivo_revit=None, ruta_salida=None):
             ws.freeze_panes = 'A2'
             total += len(elems)
             hojas += 1
+            if escritor:
+                escritor.escribir({"tipo": "categoria", "categoria": cat, "hoja": ws.title, "elementos": len(elems), "columnas": headers})
         
         if hojas == 0:
             return 'Error: No hay datos para exportar'
         
+        # Hoja de resumen: totales por categoria y por Tipo, Material, Nivel...
+        progreso(0.85, f"Calculando totales ({motor_disponible()})")
+        filas_resumen = resumir_mediciones(data)
+        escribir_resumen(wb, filas_resumen, border)
+        if escritor:
+            for fila in filas_resumen:
+                escritor.escribir({"tipo": "agregado", **fila})
+        
         # Guardar archivo
         if ruta_salida is None:
             ruta_salida = os.getcwd()
@@ -154,32 +275,81 @@ def extract_revit_data(archivo_revit=None, ruta_salida=None):
         ts = datetime.now().strftime('%Y%m%d_%H%M%S')
         
         # Nombre del archivo
-        if archivo_revit == 'test':
+        if nombre_salida:
+            nombre_excel = f'{nombre_salida}.xlsx'
+        elif archivo_revit == 'test':
             nombre_excel = f'Mediciones_Ejemplo_{ts}.xlsx'
         else:
             nombre_excel = f'Mediciones_Revit_{ts}.xlsx'
         
         archivo_excel = os.path.join(ruta_salida, nombre_excel)
-        wb.save(archivo_excel)
+        progreso(0.9, "Guardando Excel")
+        # Se guarda en un temporal del mismo directorio y se mueve con os.replace
+        descriptor, temporal = tempfile.mkstemp(prefix='.tmp_', suffix='.xlsx', dir=ruta_salida)
+        os.close(descriptor)
+        try:
+            wb.save(temporal)
+            # mkstemp crea el archivo solo legible por el usuario
+            os.chmod(temporal, 0o644)
+            if not nombre_salida:
+                archivo_excel = reservar_nombre(archivo_excel)
+            os.replace(temporal, archivo_excel)
+        except BaseException:
+            if os.path.exists(temporal):
+                os.remove(temporal)
+            raise
         
         # Mostrar resumen
-        print("\n" + "="*50)
-        print("✅ EXPORTACIÓN EXITOSA")
-        print("="*50)
-        print(f"📁 Archivo: {archivo_excel}")
-        print(f"📊 Hojas creadas: {hojas}")
-        print(f"📋 Elementos totales: {total}")
-        print(f"📌 Categorías: {', '.join(categorias_procesadas)}")
-        print("="*50 + "\n")
+        informar("\n" + "="*50)
+        informar("✅ EXPORTACIÓN EXITOSA")
+        informar("="*50)
+        informar(f"📁 Archivo: {archivo_excel}")
+        informar(f"📊 Hojas creadas: {hojas}")
+        informar(f"📋 Elementos totales: {total}")
+        informar(f"📌 Categorías: {', '.join(categorias_procesadas)}")
+        informar("="*50 + "\n")
+        if escritor:
+            escritor.escribir({"tipo": "resumen", "archivo": archivo_excel, "hojas": hojas, "elementos": total, "categorias": categorias_procesadas})
         
         return f'OK: {archivo_excel}'
         
     except Exception as e:
         import traceback
         error_msg = f"Error: {str(e)}\n{traceback.format_exc()}"
-        print(error_msg)
+        informar(error_msg)
+        if escritor:
+            escritor.escribir({"tipo": "error", "detalle": str(e)})
         return f'Error: {str(e)}'
 
+def exportar_en_segundo_plano(progreso, archivo_revit, ruta_salida, ruta_json) -> str:
+    """Trabajo de la cola: exporta y vuelca el detalle por categoria a un resultado paginable"""
+    with EscritorResultado("FR_revit_extractor", f"Exportacion de {archivo_revit or ruta_json or 'revit_data.json'}") as escritor:
+        estado = extract_revit_data(archivo_revit, ruta_salida, ruta_json, escritor=escritor, progreso=progreso)
+    if not estado.startswith("OK"):
+        raise RuntimeError(estado.split(":", 1)[-1].strip())
+    return f"{estado.split(':', 1)[1].strip()} ({escritor.uri})"
+
+# Funcion de ejecucion
+async def ejecutar(argumentos: dict) -> list[TextContent]:
+    """Ejecuta la herramienta FR_revit_extractor"""
+    archivo_revit = argumentos.get("archivo_revit") or None
+    ruta_json = argumentos.get("ruta_json") or None
+    ruta_salida = argumentos.get("ruta_salida") or str(RUTA_OUTPUT)
+
+    trabajo = obtener_cola().enviar(
+        HERRAMIENTA.name,
+        f"Exportacion a Excel de {archivo_revit or ruta_json or 'revit_data.json'}",
+        exportar_en_segundo_plano,
+        archivo_revit, ruta_salida, ruta_json
+    )
+
+    return [TextContent(type="text", text=(
+        f"⏳ Exportacion enviada a la cola de trabajos\n"
+        f"   Id del trabajo: {trabajo.id}\n"
+        f"   Trabajos esperando turno: {obtener_cola().en_cola()}\n\n"
+        f"Consulta el progreso con FR_estado_trabajo (id=\"{trabajo.id}\")"
+    ))]
+
 # Si se ejecuta directamente
 if __name__ == "__main__":
     # Probar con datos de ejemplo
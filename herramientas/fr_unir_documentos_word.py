@@ -5,6 +5,9 @@ Generada automaticamente el 2026-02-21 18:41:09
 Autor: Sistema de Generacion Automatica
 """
 
+import asyncio
+import os
+
 from mcp.types import Tool, TextContent
 
 # Definicion de la herramienta
@@ -29,26 +32,18 @@ HERRAMIENTA = Tool(
 }
 )
 
-# Funcion de ejecucion
-async def ejecutar(argumentos: dict) -> list[TextContent]:
-    """Ejecuta la herramienta FR_unir_documentos_word"""
-    
-import os
-import subprocess
-import sys
-from pathlib import Path
+# La automatizacion de Word no admite varias uniones a la vez
+RECURSO_EXCLUSIVO = "microsoft_word"
+
+# Paquetes necesarios (modulo: paquete pip). Si faltan, el servidor marca la
+# herramienta como no disponible al arrancar en lugar de instalarlos al llamarla
+DEPENDENCIAS = {"win32com": "pywin32", "pythoncom": "pywin32", "docx": "python-docx"}
 
 def unir_documentos_word(ruta_carpeta, nombre_salida="DOCUMENTO_UNIFICADO"):
     """
     Unifica archivos Word de un directorio en un documento único.
     """
-    try:
-        import win32com.client
-    except:
-        subprocess.check_call([sys.executable, "-m", "pip", "install", "pywin32"])
-        subprocess.check_call([sys.executable, "-m", "pip", "install", "python-docx"])
-        import win32com.client
-    
+    import win32com.client
     from docx import Document
     from docx.shared import Pt
     
@@ -125,5 +120,37 @@ def unir_documentos_word(ruta_carpeta, nombre_salida="DOCUMENTO_UNIFICADO"):
         "errores": errores if errores else None,
         "mensaje": f"✅ Documento unificado creado: {nombre_salida}.docx"
     }
+
+def unir_en_hilo(ruta_carpeta, nombre_salida="DOCUMENTO_UNIFICADO"):
+    """
+    unir_documentos_word para un hilo de trabajo: COM debe inicializarse en cada
+    hilo que lo use antes de crear el objeto de Word.
+    """
+    import pythoncom
+
+    pythoncom.CoInitialize()
+    try:
+        return unir_documentos_word(ruta_carpeta, nombre_salida)
+    finally:
+        pythoncom.CoUninitialize()
+
+# Funcion de ejecucion
+async def ejecutar(argumentos: dict) -> list[TextContent]:
+    """Ejecuta la herramienta FR_unir_documentos_word"""
+    resultado = await asyncio.to_thread(
+        unir_en_hilo,
+        argumentos["ruta_carpeta"],
+        argumentos.get("nombre_salida") or "DOCUMENTO_UNIFICADO"
+    )
+    
+    if "error" in resultado:
+        return [TextContent(type="text", text=f"❌ Error: {resultado['error']}")]
     
-    return [TextContent(type="text", text=resultado)]
+    lineas = [
+        resultado["mensaje"],
+        f"   Archivo: {resultado['archivo_creado']}",
+        f"   Documentos unidos: {resultado['archivos_procesados']}"
+    ]
+    for error in resultado["errores"] or []:
+        lineas.append(f"   ❌ {error['archivo']}: {error['error']}")
+    return [TextContent(type="text", text="\n".join(lineas))]
@@ -0,0 +1,186 @@
+"""
+Indice de herramientas - Metadatos de los archivos de 'herramientas/'
+Autor: Francisco de la Poza
+
+Mantiene en 'herramientas/.indice.json' una entrada por archivo con nombre,
+descripcion, autor, fecha, tamano, hash y estado de carga. El cargador de
+servidor.py y FR_generar_herramienta lo actualizan solo para los archivos que
+cambian, y FR_listar_herramientas_creadas responde leyendo el indice en lugar
+de abrir todos los archivos.
+
+El generador puede ejecutarse en un proceso trabajador mientras el servidor
+carga herramientas, asi que cada actualizacion (leer, combinar y escribir) se
+hace entera bajo un bloqueo de archivo ('.indice.json.lock').
+"""
+
+import hashlib
+import json
+import threading
+from pathlib import Path
+
+from comun import RUTA_HERRAMIENTAS, bloqueo_archivo, escribir_atomico, registrar_log
+
+RUTA_INDICE = RUTA_HERRAMIENTAS / ".indice.json"
+
+# Estados de carga posibles
+ESTADO_CARGADA = "cargada"
+ESTADO_PENDIENTE = "pendiente"
+ESTADO_ERROR = "error"
+
+# Maximo de lineas leidas para encontrar el docstring inicial
+MAX_LINEAS_CABECERA = 60
+
+_bloqueo = threading.Lock()
+
+# Copia en memoria del indice, valida mientras no cambie la firma del archivo
+_cache = {"firma": None, "entradas": {}}
+
+def leer_metadatos_docstring(archivo: Path) -> dict:
+    """
+    Lee los metadatos SOLO del docstring inicial del archivo (entre las primeras triples comillas).
+    Se lee linea a linea y se deja de leer al cerrar el docstring.
+    """
+    metadatos = {
+        "nombre": "",
+        "descripcion": "",
+        "fecha": "",
+        "autor": ""
+    }
+
+    lineas = []
+    with open(archivo, "r", encoding="utf-8") as f:
+        primera = f.readline()
+        comillas = primera[:3]
+        if comillas not in ('"""', "'''"):
+            return metadatos
+
+        resto = primera[3:]
+        for _ in range(MAX_LINEAS_CABECERA):
+            if comillas in resto:
+                lineas.append(resto.split(comillas, 1)[0])
+                break
+            lineas.append(resto)
+            resto = f.readline()
+            if not resto:
+                return metadatos
+        else:
+            return metadatos
+
+    # Parsear linea a linea SOLO dentro del docstring
+    for linea in lineas:
+        linea = linea.strip()
+
+        if linea.startswith("Herramienta:"):
+            metadatos["nombre"] = linea.split("Herramienta:", 1)[1].strip()
+
+        elif linea.startswith("Descripcion:"):
+            metadatos["descripcion"] = linea.split("Descripcion:", 1)[1].strip()
+
+        elif linea.startswith("Generada automaticamente el"):
+            # Formato: "Generada automaticamente el YYYY-MM-DD HH:MM:SS"
+            partes = linea.split("automaticamente el", 1)
+            if len(partes) == 2:
+                metadatos["fecha"] = partes[1].strip()
+
+        elif linea.startswith("Autor:"):
+            metadatos["autor"] = linea.split("Autor:", 1)[1].strip()
+
+    return metadatos
+
+def crear_entrada(archivo: Path, estado: str, error: str = None) -> dict:
+    """Construye la entrada del indice de un archivo de herramienta"""
+    datos = archivo.read_bytes()
+    estado_archivo = archivo.stat()
+
+    try:
+        metadatos = leer_metadatos_docstring(archivo)
+    except Exception as e:
+        metadatos = {"nombre": "", "descripcion": f"ADVERTENCIA: Error leyendo archivo: {e}", "fecha": "", "autor": ""}
+
+    return {
+        "archivo": archivo.name,
+        "ruta": str(archivo),
+        **metadatos,
+        "tamano": len(datos),
+        "hash": hashlib.sha256(datos).hexdigest(),
+        "mtime_ns": estado_archivo.st_mtime_ns,
+        "estado": estado,
+        "error": error
+    }
+
+def _leer_archivo_indice() -> dict:
+    """Lee el indice del disco, sin cache"""
+    try:
+        with open(RUTA_INDICE, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+    except json.JSONDecodeError as e:
+        registrar_log(f"ADVERTENCIA: indice de herramientas corrupto: {e}")
+        return {}
+
+def leer_indice() -> dict:
+    """Retorna {nombre_archivo: entrada}. Solo relee el archivo si ha cambiado"""
+    try:
+        estado = RUTA_INDICE.stat()
+    except FileNotFoundError:
+        return {}
+
+    firma = (estado.st_mtime_ns, estado.st_size)
+    with _bloqueo:
+        if _cache["firma"] != firma:
+            _cache["entradas"] = _leer_archivo_indice()
+            _cache["firma"] = firma
+        return _cache["entradas"]
+
+def registrar_cambios(actualizados: dict = None, eliminados: list = None, conservar_mismo_contenido: bool = False):
+    """
+    Aplica al indice un lote de cambios con una sola escritura.
+
+    actualizados: {ruta_archivo: (estado, error)}
+    eliminados: lista de rutas de archivos que ya no existen
+    conservar_mismo_contenido: no sustituir las entradas que ya describen el mismo
+        contenido (mismo hash); asi un "pendiente" que llega tarde desde otro proceso
+        no tapa el estado que el servidor ya registro al recargar el archivo
+    """
+    if not actualizados and not eliminados:
+        return
+
+    # Las entradas nuevas no dependen del indice: se calculan fuera del bloqueo
+    nuevas = {}
+    quitar = [archivo.name for archivo in eliminados or []]
+    for archivo, (estado, error) in (actualizados or {}).items():
+        try:
+            nuevas[archivo.name] = crear_entrada(archivo, estado, error)
+        except FileNotFoundError:
+            quitar.append(archivo.name)
+
+    with _bloqueo, bloqueo_archivo(RUTA_INDICE):
+        entradas = _leer_archivo_indice()
+        for nombre, entrada in nuevas.items():
+            if conservar_mismo_contenido and entradas.get(nombre, {}).get("hash") == entrada["hash"]:
+                continue
+            entradas[nombre] = entrada
+        for nombre in quitar:
+            entradas.pop(nombre, None)
+        escribir_atomico(RUTA_INDICE, json.dumps(entradas, indent=1, ensure_ascii=False))
+        _cache["firma"] = None
+
+def reconstruir_indice(archivos: list[Path]) -> dict:
+    """Crea el indice desde cero (solo si no existe, por ejemplo antes del primer arranque)"""
+    registrar_cambios({archivo: (ESTADO_PENDIENTE, None) for archivo in archivos})
+    return leer_indice()
+
+def buscar(entradas: dict, texto: str = "", estado: str = "") -> list[dict]:
+    """Filtra las entradas por texto (nombre, archivo, descripcion o autor) y estado"""
+    texto = texto.lower().strip()
+    resultado = []
+    for entrada in entradas.values():
+        if estado and entrada.get("estado") != estado:
+            continue
+        if texto:
+            campos = (entrada.get("nombre", ""), entrada["archivo"], entrada.get("descripcion", ""), entrada.get("autor", ""))
+            if not any(texto in campo.lower() for campo in campos):
+                continue
+        resultado.append(entrada)
+    return sorted(resultado, key=lambda e: e["archivo"])
@@ -0,0 +1,256 @@
+"""
+Lotes - Ejecucion de varias llamadas a herramientas en una sola peticion
+Autor: Francisco de la Poza
+
+La herramienta interna FR_ejecutar_lote recibe una lista de pasos, cada uno con
+la herramienta a llamar, sus argumentos y (opcionalmente) los pasos de los que
+depende. Los pasos forman un grafo aciclico:
+  - los pasos independientes se ejecutan a la vez (con un maximo de concurrencia,
+    que nunca supera el limite del servidor),
+  - un paso espera a que terminen los pasos de los que depende,
+  - un texto "{{id}}" dentro de un argumento se sustituye por el resultado del
+    paso 'id' (y crea la dependencia automaticamente).
+
+Si un paso falla o se cancela, los que dependen de el se omiten y el resto
+sigue su curso.
+Se considera fallido un paso que lanza una excepcion o cuyo resultado empieza
+por "ERROR" o "❌" (la convencion de las herramientas del repositorio).
+
+Todo el lote es una sola ida y vuelta por stdio; antes de ejecutar un paso cuya
+herramienta no esta registrada (por ejemplo, una recien generada en un paso
+anterior) se sincroniza el registro, sin recargar el resto. Se sincroniza una
+vez por cada nombre desconocido, asi que una cadena generar A, llamar A,
+generar B, llamar B encuentra las dos herramientas.
+"""
+
+import asyncio
+import re
+import time
+
+from mcp.types import Tool, TextContent
+
+NOMBRE_HERRAMIENTA = "FR_ejecutar_lote"
+
+# Pasos que se ejecutan a la vez si la llamada no indica otro valor
+CONCURRENCIA_DEFECTO = 4
+
+# Tope de max_concurrencia cuando el servidor no fija otro
+CONCURRENCIA_MAXIMA = 16
+
+# Referencia al resultado de otro paso dentro de un argumento de texto
+PATRON_REFERENCIA = re.compile(r"\{\{\s*([\w.-]+)\s*\}\}")
+
+# Prefijos con los que las herramientas indican un error en su resultado
+PREFIJOS_ERROR = ("ERROR", "❌")
+
+# Definicion de la herramienta interna
+HERRAMIENTA = Tool(
+    name=NOMBRE_HERRAMIENTA,
+    description="Ejecuta varias llamadas a herramientas en una sola peticion. Los pasos independientes se ejecutan en paralelo y los dependientes en orden; '{{id}}' en un argumento se sustituye por el resultado del paso 'id'. Devuelve un resultado combinado con el tiempo de cada paso",
+    inputSchema={
+        "type": "object",
+        "properties": {
+            "pasos": {
+                "type": "array",
+                "minItems": 1,
+                "description": "Pasos del lote",
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "id": {
+                            "type": "string",
+                            "description": "Identificador del paso (unico dentro del lote). Por defecto: paso1, paso2..."
+                        },
+                        "herramienta": {
+                            "type": "string",
+                            "description": "Nombre de la herramienta a ejecutar"
+                        },
+                        "argumentos": {
+                            "type": "object",
+                            "description": "Argumentos de la herramienta"
+                        },
+                        "depende_de": {
+                            "type": "array",
+                            "items": {"type": "string"},
+                            "description": "Ids de los pasos que deben terminar antes que este"
+                        }
+                    },
+                    "required": ["herramienta"]
+                }
+            },
+            "max_concurrencia": {
+                "type": "integer",
+                "minimum": 1,
+                "description": f"Numero maximo de pasos ejecutandose a la vez (limitado por el servidor). Por defecto: {CONCURRENCIA_DEFECTO}"
+            },
+            "continuar_si_error": {
+                "type": "boolean",
+                "description": "Si es true, los pasos dependientes de uno fallido se ejecutan igualmente. Por defecto: false"
+            }
+        },
+        "required": ["pasos"]
+    }
+)
+
+def _referencias(valor) -> set:
+    """Ids de pasos referenciados con {{id}} en cualquier texto de los argumentos"""
+    if isinstance(valor, str):
+        return set(PATRON_REFERENCIA.findall(valor))
+    if isinstance(valor, dict):
+        return set().union(*(_referencias(v) for v in valor.values())) if valor else set()
+    if isinstance(valor, list):
+        return set().union(*(_referencias(v) for v in valor)) if valor else set()
+    return set()
+
+def _sustituir(valor, resultados: dict):
+    """Sustituye las referencias {{id}} por el texto del resultado de cada paso"""
+    if isinstance(valor, str):
+        return PATRON_REFERENCIA.sub(lambda m: resultados.get(m.group(1), m.group(0)), valor)
+    if isinstance(valor, dict):
+        return {clave: _sustituir(v, resultados) for clave, v in valor.items()}
+    if isinstance(valor, list):
+        return [_sustituir(v, resultados) for v in valor]
+    return valor
+
+def _texto(contenido: list) -> str:
+    """Texto de un resultado de herramienta (los contenidos no textuales se resumen)"""
+    partes = []
+    for elemento in contenido or []:
+        texto = getattr(elemento, "text", None)
+        partes.append(texto if texto is not None else f"[contenido {getattr(elemento, 'type', '?')}]")
+    return "\n".join(partes)
+
+def planificar(pasos: list[dict]) -> list[dict]:
+    """
+    Normaliza los pasos y comprueba el grafo de dependencias.
+    Lanza ValueError si hay ids repetidos, dependencias desconocidas o ciclos.
+    """
+    planificados = []
+    for posicion, paso in enumerate(pasos, 1):
+        identificador = paso.get("id") or f"paso{posicion}"
+        argumentos = paso.get("argumentos") or {}
+        dependencias = set(paso.get("depende_de") or []) | _referencias(argumentos)
+        planificados.append({
+            "id": identificador,
+            "herramienta": paso["herramienta"],
+            "argumentos": argumentos,
+            "depende_de": dependencias
+        })
+
+    ids = [p["id"] for p in planificados]
+    repetidos = sorted({i for i in ids if ids.count(i) > 1})
+    if repetidos:
+        raise ValueError(f"ids de paso repetidos: {', '.join(repetidos)}")
+
+    conocidos = set(ids)
+    for paso in planificados:
+        desconocidas = paso["depende_de"] - conocidos
+        if desconocidas:
+            raise ValueError(f"el paso '{paso['id']}' depende de pasos inexistentes: {', '.join(sorted(desconocidas))}")
+        if paso["herramienta"] == NOMBRE_HERRAMIENTA:
+            raise ValueError(f"el paso '{paso['id']}' no puede ejecutar otro lote")
+
+    # Orden topologico (Kahn) solo para detectar ciclos
+    pendientes = {p["id"]: set(p["depende_de"]) for p in planificados}
+    while pendientes:
+        listos = [i for i, deps in pendientes.items() if not deps]
+        if not listos:
+            raise ValueError(f"dependencias circulares entre los pasos: {', '.join(sorted(pendientes))}")
+        for i in listos:
+            del pendientes[i]
+        for deps in pendientes.values():
+            deps.difference_update(listos)
+
+    return planificados
+
+def crear_ejecutor(ejecutar_llamada, existe_herramienta, sincronizar, concurrencia_maxima=None):
+    """
+    Crea la funcion ejecutar() de FR_ejecutar_lote.
+
+    ejecutar_llamada: corrutina (nombre, argumentos, al_empezar) -> list[TextContent] que
+                      valida y ejecuta una herramienta registrada (fuera del bucle de
+                      eventos si es sincrona), llama a al_empezar() cuando la herramienta
+                      arranca y lanza excepcion si falla
+    existe_herramienta: funcion (nombre) -> bool
+    sincronizar: funcion sin argumentos que carga las herramientas nuevas o modificadas
+    concurrencia_maxima: funcion sin argumentos -> tope de max_concurrencia, o None
+                         para usar CONCURRENCIA_MAXIMA
+    """
+
+    async def ejecutar(argumentos: dict) -> list[TextContent]:
+        """Ejecuta la herramienta FR_ejecutar_lote"""
+        try:
+            pasos = planificar(argumentos.get("pasos") or [])
+        except ValueError as e:
+            return [TextContent(type="text", text=f"ERROR: lote no valido: {e}")]
+
+        continuar_si_error = argumentos.get("continuar_si_error", False)
+        tope = (concurrencia_maxima() if concurrencia_maxima else None) or CONCURRENCIA_MAXIMA
+        limite = asyncio.Semaphore(max(1, min(int(argumentos.get("max_concurrencia") or CONCURRENCIA_DEFECTO), tope)))
+        terminados = {p["id"]: asyncio.Event() for p in pasos}
+        informes = {}
+        resultados = {}
+        # Herramientas desconocidas para las que ya se sincronizo el registro
+        sincronizadas = set()
+
+        async def ejecutar_paso(paso: dict):
+            identificador = paso["id"]
+            try:
+                for dependencia in paso["depende_de"]:
+                    await terminados[dependencia].wait()
+
+                fallidas = [d for d in paso["depende_de"] if informes[d]["estado"] != "ok"]
+                if fallidas and not continuar_si_error:
+                    informes[identificador] = {
+                        "estado": "omitido", "tiempo_s": 0.0,
+                        "texto": f"Omitido porque fallo: {', '.join(sorted(fallidas))}"
+                    }
+                    return
+
+                async with limite:
+                    # El tiempo del paso cuenta desde que su herramienta empieza de verdad
+                    # (no mientras espera a un recurso, un hilo o un turno del cliente)
+                    inicio = [time.perf_counter()]
+
+                    def al_empezar():
+                        inicio[0] = time.perf_counter()
+
+                    try:
+                        if not existe_herramienta(paso["herramienta"]) and paso["herramienta"] not in sincronizadas:
+                            sincronizadas.add(paso["herramienta"])
+                            sincronizar()
+                        contenido = await ejecutar_llamada(paso["herramienta"], _sustituir(paso["argumentos"], resultados), al_empezar)
+                        texto = _texto(contenido)
+                        estado = "error" if texto.lstrip().startswith(PREFIJOS_ERROR) else "ok"
+                    except Exception as e:
+                        texto, estado = f"{type(e).__name__}: {e}", "error"
+                    informes[identificador] = {"estado": estado, "tiempo_s": time.perf_counter() - inicio[0], "texto": texto}
+                    resultados[identificador] = texto
+            finally:
+                # Un paso cancelado no llega a dejar informe: sus dependientes lo ven como fallido
+                informes.setdefault(identificador, {"estado": "cancelado", "tiempo_s": 0.0, "texto": "Cancelado"})
+                terminados[identificador].set()
+
+        inicio_lote = time.perf_counter()
+        # Un paso cancelado no cancela el lote; si se cancela el lote, gather lo propaga
+        await asyncio.gather(*(ejecutar_paso(p) for p in pasos), return_exceptions=True)
+        tiempo_total = time.perf_counter() - inicio_lote
+
+        cuenta = {estado: sum(1 for i in informes.values() if i["estado"] == estado) for estado in ("ok", "error", "omitido", "cancelado")}
+        tiempo_secuencial = sum(i["tiempo_s"] for i in informes.values())
+        lineas = [
+            f"Lote de {len(pasos)} paso(s): {cuenta['ok']} correctos, {cuenta['error']} con error, "
+            f"{cuenta['omitido']} omitidos, {cuenta['cancelado']} cancelados",
+            f"Tiempo total: {tiempo_total:.3f}s (suma de los pasos: {tiempo_secuencial:.3f}s)",
+            "=" * 60
+        ]
+        marcas = {"ok": "OK", "error": "ERROR", "omitido": "OMITIDO", "cancelado": "CANCELADO"}
+        for paso in pasos:
+            informe = informes[paso["id"]]
+            lineas.append("")
+            lineas.append(f"[{paso['id']}] {paso['herramienta']} - {marcas[informe['estado']]} ({informe['tiempo_s']:.3f}s)")
+            lineas.append(informe["texto"])
+
+        return [TextContent(type="text", text="\n".join(lineas))]
+
+    return ejecutar
@@ -0,0 +1,165 @@
+"""
+Perfilado - Coste de importacion de cada modulo de herramienta
+Autor: Francisco de la Poza
+
+Mientras se importa una herramienta se sustituye temporalmente __import__ para
+cronometrar cada importacion nueva que arrastra el modulo (el mismo dato
+acumulado que muestra 'python -X importtime') y se mide la diferencia de memoria
+residente del proceso. servidor.py lo usa en cargar_herramienta() cuando
+"perfilado_carga" esta activo en config.json (o MCP_PERFILADO=1) y la
+herramienta interna FR_diagnostico_carga muestra los resultados ordenados.
+
+Nota: mientras dura la importacion, las importaciones de otros hilos tambien
+pasan por el cronometro; el efecto es despreciable porque el cargador se
+ejecuta en el hilo del bucle principal.
+"""
+
+import builtins
+import sys
+import time
+
+from mcp.types import Tool, TextContent
+
+from comun import memoria_proceso_mb
+
+# Importaciones transitivas que se guardan por herramienta (las mas costosas)
+MAX_IMPORTACIONES = 8
+
+# Coste minimo para considerar pesada una importacion transitiva
+UMBRAL_IMPORTACION_PESADA_S = 0.05
+
+class PerfilImportacion:
+    """Context manager que mide tiempo, memoria e importaciones nuevas"""
+
+    def __init__(self):
+        self.tiempo_s = 0.0
+        self.memoria_mb = 0.0
+        self.importaciones = []
+        self.modulos_nuevos = 0
+        self._profundidad = 0
+
+    def _importar(self, nombre, globales=None, locales=None, lista_desde=(), nivel=0):
+        """Sustituto de __import__ que cronometra los modulos aun no importados"""
+        if nivel != 0 or nombre in sys.modules:
+            return self._importar_original(nombre, globales, locales, lista_desde, nivel)
+
+        self._profundidad += 1
+        inicio = time.perf_counter()
+        try:
+            return self._importar_original(nombre, globales, locales, lista_desde, nivel)
+        finally:
+            self._profundidad -= 1
+            self.importaciones.append({
+                "modulo": nombre,
+                "acumulado_s": time.perf_counter() - inicio,
+                "nivel": self._profundidad
+            })
+
+    def __enter__(self):
+        self._memoria_inicial = memoria_proceso_mb()
+        self._modulos_iniciales = len(sys.modules)
+        self._importar_original = builtins.__import__
+        builtins.__import__ = self._importar
+        self._inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, *excepcion):
+        self.tiempo_s = time.perf_counter() - self._inicio
+        builtins.__import__ = self._importar_original
+        self.memoria_mb = memoria_proceso_mb() - self._memoria_inicial
+        self.modulos_nuevos = len(sys.modules) - self._modulos_iniciales
+        return False
+
+    def resumen(self) -> dict:
+        """Tiempo, memoria y las importaciones transitivas mas costosas"""
+        mas_costosas = sorted(self.importaciones, key=lambda i: -i["acumulado_s"])[:MAX_IMPORTACIONES]
+        return {
+            "tiempo_s": round(self.tiempo_s, 4),
+            "memoria_mb": round(self.memoria_mb, 2),
+            "modulos_nuevos": self.modulos_nuevos,
+            "importaciones": [
+                {"modulo": i["modulo"], "acumulado_s": round(i["acumulado_s"], 4), "nivel": i["nivel"]}
+                for i in mas_costosas
+            ]
+        }
+
+def describir(nombre_archivo: str, perfil: dict) -> str:
+    """Linea de log con el coste de importacion de una herramienta"""
+    pesadas = [
+        f"{i['modulo']} ({i['acumulado_s']}s)"
+        for i in perfil["importaciones"]
+        if i["acumulado_s"] >= UMBRAL_IMPORTACION_PESADA_S
+    ]
+    texto = f"PERFIL {nombre_archivo}: {perfil['tiempo_s']}s, {perfil['memoria_mb']:+.2f} MB, {perfil['modulos_nuevos']} modulos nuevos"
+    if pesadas:
+        texto += f", importaciones pesadas: {', '.join(pesadas)}"
+    return texto
+
+# Definicion de la herramienta interna
+HERRAMIENTA = Tool(
+    name="FR_diagnostico_carga",
+    description="Muestra el coste de carga de cada herramienta (tiempo de importacion, memoria e importaciones pesadas) ordenado de mayor a menor, y los modulos de herramientas vivos en el servidor",
+    inputSchema={
+        "type": "object",
+        "properties": {
+            "ordenar_por": {
+                "type": "string",
+                "enum": ["tiempo", "memoria"],
+                "description": "Criterio de ordenacion. Por defecto: tiempo"
+            },
+            "reperfilar": {
+                "type": "boolean",
+                "description": "Si es true, vuelve a importar todas las herramientas con el perfilado activo (las dependencias ya cargadas en el servidor no vuelven a contar)"
+            }
+        }
+    }
+)
+
+def crear_ejecutor(perfiles: dict, reperfilar, estado_modulos=None):
+    """
+    Crea la funcion ejecutar() de FR_diagnostico_carga.
+
+    perfiles: diccionario {nombre_archivo: resumen} que mantiene el servidor
+    reperfilar: funcion sin argumentos que recarga todas las herramientas perfilando
+    estado_modulos: funcion opcional que retorna el estado de los modulos cargados
+    """
+
+    async def ejecutar(argumentos: dict) -> list[TextContent]:
+        """Ejecuta la herramienta FR_diagnostico_carga"""
+        if argumentos.get("reperfilar", False):
+            reperfilar()
+
+        lineas = []
+        if estado_modulos:
+            estado = estado_modulos()
+            lineas.append(
+                f"Modulos de herramientas: {estado['modulos_vivos']} vivos, "
+                f"{estado['pendientes_de_liberar']} descargados sin liberar, "
+                f"memoria del servidor {estado['memoria_mb']} MB"
+            )
+            lineas.append("")
+
+        if not perfiles:
+            lineas.append("No hay datos de perfilado.\n\nActiva \"perfilado_carga\" en config.json o llama a esta herramienta con reperfilar=true.")
+            return [TextContent(type="text", text="\n".join(lineas))]
+
+        clave = "memoria_mb" if argumentos.get("ordenar_por") == "memoria" else "tiempo_s"
+        ordenados = sorted(perfiles.items(), key=lambda p: -p[1][clave])
+
+        tiempo_total = sum(p["tiempo_s"] for p in perfiles.values())
+        lineas += [f"Coste de carga de {len(perfiles)} herramienta(s) - total {tiempo_total:.3f}s", "=" * 60, ""]
+        for posicion, (nombre_archivo, perfil) in enumerate(ordenados, 1):
+            lineas.append(f"{posicion}. {nombre_archivo}")
+            lineas.append(
+                f"   Tiempo: {perfil['tiempo_s']}s  Memoria: {perfil['memoria_mb']:+.2f} MB  "
+                f"Modulos nuevos: {perfil['modulos_nuevos']}"
+            )
+            for importacion in perfil["importaciones"]:
+                if importacion["acumulado_s"] >= UMBRAL_IMPORTACION_PESADA_S:
+                    sangria = "  " * importacion["nivel"]
+                    lineas.append(f"     {sangria}↳ {importacion['modulo']}: {importacion['acumulado_s']}s")
+            lineas.append("")
+
+        return [TextContent(type="text", text="\n".join(lineas))]
+
+    return ejecutar
@@ -0,0 +1,258 @@
+"""
+Resultados - Resultados grandes volcados a disco y leidos por paginas
+Autor: Francisco de la Poza
+
+Una herramienta que produce un listado largo (cambios de un renombrado,
+categorias exportadas a Excel...) escribe cada registro en cuanto lo tiene en
+un archivo JSON lines de 'output/resultados/', en lugar de acumularlo en
+memoria. Al terminar devuelve un resumen corto con el identificador del
+resultado, y el cliente pagina el listado completo:
+  - como recurso MCP:  resultado://<id>?cursor=<cursor>&limite=<n>
+  - con la herramienta interna FR_leer_resultado
+
+El cursor es la posicion en bytes dentro del archivo, asi que leer una pagina
+no recorre las anteriores. Junto a cada volcado se guarda <id>.json con los
+metadatos (herramienta, fecha, registros por tipo). Los volcados con mas de
+DIAS_CONSERVAR dias se borran al crear uno nuevo.
+"""
+
+import json
+import secrets
+import time
+from datetime import datetime
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+from mcp.types import Tool, TextContent
+
+from comun import RUTA_OUTPUT, escribir_atomico
+
+RUTA_RESULTADOS = RUTA_OUTPUT / "resultados"
+
+ESQUEMA_URI = "resultado"
+
+# Registros por pagina si no se indica otro limite (y maximo admitido)
+LIMITE_DEFECTO = 100
+LIMITE_MAXIMO = 1000
+
+# Registros que se guardan en memoria para el resumen inmediato
+MUESTRAS_DEFECTO = 10
+
+DIAS_CONSERVAR = 7
+
+def uri_resultado(identificador: str) -> str:
+    """URI del recurso MCP de un resultado"""
+    return f"{ESQUEMA_URI}://{identificador}"
+
+def _ruta_datos(identificador: str) -> Path:
+    """Archivo JSON lines de un resultado (rechaza identificadores con rutas)"""
+    if not identificador or Path(identificador).name != identificador or identificador.startswith("."):
+        raise ValueError(f"identificador de resultado no valido: {identificador}")
+    return RUTA_RESULTADOS / f"{identificador}.jsonl"
+
+def purgar_antiguos(dias: int = DIAS_CONSERVAR) -> int:
+    """Borra los volcados con mas de 'dias' dias. Retorna cuantos se borraron"""
+    if not RUTA_RESULTADOS.exists():
+        return 0
+    limite = time.time() - dias * 86400
+    borrados = 0
+    for ruta in RUTA_RESULTADOS.glob("*.jsonl"):
+        try:
+            if ruta.stat().st_mtime < limite:
+                ruta.unlink()
+                ruta.with_suffix(".json").unlink(missing_ok=True)
+                borrados += 1
+        except OSError:
+            pass
+    return borrados
+
+class EscritorResultado:
+    """
+    Escribe un resultado registro a registro (context manager).
+
+    Cada registro es un diccionario con un campo "tipo" (por ejemplo "cambio"
+    o "error"). Se cuentan por tipo y se conservan los primeros 'muestras' de
+    cada tipo para el resumen que devuelve la herramienta.
+    """
+
+    def __init__(self, herramienta: str, descripcion: str = "", muestras: int = MUESTRAS_DEFECTO):
+        RUTA_RESULTADOS.mkdir(parents=True, exist_ok=True)
+        purgar_antiguos()
+        marca = datetime.now().strftime("%Y%m%d_%H%M%S")
+        self.identificador = f"{herramienta.lower()}_{marca}_{secrets.token_hex(3)}"
+        self.uri = uri_resultado(self.identificador)
+        self.herramienta = herramienta
+        self.descripcion = descripcion
+        self.maximo_muestras = muestras
+        self.total = 0
+        self.por_tipo = {}
+        self.muestras = {}
+        self._archivo = open(_ruta_datos(self.identificador), "w", encoding="utf-8")
+
+    def escribir(self, registro: dict):
+        """Anade un registro al volcado"""
+        tipo = registro.get("tipo", "registro")
+        self._archivo.write(json.dumps(registro, ensure_ascii=False, default=str) + "\n")
+        self.total += 1
+        self.por_tipo[tipo] = self.por_tipo.get(tipo, 0) + 1
+        muestras = self.muestras.setdefault(tipo, [])
+        if len(muestras) < self.maximo_muestras:
+            muestras.append(registro)
+
+    def cerrar(self):
+        """Cierra el volcado y guarda sus metadatos"""
+        if self._archivo.closed:
+            return
+        self._archivo.close()
+        metadatos = {
+            "id": self.identificador,
+            "uri": self.uri,
+            "herramienta": self.herramienta,
+            "descripcion": self.descripcion,
+            "fecha": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "total": self.total,
+            "por_tipo": self.por_tipo
+        }
+        escribir_atomico(_ruta_datos(self.identificador).with_suffix(".json"), json.dumps(metadatos, indent=2, ensure_ascii=False))
+
+    def pie(self) -> str:
+        """Texto que indica al cliente como leer el resultado completo"""
+        return (
+            f"📄 Resultado completo ({self.total} registros): {self.uri}\n"
+            f"   Paginalo con FR_leer_resultado (id=\"{self.identificador}\")"
+        )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *excepcion):
+        self.cerrar()
+        return False
+
+def leer_metadatos(identificador: str) -> dict:
+    """Metadatos de un resultado (vacio si el volcado sigue abierto o no existe)"""
+    try:
+        with open(_ruta_datos(identificador).with_suffix(".json"), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+def listar_resultados(maximo: int = 100) -> list[dict]:
+    """Metadatos de los resultados guardados, del mas reciente al mas antiguo"""
+    if not RUTA_RESULTADOS.exists():
+        return []
+    rutas = sorted(RUTA_RESULTADOS.glob("*.json"), key=lambda r: r.stat().st_mtime, reverse=True)
+    return [m for m in (leer_metadatos(r.stem) for r in rutas[:maximo]) if m]
+
+def leer_pagina(identificador: str, cursor: str = None, limite: int = LIMITE_DEFECTO, tipo: str = None) -> dict:
+    """
+    Lee una pagina de registros a partir del cursor (None = desde el principio).
+    Retorna {"registros", "siguiente_cursor"}; siguiente_cursor es None al llegar al final.
+    """
+    ruta = _ruta_datos(identificador)
+    if not ruta.exists():
+        raise FileNotFoundError(f"no existe el resultado {identificador}")
+    try:
+        posicion = int(cursor) if cursor else 0
+    except ValueError:
+        raise ValueError(f"cursor no valido: {cursor}")
+    limite = max(1, min(int(limite or LIMITE_DEFECTO), LIMITE_MAXIMO))
+
+    registros = []
+    with open(ruta, "rb") as f:
+        f.seek(posicion)
+        while len(registros) < limite:
+            linea = f.readline()
+            if not linea:
+                return {"registros": registros, "siguiente_cursor": None}
+            if not linea.endswith(b"\n"):
+                # Linea a medio escribir: el volcado sigue abierto
+                break
+            registro = json.loads(linea)
+            if tipo is None or registro.get("tipo") == tipo:
+                registros.append(registro)
+        siguiente = f.tell() if linea.endswith(b"\n") else f.tell() - len(linea)
+
+    # Si no queda nada detras, no hace falta otra pagina
+    if siguiente >= ruta.stat().st_size and leer_metadatos(identificador):
+        return {"registros": registros, "siguiente_cursor": None}
+    return {"registros": registros, "siguiente_cursor": str(siguiente)}
+
+def leer_uri(uri: str) -> str:
+    """Contenido (JSON) del recurso resultado://<id>?cursor=..&limite=..&tipo=.."""
+    partes = urlparse(str(uri))
+    if partes.scheme != ESQUEMA_URI:
+        raise ValueError(f"recurso desconocido: {uri}")
+    parametros = {clave: valores[0] for clave, valores in parse_qs(partes.query).items()}
+    identificador = partes.netloc or partes.path.lstrip("/")
+    pagina = leer_pagina(identificador, parametros.get("cursor"), parametros.get("limite"), parametros.get("tipo"))
+    metadatos = leer_metadatos(identificador)
+    return json.dumps({
+        "id": identificador,
+        "total": metadatos.get("total"),
+        "por_tipo": metadatos.get("por_tipo"),
+        **pagina
+    }, ensure_ascii=False, default=str)
+
+# Definicion de la herramienta interna
+HERRAMIENTA = Tool(
+    name="FR_leer_resultado",
+    description="Pagina el resultado completo de una herramienta que devolvio un resumen con un enlace resultado://. Sin id, lista los resultados guardados",
+    inputSchema={
+        "type": "object",
+        "properties": {
+            "id": {
+                "type": "string",
+                "description": "Identificador del resultado (la parte tras resultado://)"
+            },
+            "cursor": {
+                "type": "string",
+                "description": "Cursor devuelto por la pagina anterior. Vacio para empezar desde el principio"
+            },
+            "limite": {
+                "type": "integer",
+                "minimum": 1,
+                "maximum": LIMITE_MAXIMO,
+                "description": f"Registros por pagina. Por defecto: {LIMITE_DEFECTO}"
+            },
+            "tipo": {
+                "type": "string",
+                "description": "Devolver solo los registros de este tipo (por ejemplo: cambio, error)"
+            }
+        }
+    }
+)
+
+def _describir_registro(registro: dict) -> str:
+    """Linea de texto para un registro"""
+    campos = ", ".join(f"{clave}={valor}" for clave, valor in registro.items() if clave != "tipo")
+    return f"[{registro.get('tipo', 'registro')}] {campos}"
+
+async def ejecutar(argumentos: dict) -> list[TextContent]:
+    """Ejecuta la herramienta FR_leer_resultado"""
+    identificador = (argumentos.get("id") or "").strip()
+    if identificador.startswith(f"{ESQUEMA_URI}://"):
+        identificador = identificador[len(ESQUEMA_URI) + 3:]
+
+    if not identificador:
+        guardados = listar_resultados()
+        if not guardados:
+            return [TextContent(type="text", text="No hay resultados guardados")]
+        lineas = ["Resultados guardados:", ""]
+        for m in guardados:
+            lineas.append(f"- {m['id']}  ({m['herramienta']}, {m['fecha']}, {m['total']} registros)")
+        return [TextContent(type="text", text="\n".join(lineas))]
+
+    try:
+        pagina = leer_pagina(identificador, argumentos.get("cursor"), argumentos.get("limite"), argumentos.get("tipo"))
+    except (FileNotFoundError, ValueError) as e:
+        return [TextContent(type="text", text=f"❌ Error: {e}")]
+
+    metadatos = leer_metadatos(identificador)
+    lineas = [f"Resultado {identificador} - {metadatos.get('total', '?')} registros en total", ""]
+    lineas += [_describir_registro(r) for r in pagina["registros"]]
+    if pagina["siguiente_cursor"]:
+        lineas += ["", f"Siguiente pagina: cursor=\"{pagina['siguiente_cursor']}\""]
+    else:
+        lineas += ["", "Fin del resultado"]
+    return [TextContent(type="text", text="\n".join(lineas))]
@@ -7,19 +7,32 @@ Version: 2.0 (Modular)
 Este servidor carga herramientas dinamicamente desde el directorio 'herramientas/'
 """
 
+import argparse
 import asyncio
-import importlib.util
-import sys
-from datetime import datetime
+import contextlib
+import hashlib
+import inspect
+import os
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from mcp.server import Server
-from mcp.types import Tool, TextContent
+from mcp.server.lowlevel.helper_types import ReadResourceContents
+from mcp.types import Tool, TextContent, Resource, ResourceTemplate
 import mcp.server.stdio
 
-# Configuracion de rutas
-RUTA_BASE = Path(__file__).parent
-RUTA_HERRAMIENTAS = RUTA_BASE / "herramientas"
-RUTA_LOGS = RUTA_BASE / "logs"
+from comun import RUTA_BASE, RUTA_HERRAMIENTAS, RUTA_LOGS, cargar_configuracion, registrar_log
+from trabajadores import PoolTrabajadores
+import indice_herramientas
+import busqueda
+import lotes
+import resultados
+import trabajos
+import vigilancia
+import perfilado
+import verificacion_entorno
+from ciclo_modulos import GestorModulos
+from coalescencia import CoordinadorLlamadas, clave_llamada
+from validacion_esquemas import ArgumentosNoValidos, compilar_esquema
 
 # Crear directorios si no existen
 RUTA_HERRAMIENTAS.mkdir(exist_ok=True)
@@ -31,13 +44,56 @@ servidor = Server("generador-herramientas")
 # Diccionario para almacenar herramientas cargadas
 herramientas_cargadas = {}
 
-def registrar_log(mensaje: str):
-    """Registra mensajes en el archivo de logs"""
-    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    archivo_log = RUTA_LOGS / f"servidor_{datetime.now().strftime('%Y%m%d')}.log"
+# Firma (mtime, tamano) de cada archivo cargado y herramienta que registro,
+# para recargar solo los archivos nuevos o modificados
+firmas_archivos = {}
+herramientas_por_archivo = {}
+
+# Motivo por el que no se pudo cargar cada archivo (para el indice de herramientas)
+errores_carga = {}
+
+# Archivos no cargados por dependencias que faltan y huella del entorno con la que
+# se comprobaron: se reintentan al cambiar la huella (al instalar un paquete)
+archivos_sin_dependencias = {}
+
+# Indice de busqueda sobre el registro, actualizado al registrar o quitar herramientas
+indice_busqueda = busqueda.IndiceBusqueda()
+
+# Modulos de herramientas: se registran bajo un paquete privado y se descargan al recargar o borrar
+gestor_modulos = GestorModulos()
+
+# Perfilado de la importacion de cada herramienta ("perfilado_carga" en config.json)
+perfilado_activo = cargar_configuracion().get("perfilado_carga", False) or os.environ.get("MCP_PERFILADO") == "1"
+perfiles_carga = {}
+
+# Validador compilado del inputSchema de cada herramienta y hash del codigo
+# fuente con el que se compilo: {nombre: (hash, validador)}
+validadores_compilados = {}
+
+# Llamadas identicas en curso comparten una sola ejecucion (COALESCER / RECURSO_EXCLUSIVO)
+coordinador_llamadas = CoordinadorLlamadas()
+
+# Pool de procesos trabajadores (None si se ejecuta todo en el proceso del servidor)
+pool_trabajadores = None
+
+# Hilos para las herramientas de 'herramientas/' que se ejecutan en el proceso del
+# servidor: muchas hacen trabajo sincrono (os.walk, Excel...) dentro de ejecutar() y
+# en el bucle de eventos bloquearian al resto de llamadas, pasos de lote y clientes
+HILOS_HERRAMIENTAS = 8
+hilos_herramientas = ThreadPoolExecutor(max_workers=HILOS_HERRAMIENTAS, thread_name_prefix="herramienta")
+
+# Limite de llamadas simultaneas por cliente (solo con el transporte HTTP, ver transporte_http.py)
+limitador_clientes = None
+
+def obtener_validador(definicion: Tool, hash_fuente: str):
+    """Retorna el validador del inputSchema, recompilandolo solo si cambio el codigo fuente"""
+    en_cache = validadores_compilados.get(definicion.name)
+    if en_cache and en_cache[0] == hash_fuente:
+        return en_cache[1]
     
-    with open(archivo_log, "a", encoding="utf-8") as f:
-        f.write(f"[{timestamp}] {mensaje}\n")
+    validador = compilar_esquema(definicion.inputSchema)
+    validadores_compilados[definicion.name] = (hash_fuente, validador)
+    return validador
 
 def cargar_herramienta(ruta_archivo: Path) -> dict:
     """
@@ -49,55 +105,246 @@ def cargar_herramienta(ruta_archivo: Path) -> dict:
     """
     try:
         # Cargar el modulo dinamicamente
-        spec = importlib.util.spec_from_file_location(ruta_archivo.stem, ruta_archivo)
-        modulo = importlib.util.module_from_spec(spec)
-        sys.modules[ruta_archivo.stem] = modulo
-        spec.loader.exec_module(modulo)
+        perfil = perfilado.PerfilImportacion() if perfilado_activo else contextlib.nullcontext()
+        with perfil:
+            modulo = gestor_modulos.cargar(ruta_archivo)
+        if perfilado_activo:
+            perfiles_carga[ruta_archivo.name] = perfil.resumen()
+            registrar_log(perfilado.describir(ruta_archivo.name, perfiles_carga[ruta_archivo.name]))
         
         # Verificar que tenga los componentes necesarios
         if not hasattr(modulo, 'HERRAMIENTA'):
             registrar_log(f"ADVERTENCIA: {ruta_archivo.name} no tiene HERRAMIENTA")
+            errores_carga[ruta_archivo] = "no tiene HERRAMIENTA"
+            gestor_modulos.descargar(ruta_archivo)
             return None
         
         if not hasattr(modulo, 'ejecutar'):
             registrar_log(f"ADVERTENCIA: {ruta_archivo.name} no tiene funcion ejecutar()")
+            errores_carga[ruta_archivo] = "no tiene funcion ejecutar()"
+            gestor_modulos.descargar(ruta_archivo)
             return None
         
         herramienta_def = modulo.HERRAMIENTA
+        hash_fuente = hashlib.sha256(ruta_archivo.read_bytes()).hexdigest()
+        validar = obtener_validador(herramienta_def, hash_fuente)
         
         registrar_log(f"Herramienta cargada: {herramienta_def.name}")
         
         return {
             'definicion': herramienta_def,
-            'ejecutar': modulo.ejecutar
+            'ejecutar': modulo.ejecutar,
+            'ruta': ruta_archivo,
+            'aislar': getattr(modulo, 'AISLAR', True),
+            'validar': validar,
+            'coalescer': getattr(modulo, 'COALESCER', True),
+            'recurso_exclusivo': getattr(modulo, 'RECURSO_EXCLUSIVO', None)
         }
         
     except Exception as e:
         registrar_log(f"ERROR cargando {ruta_archivo.name}: {e}")
+        errores_carga[ruta_archivo] = str(e)
         return None
 
+def descargar_archivo(archivo: Path):
+    """Quita del registro la herramienta que proviene de un archivo"""
+    firmas_archivos.pop(archivo, None)
+    errores_carga.pop(archivo, None)
+    archivos_sin_dependencias.pop(archivo, None)
+    perfiles_carga.pop(archivo.name, None)
+    gestor_modulos.descargar(archivo)
+    nombre = herramientas_por_archivo.pop(archivo, None)
+    if nombre:
+        herramientas_cargadas.pop(nombre, None)
+        if not archivo.exists():
+            validadores_compilados.pop(nombre, None)
+        indice_busqueda.quitar(nombre)
+
+def registrar_herramienta_interna(definicion: Tool, ejecutar, coalescer: bool = True):
+    """Registra una herramienta implementada en el propio servidor (no en 'herramientas/')"""
+    herramientas_cargadas[definicion.name] = {
+        'definicion': definicion,
+        'ejecutar': ejecutar,
+        'ruta': None,
+        'aislar': False,
+        'validar': compilar_esquema(definicion.inputSchema),
+        'coalescer': coalescer,
+        'recurso_exclusivo': None
+    }
+    indice_busqueda.agregar(definicion)
+
 def cargar_todas_las_herramientas():
-    """Carga todas las herramientas desde el directorio"""
-    global herramientas_cargadas
-    herramientas_cargadas.clear()
+    """
+    Sincroniza el registro con el directorio de herramientas.
     
-    archivos_herramientas = list(RUTA_HERRAMIENTAS.glob("FR_*.py"))
+    Solo se importan los archivos nuevos o cuya firma (mtime, tamano) ha cambiado,
+    por ejemplo tras publicar o restaurar una version, y se descartan los eliminados.
+    El indice de metadatos se actualiza solo con esos mismos archivos.
     
-    registrar_log(f"Buscando herramientas en: {RUTA_HERRAMIENTAS}")
-    registrar_log(f"Encontrados {len(archivos_herramientas)} archivos")
+    Los archivos con dependencias que faltan no se importan y quedan en el
+    indice como error hasta que cambie el entorno (ver verificacion_entorno.py).
+    """
+    archivos_herramientas = list(RUTA_HERRAMIENTAS.glob("FR_*.py"))
+    verificacion = verificacion_entorno.verificar_herramientas(archivos_herramientas)
+    huella = verificacion["huella"]
     
+    cambios = {}
     for archivo in archivos_herramientas:
+        try:
+            estado = archivo.stat()
+        except FileNotFoundError:
+            continue
+        firma = (estado.st_mtime_ns, estado.st_size)
+        if firmas_archivos.get(archivo) == firma and archivos_sin_dependencias.get(archivo, huella) == huella:
+            continue
+        
+        descargar_archivo(archivo)
+        firmas_archivos[archivo] = firma
+        
+        faltan = verificacion["herramientas"].get(archivo.name, {}).get("faltan")
+        if faltan:
+            errores_carga[archivo] = f"dependencias no disponibles: {', '.join(faltan)}"
+            archivos_sin_dependencias[archivo] = huella
+            registrar_log(f"ADVERTENCIA: {archivo.name} no disponible, {errores_carga[archivo]}")
+            cambios[archivo] = (indice_herramientas.ESTADO_ERROR, errores_carga[archivo])
+            continue
+        
         herramienta = cargar_herramienta(archivo)
         if herramienta:
             nombre = herramienta['definicion'].name
             herramientas_cargadas[nombre] = herramienta
+            herramientas_por_archivo[archivo] = nombre
+            indice_busqueda.agregar(herramienta['definicion'])
+            cambios[archivo] = (indice_herramientas.ESTADO_CARGADA, None)
+        else:
+            cambios[archivo] = (indice_herramientas.ESTADO_ERROR, errores_carga.get(archivo))
+    
+    eliminados = set(firmas_archivos) - set(archivos_herramientas)
+    for archivo in eliminados:
+        registrar_log(f"Herramienta eliminada: {archivo.name}")
+        descargar_archivo(archivo)
+    
+    if cambios or eliminados:
+        try:
+            indice_herramientas.registrar_cambios(cambios, list(eliminados))
+        except Exception as e:
+            registrar_log(f"ADVERTENCIA: no se pudo actualizar el indice de herramientas: {e}")
+        registrar_log(f"Buscando herramientas en: {RUTA_HERRAMIENTAS}")
+        registrar_log(f"Encontrados {len(archivos_herramientas)} archivos ({len(cambios)} nuevos o modificados)")
+        registrar_log(f"Cargadas {len(herramientas_cargadas)} herramientas exitosamente")
+        gestor_modulos.liberar()
+        estado_modulos = gestor_modulos.estado()
+        registrar_log(
+            f"Modulos de herramientas: {estado_modulos['modulos_vivos']} vivos, "
+            f"{estado_modulos['pendientes_de_liberar']} descargados sin liberar, "
+            f"memoria {estado_modulos['memoria_mb']} MB"
+        )
+        if pool_trabajadores:
+            pool_trabajadores.actualizar_precarga(list(herramientas_por_archivo))
+        if perfilado_activo and perfiles_carga:
+            mas_costosas = sorted(perfiles_carga.items(), key=lambda p: -p[1]['tiempo_s'])[:5]
+            registrar_log("Herramientas mas costosas de cargar: " + ", ".join(
+                f"{nombre_archivo} ({perfil['tiempo_s']}s)" for nombre_archivo, perfil in mas_costosas
+            ))
+
+def reperfilar_herramientas():
+    """Vuelve a importar todas las herramientas con el perfilado activo"""
+    global perfilado_activo
+    anterior = perfilado_activo
+    perfilado_activo = True
+    perfiles_carga.clear()
+    firmas_archivos.clear()
+    try:
+        cargar_todas_las_herramientas()
+    finally:
+        perfilado_activo = anterior
+
+def reintentar_sin_dependencias(informe: dict):
+    """Vuelve a cargar los archivos a los que ya no les falta ninguna dependencia"""
+    for archivo in list(archivos_sin_dependencias):
+        if not informe["herramientas"].get(archivo.name, {}).get("faltan"):
+            firmas_archivos.pop(archivo, None)
+    cargar_todas_las_herramientas()
+
+# Herramientas internas del servidor
+registrar_herramienta_interna(busqueda.HERRAMIENTA, busqueda.crear_ejecutor(indice_busqueda))
+registrar_herramienta_interna(resultados.HERRAMIENTA, resultados.ejecutar)
+registrar_herramienta_interna(trabajos.HERRAMIENTA, trabajos.ejecutar)
+registrar_herramienta_interna(perfilado.HERRAMIENTA, perfilado.crear_ejecutor(perfiles_carga, reperfilar_herramientas, gestor_modulos.estado))
+registrar_herramienta_interna(verificacion_entorno.HERRAMIENTA, verificacion_entorno.crear_ejecutor(
+    lambda: list(RUTA_HERRAMIENTAS.glob("FR_*.py")),
+    reintentar_sin_dependencias
+))
+
+def _ejecutar_en_hilo(ejecutar, argumentos: dict, al_empezar=None):
+    """Ejecuta la corrutina de una herramienta en un bucle de eventos propio del hilo"""
+    if al_empezar:
+        al_empezar()
+    return asyncio.run(ejecutar(argumentos))
+
+async def despachar_llamada(nombre: str, argumentos: dict, al_empezar=None) -> list[TextContent]:
+    """
+    Valida los argumentos y ejecuta una herramienta registrada: en el pool de
+    trabajadores si esta activo, y si no en hilos_herramientas (las internas, en el
+    bucle de eventos). Una llamada identica a otra en curso comparte su resultado.
+    al_empezar() se llama cuando la herramienta empieza de verdad (tras esperar a
+    su recurso o a un hilo libre). Lanza excepcion si la llamada no es posible o falla.
+    """
+    herramienta = herramientas_cargadas.get(nombre)
+    if herramienta is None:
+        raise LookupError(f"Herramienta no encontrada: {nombre}")
+    
+    errores_validacion = herramienta['validar'](argumentos)
+    if errores_validacion:
+        raise ArgumentosNoValidos(nombre, errores_validacion)
+    
+    def crear_llamada():
+        if pool_trabajadores and herramienta['aislar']:
+            if al_empezar:
+                al_empezar()
+            return pool_trabajadores.ejecutar(herramienta['ruta'], argumentos)
+        if herramienta['ruta'] is not None:
+            return asyncio.get_running_loop().run_in_executor(
+                hilos_herramientas, _ejecutar_en_hilo, herramienta['ejecutar'], argumentos, al_empezar
+            )
+        if al_empezar:
+            al_empezar()
+        return herramienta['ejecutar'](argumentos)
+    
+    clave = clave_llamada(nombre, argumentos)
+    if herramienta['coalescer'] and clave in coordinador_llamadas.en_curso:
+        registrar_log(f"Llamada identica a {nombre} en curso: se comparte su resultado")
     
-    registrar_log(f"Cargadas {len(herramientas_cargadas)} herramientas exitosamente")
+    return await coordinador_llamadas.ejecutar(
+        clave,
+        crear_llamada,
+        coalescer=herramienta['coalescer'],
+        recurso=coordinador_llamadas.recurso(herramienta['recurso_exclusivo'], argumentos)
+    )
+
+async def despachar_en_turno(nombre: str, argumentos: dict, al_empezar=None) -> list[TextContent]:
+    """
+    despachar_llamada dentro del turno del cliente que hace la peticion (en modo
+    HTTP cada cliente tiene un limite de llamadas simultaneas, ver transporte_http.py).
+    """
+    if limitador_clientes is None:
+        return await despachar_llamada(nombre, argumentos, al_empezar)
+    async with limitador_clientes.turno(servidor.request_context.session):
+        return await despachar_llamada(nombre, argumentos, al_empezar)
+
+# Cada paso de un lote ocupa su propio turno del cliente; el lote en si no ocupa
+# ninguno (solo espera a sus pasos), asi no se bloquea con limites pequenos
+registrar_herramienta_interna(lotes.HERRAMIENTA, lotes.crear_ejecutor(
+    despachar_en_turno,
+    lambda nombre: nombre in herramientas_cargadas,
+    cargar_todas_las_herramientas,
+    lambda: limitador_clientes.llamadas_por_cliente if limitador_clientes else None
+))
 
 @servidor.list_tools()
 async def listar_herramientas() -> list[Tool]:
     """Lista todas las herramientas disponibles (cargadas dinamicamente)"""
-    # Recargar herramientas cada vez que se listen (para detectar cambios)
+    # Recargar las herramientas modificadas cada vez que se listen (para detectar cambios)
     cargar_todas_las_herramientas()
     
     herramientas = [h['definicion'] for h in herramientas_cargadas.values()]
@@ -106,7 +353,42 @@ async def listar_herramientas() -> list[Tool]:
     
     return herramientas
 
-@servidor.call_tool()
+# Los argumentos se validan en ejecutar_herramienta() con el validador precompilado;
+# se desactiva la validacion generica de la libreria (que reinterpreta el esquema en
+# cada llamada) cuando la version de mcp lo permite
+opciones_call_tool = {"validate_input": False} if "validate_input" in inspect.signature(servidor.call_tool).parameters else {}
+
+@servidor.list_resources()
+async def listar_recursos() -> list[Resource]:
+    """Lista los resultados grandes guardados en 'output/resultados/'"""
+    return [
+        Resource(
+            uri=m['uri'],
+            name=m['id'],
+            description=f"{m['herramienta']} ({m['fecha']}): {m['total']} registros. {m['descripcion']}".strip(),
+            mimeType="application/json"
+        )
+        for m in resultados.listar_resultados()
+    ]
+
+@servidor.list_resource_templates()
+async def listar_plantillas_recursos() -> list[ResourceTemplate]:
+    """Plantilla para leer un resultado por paginas"""
+    return [
+        ResourceTemplate(
+            uriTemplate=f"{resultados.ESQUEMA_URI}://{{id}}{{?cursor,limite,tipo}}",
+            name="resultado",
+            description="Pagina de un resultado grande. Cada pagina incluye siguiente_cursor (null al final)",
+            mimeType="application/json"
+        )
+    ]
+
+@servidor.read_resource()
+async def leer_recurso(uri) -> list[ReadResourceContents]:
+    """Lee una pagina de un resultado guardado"""
+    return [ReadResourceContents(content=resultados.leer_uri(str(uri)), mime_type="application/json")]
+
+@servidor.call_tool(**opciones_call_tool)
 async def ejecutar_herramienta(nombre: str, argumentos: dict) -> list[TextContent]:
     """Ejecuta la herramienta solicitada"""
     
@@ -118,21 +400,43 @@ async def ejecutar_herramienta(nombre: str, argumentos: dict) -> list[TextConten
     
     try:
         registrar_log(f"Ejecutando: {nombre} con args: {argumentos}")
-        resultado = await herramientas_cargadas[nombre]['ejecutar'](argumentos)
+        if nombre == lotes.NOMBRE_HERRAMIENTA:
+            resultado = await despachar_llamada(nombre, argumentos)
+        else:
+            resultado = await despachar_en_turno(nombre, argumentos)
         registrar_log(f"Ejecucion exitosa: {nombre}")
         return resultado
+    except ArgumentosNoValidos as e:
+        error_msg = f"ERROR: argumentos no validos para {nombre}:\n" + "\n".join(f"  - {error}" for error in e.errores)
+        registrar_log(f"ERROR: argumentos no validos para {nombre}: {'; '.join(e.errores)}")
+        return [TextContent(type="text", text=error_msg)]
     except Exception as e:
         error_msg = f"ERROR ejecutando {nombre}: {str(e)}"
         registrar_log(error_msg)
         return [TextContent(type="text", text=error_msg)]
 
-async def main():
-    """Funcion principal para ejecutar el servidor"""
+async def main(modo_transporte: str = None, puerto: int = None):
+    """
+    Funcion principal para ejecutar el servidor
+    
+    modo_transporte: "stdio" (un proceso por cliente) o "http" (un proceso compartido
+                     por varios clientes). Por defecto, la seccion "transporte" de config.json
+    """
+    global pool_trabajadores, limitador_clientes
+    
+    configuracion_transporte = cargar_configuracion().get("transporte", {})
+    modo_transporte = modo_transporte or configuracion_transporte.get("modo", "stdio")
+    
     registrar_log("=" * 60)
     registrar_log("Servidor MCP Modular iniciado")
     registrar_log(f"Directorio de herramientas: {RUTA_HERRAMIENTAS}")
     registrar_log(f"Directorio de logs: {RUTA_LOGS}")
     
+    # Verificar el entorno antes de importar nada (las dependencias quedan en cache)
+    informe = verificacion_entorno.verificar_entorno(list(RUTA_HERRAMIENTAS.glob("FR_*.py")))
+    for linea in verificacion_entorno.describir(informe).splitlines():
+        registrar_log(linea)
+    
     # Cargar herramientas iniciales
     cargar_todas_las_herramientas()
     
@@ -140,13 +444,54 @@ async def main():
     for nombre in herramientas_cargadas.keys():
         registrar_log(f"  - {nombre}")
     
-    # NO usar print() aqui - interfiere con la comunicacion stdio JSON
-    async with mcp.server.stdio.stdio_server() as (read_stream, write_stream):
-        await servidor.run(
-            read_stream,
-            write_stream,
-            servidor.create_initialization_options()
-        )
+    # Ejecucion en procesos trabajadores (opcional, seccion "trabajadores" de config.json)
+    configuracion_trabajadores = cargar_configuracion().get("trabajadores", {})
+    if configuracion_trabajadores.get("activado", False):
+        pool_trabajadores = PoolTrabajadores.desde_configuracion(configuracion_trabajadores)
+        pool_trabajadores.iniciar(list(herramientas_por_archivo))
+    
+    # Exportacion automatica de los revit_data.json (seccion "vigilancia" de config.json)
+    tarea_vigilancia = None
+    configuracion_vigilancia = cargar_configuracion().get("vigilancia", {})
+    if configuracion_vigilancia.get("activado", False):
+        tarea_vigilancia = asyncio.create_task(vigilancia.vigilar(
+            vigilancia.desde_configuracion(configuracion_vigilancia),
+            configuracion_vigilancia.get("intervalo_s", vigilancia.INTERVALO_S)
+        ))
+    
+    try:
+        if modo_transporte == "http":
+            import transporte_http
+            limitador_clientes = transporte_http.LimitadorClientes(
+                configuracion_transporte.get("llamadas_por_cliente", transporte_http.LLAMADAS_POR_CLIENTE),
+                configuracion_transporte.get("en_espera_por_cliente", transporte_http.EN_ESPERA_POR_CLIENTE)
+            )
+            await transporte_http.servir(
+                servidor,
+                configuracion_transporte.get("host", transporte_http.HOST_DEFECTO),
+                puerto or configuracion_transporte.get("puerto", transporte_http.PUERTO_DEFECTO),
+                configuracion_transporte.get("max_clientes", transporte_http.MAX_CLIENTES)
+            )
+        else:
+            # NO usar print() aqui - interfiere con la comunicacion stdio JSON
+            async with mcp.server.stdio.stdio_server() as (read_stream, write_stream):
+                await servidor.run(
+                    read_stream,
+                    write_stream,
+                    servidor.create_initialization_options()
+                )
+    finally:
+        if tarea_vigilancia:
+            tarea_vigilancia.cancel()
+        if pool_trabajadores:
+            await pool_trabajadores.detener()
+        # Las llamadas que siguen en un hilo no se esperan: el proceso va a terminar
+        hilos_herramientas.shutdown(wait=False, cancel_futures=True)
+        trabajos.detener_cola()
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Servidor MCP de herramientas")
+    parser.add_argument("--transporte", choices=["stdio", "http"], help="por defecto, el de config.json (stdio si no se indica)")
+    parser.add_argument("--puerto", type=int, help="puerto del transporte HTTP")
+    args = parser.parse_args()
+    asyncio.run(main(args.transporte, args.puerto))
\ No newline at end of file
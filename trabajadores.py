@@ -0,0 +1,289 @@
+"""
+Trabajadores - Pool de procesos para ejecutar herramientas aisladas del servidor
+Autor: Francisco de la Poza
+
+Cada trabajador es un proceso de larga duracion que precarga los modulos de las
+herramientas y los mantiene en memoria (se reimportan solo si cambia el archivo).
+Las llamadas viajan por un Pipe serializadas con pickle y el trabajador se recicla
+tras un numero de llamadas o al superar un umbral de memoria.
+
+Un fallo, una fuga de memoria o un bloqueo del GIL en una herramienta queda dentro
+del trabajador y no tumba el servidor MCP. Varias llamadas pesadas (por ejemplo la
+exportacion a Excel) se reparten entre nucleos.
+
+Se activa en config.json:
+    "trabajadores": {"activado": true, "numero": 2, "max_llamadas": 100,
+                     "max_memoria_mb": 500, "tiempo_limite_s": 600}
+
+Una herramienta puede quedarse en el proceso del servidor declarando AISLAR = False.
+"""
+
+import asyncio
+import multiprocessing
+import os
+import pickle
+import sys
+from pathlib import Path
+
+from ciclo_modulos import GestorModulos
+from comun import memoria_proceso_mb, registrar_log
+
+# Valores por defecto de la seccion "trabajadores" de config.json
+NUMERO_TRABAJADORES = 2
+MAX_LLAMADAS = 100
+MAX_MEMORIA_MB = 500
+TIEMPO_LIMITE_S = 600
+
+# Reintentos al arrancar un trabajador de reemplazo (esperas de 1, 2, 4... segundos)
+REINTENTOS_ARRANQUE = 3
+ESPERA_REINTENTO_S = 1.0
+
+# Se pone en la cola de libres cuando el pool se queda sin procesos: despierta a las
+# llamadas que esperan para que fallen en vez de quedarse colgadas
+_SIN_TRABAJADORES = object()
+
+def _importar_modulo(gestor: GestorModulos, modulos: dict, ruta: Path):
+    """Retorna el modulo de la herramienta, reimportandolo solo si el archivo cambio"""
+    estado = ruta.stat()
+    firma = (estado.st_mtime_ns, estado.st_size)
+    en_cache = modulos.get(ruta)
+    if en_cache and en_cache[0] == firma:
+        return en_cache[1]
+
+    modulos.pop(ruta, None)
+    modulo = gestor.cargar(ruta)
+    modulos[ruta] = (firma, modulo)
+    return modulo
+
+def _bucle_trabajador(conexion, precargar: list[str]):
+    """Bucle principal del proceso trabajador"""
+    # stdout del proceso padre es el canal stdio de MCP: nada debe escribirse ahi
+    sys.stdout = sys.stderr
+    try:
+        os.dup2(sys.stderr.fileno(), 1)
+    except (OSError, ValueError):
+        pass
+
+    gestor = GestorModulos()
+    modulos = {}
+    bucle = asyncio.new_event_loop()
+    asyncio.set_event_loop(bucle)
+
+    for ruta in precargar:
+        try:
+            _importar_modulo(gestor, modulos, Path(ruta))
+        except Exception:
+            # El error se reporta cuando se llame a la herramienta
+            pass
+
+    while True:
+        try:
+            mensaje = conexion.recv_bytes()
+        except (EOFError, OSError):
+            break
+        if not mensaje:
+            break
+
+        ruta, argumentos = pickle.loads(mensaje)
+        try:
+            modulo = _importar_modulo(gestor, modulos, Path(ruta))
+            respuesta = (True, bucle.run_until_complete(modulo.ejecutar(argumentos)))
+        except Exception as e:
+            respuesta = (False, f"{type(e).__name__}: {e}")
+
+        try:
+            datos = pickle.dumps((*respuesta, memoria_proceso_mb()), pickle.HIGHEST_PROTOCOL)
+        except Exception as e:
+            datos = pickle.dumps((False, f"Resultado no serializable: {e}", memoria_proceso_mb()), pickle.HIGHEST_PROTOCOL)
+        conexion.send_bytes(datos)
+
+    bucle.close()
+
+class TrabajadorCaido(RuntimeError):
+    """El proceso trabajador termino o no respondio a tiempo"""
+
+class Trabajador:
+    """Un proceso trabajador y el extremo del Pipe que lo comunica con el servidor"""
+
+    def __init__(self, contexto, precargar: list[str]):
+        self.conexion, extremo_hijo = contexto.Pipe()
+        self.proceso = contexto.Process(
+            target=_bucle_trabajador,
+            args=(extremo_hijo, precargar),
+            daemon=True
+        )
+        self.proceso.start()
+        extremo_hijo.close()
+        self.llamadas = 0
+        self.memoria_mb = 0.0
+
+    def llamar(self, ruta: Path, argumentos: dict, tiempo_limite_s: float):
+        """Envia una llamada y espera la respuesta (bloqueante, se usa desde un hilo)"""
+        try:
+            self.conexion.send_bytes(pickle.dumps((str(ruta), argumentos), pickle.HIGHEST_PROTOCOL))
+            if not self.conexion.poll(tiempo_limite_s):
+                raise TrabajadorCaido(f"sin respuesta tras {tiempo_limite_s}s")
+            ok, carga, self.memoria_mb = pickle.loads(self.conexion.recv_bytes())
+        except (EOFError, OSError, BrokenPipeError) as e:
+            raise TrabajadorCaido(f"el proceso termino inesperadamente ({type(e).__name__})")
+        finally:
+            self.llamadas += 1
+
+        if not ok:
+            raise RuntimeError(carga)
+        return carga
+
+    def detener(self):
+        """Detiene el proceso de forma ordenada o, si no responde, lo termina"""
+        try:
+            self.conexion.send_bytes(b"")
+        except (OSError, ValueError):
+            pass
+        self.proceso.join(timeout=2)
+        if self.proceso.is_alive():
+            self.proceso.terminate()
+            self.proceso.join(timeout=2)
+        self.conexion.close()
+
+class PoolTrabajadores:
+    """Pool de procesos trabajadores de larga duracion"""
+
+    def __init__(self, numero: int = NUMERO_TRABAJADORES, max_llamadas: int = MAX_LLAMADAS,
+                 max_memoria_mb: float = MAX_MEMORIA_MB, tiempo_limite_s: float = TIEMPO_LIMITE_S):
+        self.numero = max(1, numero)
+        self.max_llamadas = max_llamadas
+        self.max_memoria_mb = max_memoria_mb
+        self.tiempo_limite_s = tiempo_limite_s
+        # spawn en todas las plataformas: fork con hilos del bucle asyncio no es seguro
+        self._contexto = multiprocessing.get_context("spawn")
+        self._precargar = []
+        self._trabajadores = []
+        self._libres = None
+        # Reemplazos en curso (se hacen en segundo plano para no bloquear el bucle)
+        self._reemplazos = set()
+        self.reciclados = 0
+
+    @classmethod
+    def desde_configuracion(cls, configuracion: dict):
+        """Crea el pool a partir de la seccion "trabajadores" de config.json"""
+        return cls(
+            numero=configuracion.get("numero", NUMERO_TRABAJADORES),
+            max_llamadas=configuracion.get("max_llamadas", MAX_LLAMADAS),
+            max_memoria_mb=configuracion.get("max_memoria_mb", MAX_MEMORIA_MB),
+            tiempo_limite_s=configuracion.get("tiempo_limite_s", TIEMPO_LIMITE_S)
+        )
+
+    def iniciar(self, precargar: list[Path]):
+        """Arranca los trabajadores. Debe llamarse desde el bucle asyncio del servidor"""
+        self._precargar = [str(ruta) for ruta in precargar]
+        self._libres = asyncio.Queue()
+        for _ in range(self.numero):
+            trabajador = Trabajador(self._contexto, self._precargar)
+            self._trabajadores.append(trabajador)
+            self._libres.put_nowait(trabajador)
+        registrar_log(f"Pool de trabajadores iniciado: {self.numero} procesos, {len(self._precargar)} modulos precargados")
+
+    def actualizar_precarga(self, precargar: list[Path]):
+        """Modulos que precargaran los trabajadores que se creen a partir de ahora"""
+        self._precargar = [str(ruta) for ruta in precargar]
+
+    async def _reemplazar(self, trabajador: Trabajador, motivo: str):
+        """
+        Detiene un trabajador, arranca otro en su lugar y lo deja libre (join y arranque en hilos).
+
+        Si el arranque falla se reintenta; agotados los reintentos el hueco se elimina
+        del pool para que ninguna llamada espere un trabajador que no va a llegar.
+        """
+        registrar_log(
+            f"Reciclando trabajador pid={trabajador.proceso.pid} ({motivo}): "
+            f"{trabajador.llamadas} llamadas, {trabajador.memoria_mb:.1f} MB"
+        )
+        try:
+            await asyncio.to_thread(trabajador.detener)
+        except Exception as e:
+            registrar_log(f"ERROR deteniendo el trabajador pid={trabajador.proceso.pid}: {e}")
+
+        for intento in range(1, REINTENTOS_ARRANQUE + 1):
+            try:
+                nuevo = await asyncio.to_thread(Trabajador, self._contexto, self._precargar)
+            except Exception as e:
+                registrar_log(f"ERROR arrancando el trabajador de reemplazo (intento {intento}/{REINTENTOS_ARRANQUE}): {e}")
+                if intento < REINTENTOS_ARRANQUE:
+                    await asyncio.sleep(ESPERA_REINTENTO_S * 2 ** (intento - 1))
+                continue
+            self._trabajadores[self._trabajadores.index(trabajador)] = nuevo
+            self.reciclados += 1
+            self._libres.put_nowait(nuevo)
+            return
+
+        self._retirar(trabajador)
+
+    def _retirar(self, trabajador: Trabajador):
+        """Quita un hueco del pool; si no queda ninguno, hace fallar a las llamadas en espera"""
+        if trabajador in self._trabajadores:
+            self._trabajadores.remove(trabajador)
+        registrar_log(f"ERROR: trabajador retirado del pool, quedan {len(self._trabajadores)} procesos")
+        if not self._trabajadores:
+            self._libres.put_nowait(_SIN_TRABAJADORES)
+
+    def _reemplazo_terminado(self, trabajador: Trabajador, tarea: asyncio.Task):
+        self._reemplazos.discard(tarea)
+        if tarea.cancelled():
+            return
+        error = tarea.exception()
+        if error is not None:
+            registrar_log(f"ERROR inesperado reemplazando un trabajador: {error}")
+            self._retirar(trabajador)
+
+    def _reemplazar_en_segundo_plano(self, trabajador: Trabajador, motivo: str):
+        tarea = asyncio.get_running_loop().create_task(self._reemplazar(trabajador, motivo))
+        self._reemplazos.add(tarea)
+        tarea.add_done_callback(lambda t: self._reemplazo_terminado(trabajador, t))
+
+    async def ejecutar(self, ruta: Path, argumentos: dict):
+        """Ejecuta la herramienta de 'ruta' en un trabajador libre y retorna su resultado"""
+        trabajador = await self._libres.get()
+        if trabajador is _SIN_TRABAJADORES:
+            # Se deja en la cola para las demas llamadas en espera
+            self._libres.put_nowait(trabajador)
+            raise RuntimeError("El pool de trabajadores no tiene procesos: no se pudo arrancar ninguno de reemplazo")
+        motivo = None
+        try:
+            return await asyncio.to_thread(trabajador.llamar, ruta, argumentos, self.tiempo_limite_s)
+        except TrabajadorCaido as e:
+            motivo = str(e)
+            raise RuntimeError(f"El proceso trabajador fallo: {e}")
+        except asyncio.CancelledError:
+            # El hilo sigue esperando la respuesta en el Pipe: si se reutilizara el
+            # trabajador, la siguiente llamada podria leer la respuesta de esta
+            motivo = "llamada cancelada"
+            raise
+        finally:
+            if motivo is None and trabajador.llamadas >= self.max_llamadas:
+                motivo = "limite de llamadas"
+            elif motivo is None and self.max_memoria_mb and trabajador.memoria_mb > self.max_memoria_mb:
+                motivo = "limite de memoria"
+            if motivo:
+                self._reemplazar_en_segundo_plano(trabajador, motivo)
+            else:
+                self._libres.put_nowait(trabajador)
+
+    def estado(self) -> dict:
+        """Resumen del estado del pool"""
+        return {
+            "procesos": len(self._trabajadores),
+            "libres": self._libres.qsize() if self._libres and self._trabajadores else 0,
+            "reciclados": self.reciclados,
+            "trabajadores": [
+                {"pid": t.proceso.pid, "llamadas": t.llamadas, "memoria_mb": round(t.memoria_mb, 1)}
+                for t in self._trabajadores
+            ]
+        }
+
+    async def detener(self):
+        """Detiene todos los trabajadores (en hilos, a la vez)"""
+        if self._reemplazos:
+            await asyncio.gather(*self._reemplazos, return_exceptions=True)
+        await asyncio.gather(*(asyncio.to_thread(t.detener) for t in self._trabajadores))
+        self._trabajadores.clear()
+        registrar_log("Pool de trabajadores detenido")
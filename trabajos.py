@@ -0,0 +1,247 @@
+"""
+Trabajos - Cola de trabajos en segundo plano para herramientas largas
+Autor: Francisco de la Poza
+
+Una herramienta que tarda minutos (por ejemplo, exportar un modelo de Revit a
+Excel) no debe tener bloqueada la llamada MCP: envia el trabajo a la cola,
+responde al momento con su identificador y el cliente consulta el estado y el
+progreso con la herramienta interna FR_estado_trabajo.
+
+Los trabajos se ejecutan en un pool de hilos con concurrencia limitada; los que
+superan el limite esperan en cola. La funcion de cada trabajo recibe como primer
+argumento una funcion progreso(fraccion, mensaje) para informar de su avance.
+
+La concurrencia se configura en config.json:
+    "trabajos": {"concurrencia": 2}
+
+La cola vive en el proceso del servidor, asi que las herramientas que envian
+trabajos deben declarar AISLAR = False.
+"""
+
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from mcp.types import Tool, TextContent
+
+from comun import cargar_configuracion, registrar_log
+
+CONCURRENCIA_DEFECTO = 2
+
+# Trabajos terminados que se conservan para consultar su resultado
+MAX_TERMINADOS = 100
+
+EN_COLA = "en_cola"
+EN_CURSO = "en_curso"
+COMPLETADO = "completado"
+ERROR = "error"
+CANCELADO = "cancelado"
+
+TERMINADOS = (COMPLETADO, ERROR, CANCELADO)
+
+class Trabajo:
+    """Estado de un trabajo enviado a la cola"""
+
+    def __init__(self, herramienta: str, descripcion: str):
+        self.id = uuid.uuid4().hex[:12]
+        self.herramienta = herramienta
+        self.descripcion = descripcion
+        self.estado = EN_COLA
+        self.progreso = 0.0
+        self.mensaje = "Esperando turno"
+        self.resultado = None
+        self.error = None
+        self.creado = time.time()
+        self.inicio = None
+        self.fin = None
+        self.futuro = None
+
+    def actualizar_progreso(self, fraccion: float, mensaje: str = None):
+        """Funcion progreso() que recibe el trabajo"""
+        self.progreso = max(0.0, min(1.0, float(fraccion)))
+        if mensaje:
+            self.mensaje = mensaje
+
+    def resumen(self) -> dict:
+        """Diccionario con el estado del trabajo"""
+        ahora = self.fin or time.time()
+        return {
+            "id": self.id,
+            "herramienta": self.herramienta,
+            "descripcion": self.descripcion,
+            "estado": self.estado,
+            "progreso": round(self.progreso, 3),
+            "mensaje": self.mensaje,
+            "creado": datetime.fromtimestamp(self.creado).strftime("%Y-%m-%d %H:%M:%S"),
+            "espera_s": round((self.inicio or ahora) - self.creado, 2),
+            "duracion_s": round(ahora - self.inicio, 2) if self.inicio else None,
+            "resultado": self.resultado,
+            "error": self.error
+        }
+
+class ColaTrabajos:
+    """Pool de hilos con concurrencia limitada y registro de trabajos"""
+
+    def __init__(self, concurrencia: int = CONCURRENCIA_DEFECTO, max_terminados: int = MAX_TERMINADOS):
+        self.concurrencia = max(1, concurrencia)
+        self.max_terminados = max_terminados
+        self._ejecutor = ThreadPoolExecutor(max_workers=self.concurrencia, thread_name_prefix="trabajo")
+        self._trabajos = {}
+        self._cerrojo = threading.Lock()
+
+    def _ejecutar(self, trabajo: Trabajo, funcion, argumentos: tuple):
+        """Cuerpo del hilo: ejecuta la funcion del trabajo y guarda su resultado"""
+        trabajo.estado = EN_CURSO
+        trabajo.inicio = time.time()
+        trabajo.mensaje = "En curso"
+        registrar_log(f"Trabajo {trabajo.id} ({trabajo.herramienta}) iniciado: {trabajo.descripcion}")
+        try:
+            trabajo.resultado = funcion(trabajo.actualizar_progreso, *argumentos)
+            trabajo.estado = COMPLETADO
+            trabajo.progreso = 1.0
+            trabajo.mensaje = "Completado"
+        except Exception as e:
+            trabajo.estado = ERROR
+            trabajo.error = f"{type(e).__name__}: {e}"
+            trabajo.mensaje = "Error"
+        finally:
+            trabajo.fin = time.time()
+            registrar_log(f"Trabajo {trabajo.id} ({trabajo.herramienta}) {trabajo.estado} en {trabajo.fin - trabajo.inicio:.2f}s")
+
+    def _purgar(self):
+        """Olvida los trabajos terminados mas antiguos por encima de max_terminados"""
+        terminados = [t for t in self._trabajos.values() if t.estado in TERMINADOS]
+        for trabajo in sorted(terminados, key=lambda t: t.creado)[:max(0, len(terminados) - self.max_terminados)]:
+            del self._trabajos[trabajo.id]
+
+    def enviar(self, herramienta: str, descripcion: str, funcion, *argumentos) -> Trabajo:
+        """Pone un trabajo en cola y lo retorna sin esperar a que se ejecute"""
+        trabajo = Trabajo(herramienta, descripcion)
+        with self._cerrojo:
+            self._purgar()
+            self._trabajos[trabajo.id] = trabajo
+        trabajo.futuro = self._ejecutor.submit(self._ejecutar, trabajo, funcion, argumentos)
+        registrar_log(f"Trabajo {trabajo.id} ({herramienta}) en cola: {descripcion}")
+        return trabajo
+
+    def obtener(self, identificador: str) -> Trabajo:
+        """Trabajo por su identificador (None si no existe o ya se olvido)"""
+        return self._trabajos.get(identificador)
+
+    def listar(self) -> list[Trabajo]:
+        """Trabajos conocidos, del mas reciente al mas antiguo"""
+        with self._cerrojo:
+            return sorted(self._trabajos.values(), key=lambda t: -t.creado)
+
+    def cancelar(self, identificador: str) -> bool:
+        """Cancela un trabajo que aun no ha empezado"""
+        trabajo = self._trabajos.get(identificador)
+        if trabajo is None or not trabajo.futuro.cancel():
+            return False
+        trabajo.estado = CANCELADO
+        trabajo.mensaje = "Cancelado antes de empezar"
+        trabajo.fin = time.time()
+        return True
+
+    def en_cola(self) -> int:
+        """Trabajos esperando turno"""
+        return sum(1 for t in self._trabajos.values() if t.estado == EN_COLA)
+
+    def detener(self, esperar: bool = False):
+        """
+        Detiene la cola sin bloquear a quien llama: cancela los trabajos en cola y deja
+        terminar en su hilo a los que estan en curso (el interprete los espera al salir,
+        asi ningun Excel queda a medio escribir).
+
+        esperar: no cancelar nada y bloquear hasta que acaben todos los trabajos
+        """
+        self._ejecutor.shutdown(wait=esperar, cancel_futures=not esperar)
+        with self._cerrojo:
+            for trabajo in self._trabajos.values():
+                if trabajo.estado == EN_COLA and trabajo.futuro.cancelled():
+                    trabajo.estado = CANCELADO
+                    trabajo.mensaje = "Cancelado al detener la cola"
+                    trabajo.fin = time.time()
+
+_cola = None
+
+def obtener_cola() -> ColaTrabajos:
+    """Cola unica del proceso, creada con la seccion "trabajos" de config.json"""
+    global _cola
+    if _cola is None:
+        configuracion = cargar_configuracion().get("trabajos", {})
+        _cola = ColaTrabajos(concurrencia=configuracion.get("concurrencia", CONCURRENCIA_DEFECTO))
+    return _cola
+
+def detener_cola():
+    """Detiene la cola del proceso si llego a crearse"""
+    global _cola
+    if _cola is not None:
+        _cola.detener()
+        _cola = None
+
+# Definicion de la herramienta interna
+HERRAMIENTA = Tool(
+    name="FR_estado_trabajo",
+    description="Consulta el estado y el progreso de los trabajos en segundo plano (por ejemplo, exportaciones de Revit). Sin id, lista todos los trabajos",
+    inputSchema={
+        "type": "object",
+        "properties": {
+            "id": {
+                "type": "string",
+                "description": "Identificador del trabajo devuelto al enviarlo"
+            },
+            "cancelar": {
+                "type": "boolean",
+                "description": "Si es true, cancela el trabajo si aun esta en cola"
+            }
+        }
+    }
+)
+
+def _barra(progreso: float, ancho: int = 20) -> str:
+    """Barra de progreso en texto"""
+    llenos = int(round(progreso * ancho))
+    return "█" * llenos + "░" * (ancho - llenos)
+
+def describir(trabajo: Trabajo) -> str:
+    """Texto con el estado de un trabajo"""
+    datos = trabajo.resumen()
+    lineas = [
+        f"Trabajo {datos['id']} - {datos['herramienta']}",
+        f"   {datos['descripcion']}",
+        f"   Estado: {datos['estado']}  {_barra(datos['progreso'])} {datos['progreso'] * 100:.0f}%  {datos['mensaje']}",
+        f"   Enviado: {datos['creado']}  Espera: {datos['espera_s']}s"
+        + (f"  Duracion: {datos['duracion_s']}s" if datos['duracion_s'] is not None else "")
+    ]
+    if datos["resultado"]:
+        lineas.append(f"   Resultado: {datos['resultado']}")
+    if datos["error"]:
+        lineas.append(f"   ❌ {datos['error']}")
+    return "\n".join(lineas)
+
+async def ejecutar(argumentos: dict) -> list[TextContent]:
+    """Ejecuta la herramienta FR_estado_trabajo"""
+    cola = obtener_cola()
+    identificador = (argumentos.get("id") or "").strip()
+
+    if not identificador:
+        trabajos = cola.listar()
+        if not trabajos:
+            return [TextContent(type="text", text="No hay trabajos en segundo plano")]
+        cabecera = f"Trabajos: {len(trabajos)} ({cola.en_cola()} en cola, concurrencia {cola.concurrencia})"
+        return [TextContent(type="text", text="\n\n".join([cabecera] + [describir(t) for t in trabajos]))]
+
+    trabajo = cola.obtener(identificador)
+    if trabajo is None:
+        return [TextContent(type="text", text=f"❌ Error: no existe el trabajo {identificador}")]
+
+    if argumentos.get("cancelar", False):
+        if cola.cancelar(identificador):
+            registrar_log(f"Trabajo {identificador} cancelado")
+        else:
+            return [TextContent(type="text", text=f"❌ Error: el trabajo {identificador} ya ha empezado y no se puede cancelar\n\n{describir(trabajo)}")]
+
+    return [TextContent(type="text", text=describir(trabajo))]
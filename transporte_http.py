@@ -0,0 +1,190 @@
+"""
+Transporte HTTP - Un solo servidor compartido por varios clientes MCP
+Autor: Francisco de la Poza
+
+Con stdio cada cliente (o cada ventana del editor) arranca su propio proceso,
+que vuelve a cargar las herramientas y mantiene sus propias copias de modulos,
+caches y trabajadores. En modo HTTP un unico proceso de larga duracion atiende
+a todos los clientes con el registro, las caches, la cola de trabajos y el pool
+de trabajadores ya calientes, y las llamadas identicas de clientes distintos
+se comparten (ver coalescencia.py).
+
+Se publican los dos transportes HTTP de MCP sobre la misma aplicacion:
+  - streamable HTTP:  http://127.0.0.1:<puerto>/mcp
+  - SSE (clientes antiguos):  http://127.0.0.1:<puerto>/sse
+
+Solo se escucha en localhost y se rechazan las peticiones con cabeceras Host u
+Origin ajenas (proteccion frente a DNS rebinding). Cada cliente (sesion MCP)
+tiene un limite de llamadas simultaneas; las que lo superan esperan turno y,
+si ya hay demasiadas esperando, se rechazan. Los pasos de FR_ejecutar_lote
+cuentan como llamadas del cliente, y su max_concurrencia no supera ese limite.
+Las herramientas sincronas se ejecutan en hilos (ver despachar_llamada en
+servidor.py), asi que una llamada lenta de un cliente no detiene a los demas.
+
+Se configura en config.json (o con 'python servidor.py --transporte http'):
+    "transporte": {"modo": "http", "puerto": 8765,
+                   "llamadas_por_cliente": 4, "en_espera_por_cliente": 32}
+"""
+
+import asyncio
+import contextlib
+import weakref
+
+import uvicorn
+from mcp.server.sse import SseServerTransport
+from mcp.server.streamable_http_manager import StreamableHTTPSessionManager
+from mcp.server.transport_security import TransportSecuritySettings
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse
+from starlette.routing import Mount, Route
+
+from comun import registrar_log
+
+HOST_DEFECTO = "127.0.0.1"
+PUERTO_DEFECTO = 8765
+RUTA_MCP = "/mcp"
+RUTA_SSE = "/sse"
+RUTA_MENSAJES = "/mensajes/"
+
+# Llamadas simultaneas por cliente y llamadas que pueden esperar turno
+LLAMADAS_POR_CLIENTE = 4
+EN_ESPERA_POR_CLIENTE = 32
+
+# Sesiones abiertas a la vez por cada transporte (streamable HTTP y SSE)
+MAX_CLIENTES = 64
+
+HOSTS_LOCALES = ("127.0.0.1", "localhost", "::1")
+
+class ClienteSaturado(RuntimeError):
+    """El cliente ya tiene demasiadas llamadas en curso y en espera"""
+
+class _Cliente:
+    """Semaforo y contadores de un cliente"""
+
+    def __init__(self, llamadas: int):
+        self.semaforo = asyncio.Semaphore(llamadas)
+        self.en_curso = 0
+        self.en_espera = 0
+        self.rechazadas = 0
+
+class LimitadorClientes:
+    """
+    Limita las llamadas simultaneas de cada cliente.
+
+    El cliente es la sesion MCP que hace la llamada; sus contadores se olvidan
+    solos al cerrarse la sesion (WeakKeyDictionary).
+    """
+
+    def __init__(self, llamadas_por_cliente: int = LLAMADAS_POR_CLIENTE, en_espera_por_cliente: int = EN_ESPERA_POR_CLIENTE):
+        self.llamadas_por_cliente = max(1, llamadas_por_cliente)
+        self.en_espera_por_cliente = max(0, en_espera_por_cliente)
+        self._clientes = weakref.WeakKeyDictionary()
+
+    @contextlib.asynccontextmanager
+    async def turno(self, sesion):
+        """Espera turno para una llamada del cliente (ClienteSaturado si no cabe en la espera)"""
+        cliente = self._clientes.get(sesion)
+        if cliente is None:
+            cliente = self._clientes[sesion] = _Cliente(self.llamadas_por_cliente)
+
+        if cliente.semaforo.locked() and cliente.en_espera >= self.en_espera_por_cliente:
+            cliente.rechazadas += 1
+            raise ClienteSaturado(
+                f"el cliente ya tiene {cliente.en_curso} llamadas en curso y {cliente.en_espera} en espera "
+                f"(limite {self.llamadas_por_cliente} + {self.en_espera_por_cliente})"
+            )
+
+        cliente.en_espera += 1
+        try:
+            await cliente.semaforo.acquire()
+        finally:
+            cliente.en_espera -= 1
+        cliente.en_curso += 1
+        try:
+            yield
+        finally:
+            cliente.en_curso -= 1
+            cliente.semaforo.release()
+
+    def estado(self) -> dict:
+        """Clientes conectados y llamadas en curso, en espera y rechazadas"""
+        clientes = list(self._clientes.values())
+        return {
+            "clientes": len(clientes),
+            "en_curso": sum(c.en_curso for c in clientes),
+            "en_espera": sum(c.en_espera for c in clientes),
+            "rechazadas": sum(c.rechazadas for c in clientes)
+        }
+
+def seguridad_local(puerto: int) -> TransportSecuritySettings:
+    """Solo se aceptan cabeceras Host y Origin de localhost en el puerto del servidor"""
+    hosts = ["127.0.0.1", "localhost", "[::1]"]
+    return TransportSecuritySettings(
+        enable_dns_rebinding_protection=True,
+        allowed_hosts=[f"{h}:{puerto}" for h in hosts] + hosts,
+        allowed_origins=[f"http://{h}:{puerto}" for h in hosts]
+    )
+
+class _AplicacionStreamable:
+    """Aplicacion ASGI que entrega cada peticion al gestor de sesiones streamable HTTP"""
+
+    def __init__(self, gestor: StreamableHTTPSessionManager):
+        self.gestor = gestor
+
+    async def __call__(self, scope, receive, send):
+        await self.gestor.handle_request(scope, receive, send)
+
+class _AplicacionSse:
+    """
+    Aplicacion ASGI que abre una sesion SSE y la atiende con el servidor MCP.
+    Con max_clientes sesiones abiertas, las nuevas se rechazan con 503 (como hace
+    el gestor de streamable HTTP).
+    """
+
+    def __init__(self, servidor, transporte: SseServerTransport, max_clientes: int = MAX_CLIENTES):
+        self.servidor = servidor
+        self.transporte = transporte
+        self.max_clientes = max_clientes
+        self.abiertas = 0
+
+    async def __call__(self, scope, receive, send):
+        if self.abiertas >= self.max_clientes:
+            registrar_log(f"Transporte HTTP: rechazada una sesion SSE ({self.abiertas} abiertas)")
+            await PlainTextResponse("Demasiadas sesiones abiertas", status_code=503)(scope, receive, send)
+            return
+        self.abiertas += 1
+        try:
+            async with self.transporte.connect_sse(scope, receive, send) as (lectura, escritura):
+                await self.servidor.run(lectura, escritura, self.servidor.create_initialization_options())
+        finally:
+            self.abiertas -= 1
+
+def crear_aplicacion(servidor, puerto: int, max_clientes: int = MAX_CLIENTES) -> Starlette:
+    """Aplicacion Starlette con los transportes streamable HTTP y SSE del servidor MCP"""
+    seguridad = seguridad_local(puerto)
+    gestor = StreamableHTTPSessionManager(app=servidor, security_settings=seguridad, max_sessions=max_clientes)
+    sse = SseServerTransport(RUTA_MENSAJES, security_settings=seguridad)
+
+    @contextlib.asynccontextmanager
+    async def ciclo_de_vida(aplicacion):
+        async with gestor.run():
+            yield
+
+    return Starlette(
+        routes=[
+            Route(RUTA_MCP, endpoint=_AplicacionStreamable(gestor)),
+            Route(RUTA_SSE, endpoint=_AplicacionSse(servidor, sse, max_clientes), methods=["GET"]),
+            Mount(RUTA_MENSAJES, app=sse.handle_post_message)
+        ],
+        lifespan=ciclo_de_vida
+    )
+
+async def servir(servidor, host: str = HOST_DEFECTO, puerto: int = PUERTO_DEFECTO, max_clientes: int = MAX_CLIENTES):
+    """Atiende al servidor MCP por HTTP hasta que se detenga el proceso"""
+    if host not in HOSTS_LOCALES:
+        raise ValueError(f"el transporte HTTP solo puede escuchar en localhost, no en {host}")
+
+    aplicacion = crear_aplicacion(servidor, puerto, max_clientes)
+    configuracion = uvicorn.Config(aplicacion, host=host, port=puerto, log_level="warning", lifespan="on")
+    registrar_log(f"Transporte HTTP: http://{host}:{puerto}{RUTA_MCP} (SSE: http://{host}:{puerto}{RUTA_SSE})")
+    await uvicorn.Server(configuracion).serve()
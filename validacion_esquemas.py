@@ -0,0 +1,217 @@
+"""
+Validacion de esquemas - inputSchema compilado a funciones de validacion
+Autor: Francisco de la Poza
+
+Cada inputSchema se traduce una sola vez a un arbol de funciones Python que
+comprueban los argumentos sin volver a interpretar el esquema en cada llamada.
+Cubre el subconjunto de JSON Schema que usan las herramientas: type, enum,
+properties, required, additionalProperties, items, minimum/maximum,
+minLength/maxLength, minItems/maxItems y pattern.
+
+El servidor compila el validador al cargar la herramienta, lo guarda junto al
+hash del archivo (solo se recompila si cambia el codigo fuente) y valida cada
+llamada antes de ejecutarla, devolviendo la lista de errores con su ruta:
+    argumentos.parametros[0].tipo: valor no permitido 'texto' (se esperaba uno de: string, number, ...)
+"""
+
+import re
+
+COMPROBACIONES_TIPO = {
+    "string": lambda v: isinstance(v, str),
+    "number": lambda v: isinstance(v, (int, float)) and not isinstance(v, bool),
+    "integer": lambda v: (isinstance(v, int) and not isinstance(v, bool)) or (isinstance(v, float) and v.is_integer()),
+    "boolean": lambda v: isinstance(v, bool),
+    "array": lambda v: isinstance(v, list),
+    "object": lambda v: isinstance(v, dict),
+    "null": lambda v: v is None
+}
+
+NOMBRES_TIPO = {
+    str: "string", bool: "boolean", int: "integer", float: "number",
+    list: "array", dict: "object", type(None): "null"
+}
+
+def _nombre_tipo(valor) -> str:
+    """Nombre JSON del tipo de un valor Python"""
+    return NOMBRES_TIPO.get(type(valor), type(valor).__name__)
+
+def _compilar(esquema: dict):
+    """Compila un (sub)esquema en una funcion validar(valor, ruta, errores)"""
+    if not isinstance(esquema, dict) or not esquema:
+        return None
+
+    comprobaciones = []
+    con_tipo = False
+
+    tipo = esquema.get("type")
+    if tipo:
+        tipos = tipo if isinstance(tipo, list) else [tipo]
+        funciones_tipo = [COMPROBACIONES_TIPO[t] for t in tipos if t in COMPROBACIONES_TIPO]
+        texto_tipo = " o ".join(tipos)
+        if len(funciones_tipo) == 1:
+            unica = funciones_tipo[0]
+
+            def comprobar_tipo(valor, ruta, errores):
+                if not unica(valor):
+                    errores.append(f"{ruta}: se esperaba {texto_tipo}, se recibio {_nombre_tipo(valor)}")
+                    return False
+                return True
+        elif funciones_tipo:
+            def comprobar_tipo(valor, ruta, errores):
+                if not any(f(valor) for f in funciones_tipo):
+                    errores.append(f"{ruta}: se esperaba {texto_tipo}, se recibio {_nombre_tipo(valor)}")
+                    return False
+                return True
+        else:
+            comprobar_tipo = None
+        if comprobar_tipo:
+            comprobaciones.append(comprobar_tipo)
+            con_tipo = True
+
+    if "enum" in esquema:
+        permitidos = esquema["enum"]
+        try:
+            conjunto = frozenset(permitidos)
+        except TypeError:
+            conjunto = None
+        texto_permitidos = ", ".join(str(p) for p in permitidos)
+
+        def comprobar_enum(valor, ruta, errores):
+            try:
+                incluido = valor in conjunto if conjunto is not None else valor in permitidos
+            except TypeError:
+                incluido = valor in permitidos
+            if not incluido:
+                errores.append(f"{ruta}: valor no permitido {valor!r} (se esperaba uno de: {texto_permitidos})")
+                return False
+            return True
+        comprobaciones.append(comprobar_enum)
+
+    for clave, operador, mensaje in (
+        ("minimum", lambda v, l: v >= l, "debe ser >= {}"),
+        ("maximum", lambda v, l: v <= l, "debe ser <= {}"),
+    ):
+        if clave in esquema:
+            limite = esquema[clave]
+
+            def comprobar_limite(valor, ruta, errores, limite=limite, operador=operador, mensaje=mensaje):
+                if isinstance(valor, (int, float)) and not isinstance(valor, bool) and not operador(valor, limite):
+                    errores.append(f"{ruta}: {mensaje.format(limite)}")
+                    return False
+                return True
+            comprobaciones.append(comprobar_limite)
+
+    for clave, tipo_valor, operador, mensaje in (
+        ("minLength", str, lambda n, l: n >= l, "debe tener al menos {} caracteres"),
+        ("maxLength", str, lambda n, l: n <= l, "debe tener como maximo {} caracteres"),
+        ("minItems", list, lambda n, l: n >= l, "debe tener al menos {} elementos"),
+        ("maxItems", list, lambda n, l: n <= l, "debe tener como maximo {} elementos"),
+    ):
+        if clave in esquema:
+            limite = esquema[clave]
+
+            def comprobar_longitud(valor, ruta, errores, limite=limite, tipo_valor=tipo_valor, operador=operador, mensaje=mensaje):
+                if isinstance(valor, tipo_valor) and not operador(len(valor), limite):
+                    errores.append(f"{ruta}: {mensaje.format(limite)}")
+                    return False
+                return True
+            comprobaciones.append(comprobar_longitud)
+
+    if "pattern" in esquema:
+        patron = re.compile(esquema["pattern"])
+
+        def comprobar_patron(valor, ruta, errores):
+            if isinstance(valor, str) and not patron.search(valor):
+                errores.append(f"{ruta}: no cumple el patron {patron.pattern!r}")
+                return False
+            return True
+        comprobaciones.append(comprobar_patron)
+
+    propiedades = {
+        nombre: validador
+        for nombre, validador in (
+            (nombre, _compilar(sub)) for nombre, sub in (esquema.get("properties") or {}).items()
+        )
+        if validador
+    }
+    requeridos = tuple(esquema.get("required") or ())
+    adicionales = esquema.get("additionalProperties", True)
+    conocidas = frozenset(esquema.get("properties") or {})
+    validar_adicionales = _compilar(adicionales) if isinstance(adicionales, dict) else None
+
+    if propiedades or requeridos or adicionales is not True:
+        def comprobar_objeto(valor, ruta, errores):
+            if not isinstance(valor, dict):
+                return True
+            correcto = True
+            for nombre in requeridos:
+                if nombre not in valor:
+                    errores.append(f"{ruta}: falta el parametro requerido '{nombre}'")
+                    correcto = False
+            for nombre, subvalor in valor.items():
+                validador = propiedades.get(nombre)
+                if validador:
+                    correcto = validador(subvalor, f"{ruta}.{nombre}", errores) and correcto
+                elif nombre not in conocidas:
+                    if adicionales is False:
+                        errores.append(f"{ruta}: parametro no admitido '{nombre}'")
+                        correcto = False
+                    elif validar_adicionales:
+                        correcto = validar_adicionales(subvalor, f"{ruta}.{nombre}", errores) and correcto
+            return correcto
+        comprobaciones.append(comprobar_objeto)
+
+    validar_elementos = _compilar(esquema.get("items"))
+    if validar_elementos:
+        def comprobar_elementos(valor, ruta, errores):
+            if not isinstance(valor, list):
+                return True
+            correcto = True
+            for i, elemento in enumerate(valor):
+                correcto = validar_elementos(elemento, f"{ruta}[{i}]", errores) and correcto
+            return correcto
+        comprobaciones.append(comprobar_elementos)
+
+    if not comprobaciones:
+        return None
+
+    if con_tipo:
+        comprobar_tipo, resto = comprobaciones[0], tuple(comprobaciones[1:])
+    else:
+        comprobar_tipo, resto = None, tuple(comprobaciones)
+
+    def validar(valor, ruta, errores):
+        # Si el tipo no coincide no tiene sentido seguir con el resto de comprobaciones
+        if comprobar_tipo and not comprobar_tipo(valor, ruta, errores):
+            return False
+        correcto = True
+        for comprobar in resto:
+            correcto = comprobar(valor, ruta, errores) and correcto
+        return correcto
+
+    return validar
+
+class ArgumentosNoValidos(ValueError):
+    """Los argumentos de una llamada no cumplen el inputSchema de la herramienta"""
+
+    def __init__(self, nombre: str, errores: list[str]):
+        super().__init__(f"argumentos no validos para {nombre}: {'; '.join(errores)}")
+        self.nombre = nombre
+        self.errores = errores
+
+def compilar_esquema(esquema: dict):
+    """
+    Compila un inputSchema y retorna una funcion validar(argumentos) -> list[str]
+    con los errores encontrados (lista vacia si los argumentos son validos).
+    """
+    validador = _compilar(esquema or {})
+
+    if validador is None:
+        return lambda argumentos: []
+
+    def validar_argumentos(argumentos) -> list[str]:
+        errores = []
+        validador(argumentos, "argumentos", errores)
+        return errores
+
+    return validar_argumentos
@@ -0,0 +1,340 @@
+"""
+Verificacion del entorno - Dependencias de las herramientas y ubicaciones de datos
+Autor: Francisco de la Poza
+
+Sustituye a diagnostico.py. Se ejecuta al arrancar el servidor, al sincronizar
+herramientas nuevas o modificadas y bajo demanda con la herramienta interna
+FR_diagnostico_entorno (o 'python diagnostico.py').
+
+  - Dependencias: los imports de cada herramienta se leen del codigo con ast
+    (sin importarla), incluidos los que estan dentro de funciones. Los que estan
+    dentro de un try/except ImportError se consideran opcionales. Una herramienta
+    puede declarar ademas DEPENDENCIAS = {"modulo": "paquete pip", ...}.
+    Cada modulo se busca con importlib.util.find_spec, sin importarlo.
+  - Ubicaciones: carpetas de herramientas, logs y output con permiso de escritura,
+    config.json valido y la carpeta de intercambio con pyRevit.
+
+Las comprobaciones se hacen en paralelo. Los resultados de dependencias se guardan
+en 'output/verificacion_entorno.json' junto a una huella del entorno (interprete,
+version y fecha de modificacion de las carpetas de paquetes): mientras la huella no
+cambie no se vuelve a buscar ningun modulo, y al instalar o quitar un paquete la
+huella cambia y se comprueba todo de nuevo.
+
+Las herramientas con dependencias que faltan no se importan: quedan marcadas como
+no disponibles desde el arranque y nunca se instala nada durante una llamada.
+"""
+
+import ast
+import asyncio
+import hashlib
+import importlib.util
+import json
+import os
+import platform
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from mcp.types import Tool, TextContent
+
+from comun import RUTA_BASE, RUTA_CONFIG, RUTA_HERRAMIENTAS, RUTA_LOGS, RUTA_OUTPUT, cargar_configuracion, escribir_atomico, registrar_log
+import vigilancia
+
+RUTA_CACHE = RUTA_OUTPUT / "verificacion_entorno.json"
+
+# Hilos para las comprobaciones en paralelo
+HILOS = 8
+
+# Modulos de la biblioteca estandar que algunas instalaciones de Python no traen
+# (el resto de la biblioteca estandar no se comprueba)
+ESTANDAR_OPCIONAL = {"tkinter", "sqlite3", "ssl", "ctypes", "curses", "lzma", "bz2"}
+
+# Excepciones que marcan un import como opcional si lo rodean
+EXCEPCIONES_OPCIONALES = {"ImportError", "ModuleNotFoundError", "Exception", "BaseException"}
+
+_bloqueo = threading.Lock()
+
+def huella_entorno() -> str:
+    """Huella del interprete y de las carpetas de paquetes (cambia al instalar o quitar uno)"""
+    partes = [sys.executable, sys.version, platform.platform()]
+    for ruta in sys.path:
+        if not ruta or Path(ruta).resolve() == RUTA_BASE.resolve():
+            continue
+        try:
+            partes.append(f"{ruta}:{os.stat(ruta).st_mtime_ns}")
+        except OSError:
+            continue
+    return hashlib.sha256("\n".join(partes).encode("utf-8")).hexdigest()[:16]
+
+def _es_local(modulo: str) -> bool:
+    """Modulo del propio servidor (comun, resultados...) o de 'herramientas/'"""
+    return any(
+        (carpeta / f"{modulo}.py").exists() or (carpeta / modulo / "__init__.py").exists()
+        for carpeta in (RUTA_BASE, RUTA_HERRAMIENTAS)
+    )
+
+class _LectorImports(ast.NodeVisitor):
+    """Recoge los modulos de primer nivel importados y si son opcionales"""
+
+    def __init__(self):
+        self.obligatorios = set()
+        self.opcionales = set()
+        self._en_try_opcional = 0
+
+    def visit_Try(self, nodo):
+        capturadas = set()
+        for manejador in nodo.handlers:
+            if manejador.type is None:
+                capturadas.add("BaseException")
+            for tipo in (manejador.type.elts if isinstance(manejador.type, ast.Tuple) else [manejador.type]):
+                if isinstance(tipo, ast.Name):
+                    capturadas.add(tipo.id)
+        opcional = bool(capturadas & EXCEPCIONES_OPCIONALES)
+        self._en_try_opcional += opcional
+        for hijo in nodo.body:
+            self.visit(hijo)
+        self._en_try_opcional -= opcional
+        for hijo in nodo.handlers + nodo.orelse + nodo.finalbody:
+            self.visit(hijo)
+
+    visit_TryStar = visit_Try
+
+    def _anotar(self, modulo: str):
+        (self.opcionales if self._en_try_opcional else self.obligatorios).add(modulo.split(".")[0])
+
+    def visit_Import(self, nodo):
+        for alias in nodo.names:
+            self._anotar(alias.name)
+
+    def visit_ImportFrom(self, nodo):
+        if nodo.level == 0 and nodo.module:
+            self._anotar(nodo.module)
+
+def dependencias_archivo(ruta: Path) -> dict:
+    """
+    Dependencias de una herramienta: {modulo: paquete pip o None}.
+    Solo las obligatorias y que no son modulos locales.
+    """
+    arbol = ast.parse(ruta.read_text(encoding="utf-8"), filename=str(ruta))
+    lector = _LectorImports()
+    lector.visit(arbol)
+
+    declaradas = {}
+    for nodo in arbol.body:
+        if isinstance(nodo, ast.Assign) and any(isinstance(d, ast.Name) and d.id == "DEPENDENCIAS" for d in nodo.targets):
+            try:
+                valor = ast.literal_eval(nodo.value)
+            except ValueError:
+                continue
+            declaradas = dict(valor) if isinstance(valor, dict) else {m: None for m in valor}
+
+    modulos = (lector.obligatorios - lector.opcionales) | set(declaradas)
+    return {
+        m: declaradas.get(m) for m in sorted(modulos)
+        if (m in declaradas or m in ESTANDAR_OPCIONAL or m not in sys.stdlib_module_names) and not _es_local(m)
+    }
+
+def modulo_disponible(modulo: str) -> bool:
+    """Busca un modulo sin importarlo"""
+    try:
+        return importlib.util.find_spec(modulo) is not None
+    except (ImportError, ValueError):
+        return False
+
+def _leer_cache() -> dict:
+    try:
+        with open(RUTA_CACHE, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+# Cache en memoria (se lee del disco una sola vez por proceso)
+_cache = None
+
+def verificar_herramientas(archivos: list[Path], forzar: bool = False) -> dict:
+    """
+    Comprueba las dependencias de las herramientas (en paralelo y con cache).
+    Retorna {"huella", "desde_cache", "herramientas": {nombre_archivo: {"dependencias", "faltan"}}}
+    donde "faltan" es la lista de textos 'modulo (pip install paquete)' que no se encontraron.
+    """
+    global _cache
+    with _bloqueo:
+        huella = huella_entorno()
+        if _cache is None and not forzar:
+            _cache = _leer_cache()
+        if forzar or not _cache or _cache.get("huella") != huella:
+            _cache = {"huella": huella, "modulos": {}, "archivos": {}}
+        modificada = False
+
+        herramientas = {}
+        for archivo in archivos:
+            try:
+                estado = archivo.stat()
+            except FileNotFoundError:
+                continue
+            firma = [estado.st_mtime_ns, estado.st_size]
+            entrada = _cache["archivos"].get(archivo.name)
+            if not entrada or entrada["firma"] != firma:
+                try:
+                    dependencias = dependencias_archivo(archivo)
+                except (SyntaxError, UnicodeDecodeError, OSError) as e:
+                    registrar_log(f"VERIFICACION: no se pudieron leer los imports de {archivo.name}: {e}")
+                    dependencias = {}
+                entrada = _cache["archivos"][archivo.name] = {"firma": firma, "dependencias": dependencias}
+                modificada = True
+            herramientas[archivo.name] = entrada["dependencias"]
+
+        pendientes = sorted({m for deps in herramientas.values() for m in deps} - set(_cache["modulos"]))
+        if pendientes:
+            with ThreadPoolExecutor(max_workers=HILOS) as ejecutor:
+                for modulo, disponible in zip(pendientes, ejecutor.map(modulo_disponible, pendientes)):
+                    _cache["modulos"][modulo] = disponible
+            modificada = True
+
+        if modificada:
+            _cache["archivos"] = {n: e for n, e in _cache["archivos"].items() if (RUTA_HERRAMIENTAS / n).exists()}
+            try:
+                escribir_atomico(RUTA_CACHE, json.dumps(_cache, indent=2, ensure_ascii=False))
+            except OSError as e:
+                registrar_log(f"VERIFICACION: no se pudo guardar la cache: {e}")
+
+        return {
+            "huella": huella,
+            "desde_cache": not pendientes,
+            "herramientas": {
+                nombre: {
+                    "dependencias": sorted(deps),
+                    "faltan": [
+                        f"{m} (pip install {paquete})" if paquete else m
+                        for m, paquete in deps.items() if not _cache["modulos"].get(m, False)
+                    ]
+                }
+                for nombre, deps in herramientas.items()
+            }
+        }
+
+def _comprobar_escritura(nombre: str, carpeta: Path) -> dict:
+    try:
+        carpeta.mkdir(parents=True, exist_ok=True)
+        with tempfile.TemporaryFile(dir=carpeta):
+            pass
+        return {"nombre": nombre, "ok": True, "detalle": str(carpeta)}
+    except OSError as e:
+        return {"nombre": nombre, "ok": False, "nivel": "error", "detalle": f"{carpeta}: {e}"}
+
+def _comprobar_configuracion() -> dict:
+    if not RUTA_CONFIG.exists():
+        return {"nombre": "config.json", "ok": False, "nivel": "aviso", "detalle": "no existe (se usan los valores por defecto)"}
+    try:
+        with open(RUTA_CONFIG, "r", encoding="utf-8") as f:
+            json.load(f)
+        return {"nombre": "config.json", "ok": True, "detalle": str(RUTA_CONFIG)}
+    except (OSError, json.JSONDecodeError) as e:
+        return {"nombre": "config.json", "ok": False, "nivel": "error", "detalle": str(e)}
+
+def _comprobar_intercambio_revit() -> dict:
+    carpeta = Path(vigilancia.carpetas_por_defecto()[0])
+    if not carpeta.is_dir():
+        return {"nombre": "Intercambio con pyRevit", "ok": False, "nivel": "aviso", "detalle": f"no existe {carpeta} (aun no se ha exportado desde Revit)"}
+    datos = carpeta / "revit_data.json"
+    if datos.exists():
+        return {"nombre": "Intercambio con pyRevit", "ok": True, "detalle": f"{datos} ({datos.stat().st_size} bytes)"}
+    return {"nombre": "Intercambio con pyRevit", "ok": True, "detalle": f"{carpeta} (sin revit_data.json)"}
+
+def _comprobar_carpeta_vigilada(carpeta: str) -> dict:
+    ruta = Path(os.path.expandvars(carpeta))
+    if ruta.is_dir():
+        return {"nombre": "Carpeta vigilada", "ok": True, "detalle": str(ruta)}
+    return {"nombre": "Carpeta vigilada", "ok": False, "nivel": "aviso", "detalle": f"no existe {ruta}"}
+
+def comprobar_ubicaciones() -> list[dict]:
+    """Comprueba en paralelo las carpetas y archivos de datos del servidor"""
+    comprobaciones = [
+        lambda: _comprobar_escritura("Carpeta de herramientas", RUTA_HERRAMIENTAS),
+        lambda: _comprobar_escritura("Carpeta de logs", RUTA_LOGS),
+        lambda: _comprobar_escritura("Carpeta de resultados", RUTA_OUTPUT),
+        _comprobar_configuracion,
+        _comprobar_intercambio_revit
+    ]
+    configuracion_vigilancia = cargar_configuracion().get("vigilancia", {})
+    if configuracion_vigilancia.get("activado", False):
+        vigilante = vigilancia.desde_configuracion(configuracion_vigilancia)
+        comprobaciones.append(lambda: _comprobar_escritura("Carpeta de mediciones", Path(vigilante.ruta_salida)))
+        comprobaciones += [lambda c=c: _comprobar_carpeta_vigilada(c) for c in vigilante.carpetas]
+    with ThreadPoolExecutor(max_workers=HILOS) as ejecutor:
+        return list(ejecutor.map(lambda comprobar: comprobar(), comprobaciones))
+
+def verificar_entorno(archivos: list[Path], forzar: bool = False) -> dict:
+    """Informe completo: interprete, dependencias de las herramientas y ubicaciones"""
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=2) as ejecutor:
+        futuro_dependencias = ejecutor.submit(verificar_herramientas, archivos, forzar)
+        futuro_ubicaciones = ejecutor.submit(comprobar_ubicaciones)
+        dependencias = futuro_dependencias.result()
+        ubicaciones = futuro_ubicaciones.result()
+    return {
+        "python": f"{platform.python_version()} ({sys.executable})",
+        "plataforma": platform.platform(),
+        **dependencias,
+        "ubicaciones": ubicaciones,
+        "tiempo_s": round(time.perf_counter() - inicio, 4)
+    }
+
+def describir(informe: dict) -> str:
+    """Texto del informe de verificacion"""
+    no_disponibles = {n: h for n, h in informe["herramientas"].items() if h["faltan"]}
+    lineas = [
+        "Verificacion del entorno",
+        "=" * 60,
+        f"Python: {informe['python']}",
+        f"Plataforma: {informe['plataforma']}",
+        f"Huella del entorno: {informe['huella']} ({'resultados en cache' if informe['desde_cache'] else 'comprobado ahora'}, {informe['tiempo_s']}s)",
+        "",
+        f"Herramientas: {len(informe['herramientas']) - len(no_disponibles)} disponibles, {len(no_disponibles)} no disponibles"
+    ]
+    for nombre, herramienta in sorted(informe["herramientas"].items()):
+        if herramienta["faltan"]:
+            lineas.append(f"   ❌ {nombre}: falta {', '.join(herramienta['faltan'])}")
+        else:
+            lineas.append(f"   ✅ {nombre}" + (f" ({', '.join(herramienta['dependencias'])})" if herramienta["dependencias"] else ""))
+    lineas += ["", "Ubicaciones:"]
+    for ubicacion in informe["ubicaciones"]:
+        icono = "✅" if ubicacion["ok"] else ("⚠️" if ubicacion.get("nivel") == "aviso" else "❌")
+        lineas.append(f"   {icono} {ubicacion['nombre']}: {ubicacion['detalle']}")
+    return "\n".join(lineas)
+
+# Definicion de la herramienta interna
+HERRAMIENTA = Tool(
+    name="FR_diagnostico_entorno",
+    description="Verifica el entorno del servidor: version de Python, dependencias de cada herramienta (las que faltan dejan la herramienta no disponible) y carpetas de datos (herramientas, logs, output, intercambio con pyRevit)",
+    inputSchema={
+        "type": "object",
+        "properties": {
+            "forzar": {
+                "type": "boolean",
+                "description": "Si es true, ignora la cache y vuelve a comprobar todas las dependencias"
+            }
+        }
+    }
+)
+
+def crear_ejecutor(obtener_archivos, al_verificar=None):
+    """
+    Crea la funcion ejecutar() de FR_diagnostico_entorno.
+
+    obtener_archivos: funcion sin argumentos que retorna los archivos de herramientas
+    al_verificar: funcion opcional (informe) que se llama tras comprobar, por ejemplo
+                  para cargar las herramientas que han pasado a estar disponibles
+    """
+
+    async def ejecutar(argumentos: dict) -> list[TextContent]:
+        """Ejecuta la herramienta FR_diagnostico_entorno"""
+        informe = await asyncio.to_thread(verificar_entorno, obtener_archivos(), argumentos.get("forzar", False))
+        if al_verificar:
+            al_verificar(informe)
+        return [TextContent(type="text", text=describir(informe))]
+
+    return ejecutar
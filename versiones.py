@@ -0,0 +1,156 @@
+"""
+Versiones - Almacen de versiones de herramientas direccionado por contenido
+Autor: Francisco de la Poza
+
+Cada version de una herramienta se guarda en 'herramientas/.versions/<hash>.py'.
+El indice 'herramientas/.versions/indice.json' apunta, para cada archivo, a la
+version activa, a su historial (cada contenido distinto una vez) y a la lista de
+activaciones (cada publicacion o restauracion, en orden). Publicar o restaurar una version es escribir un
+temporal y renombrarlo de forma atomica sobre el archivo de la herramienta: el
+servidor nunca ve un archivo a medio escribir y solo recarga el archivo cambiado.
+
+Volver atras sin indicar version deshace la ultima activacion: tras publicar
+A, B y otra vez A, se vuelve a B y despues a A.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime
+from pathlib import Path
+
+from comun import RUTA_HERRAMIENTAS, bloqueo_archivo, escribir_atomico, registrar_log
+
+RUTA_VERSIONES = RUTA_HERRAMIENTAS / ".versions"
+RUTA_INDICE = RUTA_VERSIONES / "indice.json"
+
+# Protege las lecturas y escrituras del indice dentro del proceso; publicar y
+# restaurar toman ademas un bloqueo de archivo, porque con el pool de trabajadores
+# se ejecutan en procesos distintos
+_bloqueo_indice = threading.Lock()
+
+def calcular_hash(contenido: str) -> str:
+    """Calcula el hash SHA-256 del contenido de una herramienta"""
+    return hashlib.sha256(contenido.encode("utf-8")).hexdigest()
+
+def _leer_indice() -> dict:
+    """Lee el indice de versiones (vacio si no existe o esta corrupto)"""
+    try:
+        with open(RUTA_INDICE, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+def _guardar_indice(indice: dict):
+    """Guarda el indice de versiones de forma atomica"""
+    escribir_atomico(RUTA_INDICE, json.dumps(indice, indent=2, ensure_ascii=False))
+
+def _almacenar(contenido: str) -> str:
+    """Guarda el contenido en el almacen (si no estaba ya) y retorna su hash"""
+    hash_version = calcular_hash(contenido)
+    ruta_version = RUTA_VERSIONES / f"{hash_version}.py"
+    if not ruta_version.exists():
+        escribir_atomico(ruta_version, contenido)
+    return hash_version
+
+def _activaciones(entrada: dict) -> list[str]:
+    """Versiones activadas en orden (los indices antiguos solo tienen el historial)"""
+    if "activaciones" not in entrada:
+        hashes = [v["hash"] for v in entrada["historial"]]
+        fin = hashes.index(entrada["actual"]) + 1 if entrada["actual"] in hashes else len(hashes)
+        entrada["activaciones"] = hashes[:fin]
+    return entrada["activaciones"]
+
+def _activar(entrada: dict, hash_version: str):
+    """Marca una version como activa y la anota en las activaciones"""
+    activaciones = _activaciones(entrada)
+    if not activaciones or activaciones[-1] != hash_version:
+        activaciones.append(hash_version)
+    entrada["actual"] = hash_version
+
+def _registrar_en_historial(indice: dict, nombre_archivo: str, hash_version: str, origen: str):
+    """Anota una version en el historial del archivo y la marca como activa"""
+    entrada = indice.setdefault(nombre_archivo, {"actual": None, "historial": [], "activaciones": []})
+    if not any(v["hash"] == hash_version for v in entrada["historial"]):
+        entrada["historial"].append({
+            "hash": hash_version,
+            "fecha": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "origen": origen
+        })
+    _activar(entrada, hash_version)
+
+def publicar_version(ruta_candidato: Path, ruta_archivo: Path) -> str:
+    """
+    Guarda el candidato como nueva version y lo instala sobre ruta_archivo.
+
+    Si el archivo actual aun no tenia historial, su contenido se guarda antes
+    para poder volver a el. El candidato se mueve con os.replace().
+    Retorna el hash de la version publicada.
+    """
+    contenido = ruta_candidato.read_text(encoding="utf-8")
+
+    with _bloqueo_indice, bloqueo_archivo(RUTA_INDICE):
+        indice = _leer_indice()
+
+        if ruta_archivo.exists() and ruta_archivo.name not in indice:
+            anterior = ruta_archivo.read_text(encoding="utf-8")
+            _registrar_en_historial(indice, ruta_archivo.name, _almacenar(anterior), "original")
+
+        hash_version = _almacenar(contenido)
+        # El candidato se creo con mkstemp (solo legible por el usuario)
+        os.chmod(ruta_candidato, 0o644)
+        os.replace(ruta_candidato, ruta_archivo)
+        _registrar_en_historial(indice, ruta_archivo.name, hash_version, "generada")
+        _guardar_indice(indice)
+
+    registrar_log(f"VERSION publicada: {ruta_archivo.name} -> {hash_version[:12]}")
+    return hash_version
+
+def listar_versiones(nombre_archivo: str) -> dict:
+    """Retorna {'actual': hash, 'historial': [...]} de un archivo de herramienta"""
+    with _bloqueo_indice:
+        return _leer_indice().get(nombre_archivo, {"actual": None, "historial": []})
+
+def restaurar_version(ruta_archivo: Path, hash_version: str = None) -> str:
+    """
+    Activa una version guardada de la herramienta.
+
+    hash_version puede ser un prefijo del hash. Si se omite, se deshace la
+    ultima activacion (publicacion o restauracion) y se vuelve a la version
+    que estaba activa antes. Retorna el hash completo restaurado.
+    Lanza ValueError si la version no existe.
+    """
+    with _bloqueo_indice, bloqueo_archivo(RUTA_INDICE):
+        indice = _leer_indice()
+        entrada = indice.get(ruta_archivo.name)
+        if not entrada or not entrada["historial"]:
+            raise ValueError(f"No hay versiones guardadas de {ruta_archivo.name}")
+
+        hashes = [v["hash"] for v in entrada["historial"]]
+        activaciones = _activaciones(entrada)
+        if hash_version is None:
+            if len(activaciones) < 2:
+                raise ValueError(f"{ruta_archivo.name} ya esta en su version mas antigua")
+            elegido = activaciones[-2]
+        else:
+            coincidencias = [h for h in hashes if h.startswith(hash_version)]
+            if len(coincidencias) != 1:
+                raise ValueError(f"La version '{hash_version}' no existe o es ambigua para {ruta_archivo.name}")
+            elegido = coincidencias[0]
+
+        ruta_version = RUTA_VERSIONES / f"{elegido}.py"
+        if not ruta_version.exists():
+            raise ValueError(f"Falta el archivo de la version {elegido[:12]} en el almacen")
+
+        # Cambio de puntero: un unico os.replace sobre el archivo de la herramienta
+        escribir_atomico(ruta_archivo, ruta_version.read_text(encoding="utf-8"))
+        if hash_version is None:
+            activaciones.pop()
+            entrada["actual"] = elegido
+        else:
+            _activar(entrada, elegido)
+        _guardar_indice(indice)
+
+    registrar_log(f"VERSION restaurada: {ruta_archivo.name} -> {elegido[:12]}")
+    return elegido
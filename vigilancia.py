@@ -0,0 +1,343 @@
+#!/usr/bin/env python3
+"""
+Vigilancia - Exportacion automatica de los revit_data.json que deja pyRevit
+Autor: Francisco de la Poza
+
+La extension de pyRevit deja revit_data.json en %TEMP%\\revit_ext. En modo
+vigilancia se revisan periodicamente las carpetas configuradas y, cuando un
+archivo nuevo o modificado esta completo, se envia su exportacion a Excel a la
+cola de trabajos, de modo que el informe de mediciones ya esta hecho cuando se
+pide.
+
+  - Sondeo (sin dependencias nuevas): cada 'intervalo_s' se mira la firma
+    (mtime, tamano) de los archivos vigilados.
+  - Antirrebote: un archivo se procesa cuando su firma no ha cambiado durante
+    'espera_estable_s' y ademas su contenido es un JSON valido (archivo completo).
+  - Sin cambios, sin trabajo: se guarda el hash del archivo y el de cada
+    categoria cuando la exportacion termina bien. Si se vuelve a exportar el
+    mismo modelo sin cambios no se hace nada; si cambia, se regenera el Excel
+    completo (todas las categorias, mismo nombre, sustituido de forma atomica)
+    y el resultado indica que categorias cambiaron. Si la exportacion falla no
+    se guarda el hash y se reintenta la proxima vez que cambie el archivo (o al
+    reiniciar).
+  - Un modelo, un Excel: sus exportaciones se hacen de una en una y, si llega
+    otra mas reciente antes de que empiece una anterior, la anterior se omite.
+
+Se ejecuta dentro del servidor (seccion "vigilancia" de config.json) o como
+proceso independiente:
+    python vigilancia.py [--carpeta RUTA ...] [--intervalo 2] [--una-vez]
+
+Configuracion:
+    "vigilancia": {"activado": true, "carpetas": ["%TEMP%\\\\revit_ext"],
+                   "archivos": ["revit_data.json"], "intervalo_s": 2,
+                   "espera_estable_s": 3, "ruta_salida": "output/mediciones"}
+"""
+
+import argparse
+import asyncio
+import contextlib
+import hashlib
+import importlib.util
+import json
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+from comun import RUTA_BASE, RUTA_OUTPUT, cargar_configuracion, escribir_atomico, registrar_log
+from trabajos import obtener_cola
+
+RUTA_VIGILANCIA = RUTA_OUTPUT / "vigilancia"
+RUTA_ESTADO = RUTA_VIGILANCIA / "estado.json"
+RUTA_EXTRACTOR = RUTA_BASE / "herramientas" / "fr_revit_extractor.py"
+
+INTERVALO_S = 2.0
+ESPERA_ESTABLE_S = 3.0
+ARCHIVOS_VIGILADOS = ["revit_data.json"]
+
+def carpetas_por_defecto() -> list[str]:
+    """Carpeta donde pyRevit deja revit_data.json"""
+    temporal = os.getenv("TEMP", os.path.expanduser("~\\AppData\\Local\\Temp"))
+    return [os.path.join(temporal, "revit_ext")]
+
+def hash_texto(datos: bytes) -> str:
+    """Hash corto del contenido"""
+    return hashlib.sha256(datos).hexdigest()[:16]
+
+def hashes_categorias(datos: dict) -> dict:
+    """Hash y numero de elementos de cada categoria del JSON de Revit"""
+    return {
+        categoria: {
+            "hash": hash_texto(json.dumps(elementos, sort_keys=True, ensure_ascii=False, default=str).encode("utf-8")),
+            "elementos": len(elementos)
+        }
+        for categoria, elementos in datos.items()
+        if isinstance(elementos, list) and elementos
+    }
+
+def nombre_modelo(ruta: Path, datos: dict) -> str:
+    """Nombre estable del informe de un modelo"""
+    for clave in ("modelo", "proyecto", "archivo"):
+        if isinstance(datos.get(clave), str) and datos[clave].strip():
+            base = Path(datos[clave].strip()).stem
+            break
+    else:
+        base = f"{ruta.parent.name}_{ruta.stem}"
+    return "".join(c if c.isalnum() or c in "-_" else "_" for c in base)
+
+_extractor = None
+
+def _importar_extractor():
+    """Modulo fr_revit_extractor (se importa una vez, sin registrarlo como herramienta)"""
+    global _extractor
+    if _extractor is None:
+        spec = importlib.util.spec_from_file_location("_vigilancia_revit_extractor", RUTA_EXTRACTOR)
+        modulo = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(modulo)
+        _extractor = modulo
+    return _extractor
+
+def exportar_instantanea(progreso, ruta_instantanea: str, ruta_salida: str, nombre: str, cambios: str,
+                         al_exportar=None, vigente=None, cerrojo=None) -> str:
+    """
+    Trabajo de la cola: exporta la copia del JSON y la borra al terminar.
+    al_exportar() se llama solo si la exportacion termina bien. Con cerrojo, las
+    exportaciones de un mismo modelo se hacen de una en una, y si vigente() es
+    falso (ya se envio una exportacion mas reciente del modelo) no se exporta.
+    """
+    try:
+        with cerrojo or contextlib.nullcontext():
+            if vigente and not vigente():
+                return f"Omitida: hay una exportacion mas reciente de {nombre}"
+            return _exportar(progreso, ruta_instantanea, ruta_salida, nombre, cambios, al_exportar)
+    finally:
+        Path(ruta_instantanea).unlink(missing_ok=True)
+
+def _exportar(progreso, ruta_instantanea: str, ruta_salida: str, nombre: str, cambios: str, al_exportar) -> str:
+    """Exporta la copia del JSON al Excel del modelo"""
+    extractor = _importar_extractor()
+    with extractor.EscritorResultado("FR_revit_extractor", f"Exportacion automatica de {nombre}") as escritor:
+        estado = extractor.extract_revit_data(
+            None, ruta_salida, ruta_instantanea,
+            escritor=escritor, progreso=progreso, nombre_salida=f"Mediciones_{nombre}"
+        )
+    if not estado.startswith("OK"):
+        raise RuntimeError(estado.split(":", 1)[-1].strip())
+    if al_exportar:
+        al_exportar()
+    return f"{estado.split(':', 1)[1].strip()} ({cambios}; {escritor.uri})"
+
+class VigilanteCarpetas:
+    """Detecta archivos completos nuevos o modificados y envia su exportacion"""
+
+    def __init__(self, carpetas: list[str], archivos: list[str] = None, espera_estable_s: float = ESPERA_ESTABLE_S,
+                 ruta_salida: str = None):
+        self.carpetas = [Path(os.path.expandvars(c)) for c in carpetas]
+        self.archivos = archivos or ARCHIVOS_VIGILADOS
+        self.espera_estable_s = espera_estable_s
+        self.ruta_salida = str(ruta_salida or RUTA_OUTPUT / "mediciones")
+        # Firma vista por ultima vez y desde cuando no cambia: {ruta: (firma, instante)}
+        self._observados = {}
+        # Exportaciones enviadas y aun sin terminar: {ruta: (hash, trabajo)}
+        self._pendientes = {}
+        # El estado se actualiza desde el hilo de la cola al terminar cada exportacion
+        self._cerrojo = threading.Lock()
+        # Por modelo (mismo Excel): cerrojo de sus exportaciones y marca de la ultima enviada
+        self._cerrojos_modelo = {}
+        self._ultima_por_modelo = {}
+        self.estado = self._leer_estado()
+
+    def _leer_estado(self) -> dict:
+        """Hashes de lo ya exportado (sobrevive a reinicios)"""
+        try:
+            with open(RUTA_ESTADO, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def _guardar_estado(self):
+        escribir_atomico(RUTA_ESTADO, json.dumps(self.estado, indent=2, ensure_ascii=False))
+
+    def _registrar_exportacion(self, clave: str, entrada: dict):
+        """Guarda los hashes de una exportacion terminada con exito"""
+        with self._cerrojo:
+            self.estado[clave] = entrada
+            self._guardar_estado()
+
+    def _candidatos(self):
+        """Archivos vigilados que existen ahora mismo"""
+        for carpeta in self.carpetas:
+            for patron in self.archivos:
+                try:
+                    yield from carpeta.glob(patron)
+                except OSError:
+                    continue
+
+    def revisar(self) -> list[str]:
+        """
+        Una pasada de sondeo. Retorna los identificadores de los trabajos enviados.
+        """
+        enviados = []
+        ahora = time.monotonic()
+        vistos = set()
+        for ruta in self._candidatos():
+            clave = str(ruta)
+            vistos.add(clave)
+            try:
+                info = ruta.stat()
+            except OSError:
+                continue
+            firma = (info.st_mtime_ns, info.st_size)
+
+            anterior = self._observados.get(clave)
+            if anterior is None or anterior[0] != firma:
+                # Primera vez o sigue escribiendose: esperar a que se estabilice
+                self._observados[clave] = (firma, ahora)
+                continue
+            if anterior[1] is None or ahora - anterior[1] < self.espera_estable_s:
+                continue
+
+            trabajo = self._procesar(ruta)
+            # No volver a mirarlo hasta que su firma cambie
+            self._observados[clave] = (firma, None)
+            if trabajo:
+                enviados.append(trabajo)
+
+        for clave in set(self._observados) - vistos:
+            del self._observados[clave]
+        return enviados
+
+    def _procesar(self, ruta: Path):
+        """Lee un archivo estable y, si su contenido cambio, envia la exportacion"""
+        try:
+            contenido = ruta.read_bytes()
+            texto = contenido.decode("utf-8-sig")
+            datos = json.loads(texto)
+        except (OSError, UnicodeDecodeError, json.JSONDecodeError) as e:
+            # JSON incompleto o bloqueado: se reintentara cuando cambie su firma
+            registrar_log(f"VIGILANCIA: {ruta} aun no es un JSON completo ({type(e).__name__})")
+            return None
+        if not isinstance(datos, dict):
+            registrar_log(f"VIGILANCIA: {ruta} no tiene el formato de revit_data.json")
+            return None
+
+        clave = str(ruta)
+        hash_archivo = hash_texto(contenido)
+        with self._cerrojo:
+            previo = dict(self.estado.get(clave, {}))
+        if previo.get("hash") == hash_archivo:
+            registrar_log(f"VIGILANCIA: {ruta} sin cambios desde la ultima exportacion")
+            return None
+        pendiente = self._pendientes.get(clave)
+        if pendiente and pendiente[0] == hash_archivo and not pendiente[1].futuro.done():
+            registrar_log(f"VIGILANCIA: {ruta} ya tiene la exportacion {pendiente[1].id} en curso")
+            return None
+
+        categorias = hashes_categorias(datos)
+        categorias_previas = previo.get("categorias", {})
+        cambiadas = sorted(c for c, h in categorias.items() if categorias_previas.get(c, {}).get("hash") != h["hash"])
+        eliminadas = sorted(set(categorias_previas) - set(categorias))
+        if previo:
+            cambios = f"categorias cambiadas: {', '.join(cambiadas) or 'ninguna'}"
+            if eliminadas:
+                cambios += f"; eliminadas: {', '.join(eliminadas)}"
+        else:
+            cambios = f"primera exportacion, {len(categorias)} categorias"
+
+        # Copia del contenido ya comprobado (sin BOM): pyRevit puede volver a escribir el original
+        RUTA_VIGILANCIA.mkdir(parents=True, exist_ok=True)
+        instantanea = RUTA_VIGILANCIA / f"{hash_archivo}.json"
+        instantanea.write_text(texto, encoding="utf-8")
+
+        nombre = nombre_modelo(ruta, datos)
+        entrada = {"hash": hash_archivo, "categorias": categorias, "modelo": nombre}
+
+        def al_exportar():
+            entrada["fecha"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            self._registrar_exportacion(clave, entrada)
+
+        # Una exportacion anterior del mismo modelo que aun no ha empezado se omite;
+        # si ya esta en curso, esta espera a que termine para no ser sobrescrita
+        marca = object()
+
+        def vigente() -> bool:
+            return self._ultima_por_modelo.get(nombre) is marca
+
+        # El cerrojo impide que al_exportar guarde la entrada antes de anotar el trabajo
+        with self._cerrojo:
+            self._ultima_por_modelo[nombre] = marca
+            cerrojo_modelo = self._cerrojos_modelo.setdefault(nombre, threading.Lock())
+            trabajo = obtener_cola().enviar(
+                "FR_revit_extractor",
+                f"Exportacion automatica de {nombre} ({cambios})",
+                exportar_instantanea,
+                str(instantanea), self.ruta_salida, nombre, cambios, al_exportar, vigente, cerrojo_modelo
+            )
+            entrada["trabajo"] = trabajo.id
+            self._pendientes[clave] = (hash_archivo, trabajo)
+        registrar_log(f"VIGILANCIA: {ruta} -> trabajo {trabajo.id} ({cambios})")
+        return trabajo.id
+
+def desde_configuracion(configuracion: dict) -> VigilanteCarpetas:
+    """Crea el vigilante con la seccion "vigilancia" de config.json"""
+    ruta_salida = configuracion.get("ruta_salida")
+    if ruta_salida and not os.path.isabs(ruta_salida):
+        ruta_salida = RUTA_BASE / ruta_salida
+    return VigilanteCarpetas(
+        carpetas=configuracion.get("carpetas") or carpetas_por_defecto(),
+        archivos=configuracion.get("archivos") or ARCHIVOS_VIGILADOS,
+        espera_estable_s=configuracion.get("espera_estable_s", ESPERA_ESTABLE_S),
+        ruta_salida=ruta_salida
+    )
+
+async def vigilar(vigilante: VigilanteCarpetas, intervalo_s: float = INTERVALO_S):
+    """Bucle de sondeo dentro del servidor (se cancela al detenerlo)"""
+    registrar_log(f"VIGILANCIA: vigilando {', '.join(str(c) for c in vigilante.carpetas)} cada {intervalo_s}s")
+    while True:
+        try:
+            await asyncio.to_thread(vigilante.revisar)
+        except Exception as e:
+            registrar_log(f"VIGILANCIA: error revisando carpetas: {e}")
+        await asyncio.sleep(intervalo_s)
+
+def main():
+    """Modo independiente: vigila las carpetas hasta Ctrl+C"""
+    configuracion = cargar_configuracion().get("vigilancia", {})
+    parser = argparse.ArgumentParser(description="Exporta automaticamente a Excel los revit_data.json que deja pyRevit")
+    parser.add_argument("--carpeta", action="append", help="Carpeta a vigilar (se puede repetir)")
+    parser.add_argument("--intervalo", type=float, default=configuracion.get("intervalo_s", INTERVALO_S), help="Segundos entre revisiones")
+    parser.add_argument("--una-vez", action="store_true", help="Procesa lo que ya este completo y termina")
+    argumentos = parser.parse_args()
+
+    if argumentos.carpeta:
+        configuracion = {**configuracion, "carpetas": argumentos.carpeta}
+    vigilante = desde_configuracion(configuracion)
+    print(f"Vigilando: {', '.join(str(c) for c in vigilante.carpetas)}")
+    print(f"Informes en: {vigilante.ruta_salida}")
+
+    cola = obtener_cola()
+    try:
+        if argumentos.una_vez:
+            # Dos pasadas separadas por la espera: la primera solo anota las firmas
+            vigilante.revisar()
+            time.sleep(vigilante.espera_estable_s)
+            enviados = vigilante.revisar()
+            cola.detener(esperar=True)
+            for identificador in enviados:
+                trabajo = cola.obtener(identificador)
+                print(f"{trabajo.estado}: {trabajo.resultado or trabajo.error}")
+            return
+
+        while True:
+            for identificador in vigilante.revisar():
+                print(f"Trabajo {identificador} enviado")
+            time.sleep(argumentos.intervalo)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        cola.detener()
+
+if __name__ == "__main__":
+    sys.exit(main())